@@ -1,14 +1,15 @@
 import os
 import json
 import asyncio
+import hashlib
 import tempfile
 import shutil
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from langchain.schema import HumanMessage
+from langchain.schema import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableConfig
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -17,7 +18,12 @@ from datetime import datetime
 from workflow.graph import build_workflow
 from models.state import State
 from utils.checkpointer import delete_thread_sync, delete_user_data_sync
+from utils.index_jobs import get_index_job_queue, job_view, TERMINAL_STATUSES
+from utils.executors import get_executor, executor_stats
+from utils.llm_scheduler import LLMDeadlineExceeded, get_llm_scheduler
+from utils.response_cache import get_response_cache
 from vector_db.vector_service import VectorService
+from config import CACHE_DIR, UPLOAD_CHUNK_BYTES, UPLOAD_MAX_FILE_MB, UPLOAD_MAX_CONCURRENT, INDEX_UPDATE_BY_FILENAME
 
 # Set environment variables
 os.environ["ANONYMIZED_TELEMETRY"] = "false"
@@ -65,10 +71,12 @@ async def lifespan(app: FastAPI):
     """Lifespan event handler for FastAPI."""
     # Startup
     get_workflow_graph()
+    await get_index_job_queue().start()
     print("🚀 IntelliFlow AI API started successfully!")
     yield
     # Shutdown
     print("🛑 IntelliFlow AI API shutting down...")
+    await get_index_job_queue().stop()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -108,15 +116,30 @@ class IndexAttachmentRequest(BaseModel):
     user_id: str = Field(..., description="Unique identifier for the user")
     thread_id: str = Field(..., description="Unique identifier for the conversation thread")
     file_paths: List[str] = Field(..., description="List of file paths to index")
+    update_existing: bool = Field(
+        default=INDEX_UPDATE_BY_FILENAME,
+        description="Replace files already indexed in the thread under the same file name, re-embedding only changed chunks"
+    )
 
-class IndexAttachmentResponse(BaseModel):
+class IndexJobResponse(BaseModel):
+    job_id: str
     user_id: str
     thread_id: str
-    indexed_count: int
-    skipped_count: int
+    status: str
     success: bool
     message: str
 
+class IndexJobStatusResponse(BaseModel):
+    job_id: str
+    user_id: str
+    thread_id: str
+    status: str = Field(..., description="queued, running, completed or failed")
+    progress: Dict[str, int] = Field(..., description="files_total, files_parsed, files_skipped, chunks_reused, chunks_embedded, chunks_upserted")
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
 class DeleteRequest(BaseModel):
     user_id: str = Field(..., description="Unique identifier for the user")
     thread_id: Optional[str] = Field(None, description="Unique identifier for the conversation thread (optional for user deletion)")
@@ -144,50 +167,59 @@ async def root():
             "chat": "/chat",
             "chat_stream": "/chat/stream",
             "index_attachment": "/index_attachment",
+            "upload_and_index": "/upload_and_index",
+            "index_job": "/index_jobs/{job_id}",
+            "index_job_events": "/index_jobs/{job_id}/events",
             "delete_user_document": "/delete_user_document",
             "delete_thread": "/delete_thread"
         }
     }
 
-async def stream_chat_response(graph, initial_state, config, use_internet: bool, use_documents: bool):
-    """Stream the chat response with real-time status updates."""
+# Status event sent when each workflow node starts
+NODE_STATUS = {
+    "decompose": ("planning", "Breaking down the question..."),
+    "parallel_evidence": ("analyzing_documents", "Analyzing documents and searching internet..."),
+    "retrieve_only": ("analyzing_documents", "Analyzing documents..."),
+    "search_only": ("searching_internet", "Searching the internet..."),
+    "rerank": ("ranking", "Ranking relevant passages..."),
+    "evaluate": ("evaluating", "Checking the evidence..."),
+    "call_model": ("thinking", "Generating response..."),
+}
+# Only tokens from the answering model are streamed, not those of the utility LLM calls
+ANSWER_NODE = "call_model"
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def stream_chat_response(graph, initial_state, config):
+    """Stream status events as workflow nodes start, then the answer as token deltas."""
     
+    answer_parts = []
     try:
-        # Send initial status based on what will be done
-        if use_documents and use_internet:
-            yield f"data: {json.dumps({'type': 'status', 'status': 'analyzing_documents', 'message': 'Analyzing documents and searching internet...'})}\n\n"
-            # Add a small delay to show the status
-            await asyncio.sleep(2)
-        elif use_documents:
-            yield f"data: {json.dumps({'type': 'status', 'status': 'analyzing_documents', 'message': 'Analyzing documents...'})}\n\n"
-            await asyncio.sleep(2)
-        elif use_internet:
-            yield f"data: {json.dumps({'type': 'status', 'status': 'searching_internet', 'message': 'Searching the internet...'})}\n\n"
-            await asyncio.sleep(2)
-        
-        # Send thinking status
-        yield f"data: {json.dumps({'type': 'status', 'status': 'thinking', 'message': 'Generating response...'})}\n\n"
-        
-        # Process through the workflow to get the final response
-        response = await graph.ainvoke(initial_state, config=config)
-        final_message = response['recent_messages'][-1].content
-        
-        # Stream the response character by character for smooth experience
-        current_text = ""
-        for char in final_message:
-            current_text += char
-            yield f"data: {json.dumps({'type': 'content', 'content': current_text, 'is_complete': False})}\n\n"
-            await asyncio.sleep(0.01)
-        
-        # Send completion signal
-        yield f"data: {json.dumps({'type': 'content', 'content': current_text, 'is_complete': True})}\n\n"
-        yield f"data: {json.dumps({'type': 'status', 'status': 'complete', 'message': 'Response complete'})}\n\n"
+        async for mode, chunk in graph.astream(initial_state, config=config, stream_mode=["tasks", "messages"]):
+            if mode == "tasks":
+                # Task events carry a "result" once the node has finished
+                status = NODE_STATUS.get(chunk["name"])
+                if status and "result" not in chunk:
+                    yield sse_event({'type': 'status', 'status': status[0], 'message': status[1]})
+            else:
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == ANSWER_NODE and isinstance(message, AIMessage) and message.content:
+                    answer_parts.append(message.content)
+                    yield sse_event({'type': 'content', 'delta': message.content, 'is_complete': False})
         
+        # The complete answer once, for clients that do not assemble the deltas
+        yield sse_event({'type': 'content', 'content': "".join(answer_parts), 'is_complete': True})
+        yield sse_event({'type': 'status', 'status': 'complete', 'message': 'Response complete'})
+
+    except LLMDeadlineExceeded as e:
+        yield sse_event({'type': 'content', 'content': f"The language model is busy, please retry shortly: {str(e)}", 'is_complete': True})
+        yield sse_event({'type': 'status', 'status': 'busy', 'message': 'Rate limited'})
     except Exception as e:
         # Send error status
         error_message = f"Sorry, I encountered an error: {str(e)}"
-        yield f"data: {json.dumps({'type': 'content', 'content': error_message, 'is_complete': True})}\n\n"
-        yield f"data: {json.dumps({'type': 'status', 'status': 'error', 'message': 'Error occurred'})}\n\n"
+        yield sse_event({'type': 'content', 'content': error_message, 'is_complete': True})
+        yield sse_event({'type': 'status', 'status': 'error', 'message': 'Error occurred'})
 
 @app.post("/chat/stream", tags=["Chat"])
 async def chat_stream(request: ChatRequest):
@@ -198,6 +230,10 @@ async def chat_stream(request: ChatRequest):
     - Internet search progress
     - Document analysis progress
     - Response generation progress
+    
+    Status events are sent as each workflow node starts. The answer arrives as
+    {"type": "content", "delta": ...} events with the model's tokens, followed by one
+    event with the complete "content" and is_complete set.
     """
     try:
         # Get the workflow graph
@@ -231,7 +267,7 @@ async def chat_stream(request: ChatRequest):
         
         # Return streaming response with real-time processing
         return StreamingResponse(
-            stream_chat_response(graph, initial_state, config, request.use_search, request.use_attachment),
+            stream_chat_response(graph, initial_state, config),
             media_type="text/plain",
             headers={
                 "Cache-Control": "no-cache",
@@ -289,19 +325,25 @@ async def chat(request: ChatRequest):
             success=True
         )
         
+    except LLMDeadlineExceeded as e:
+        # The LLM rate budget is exhausted for now, the client may retry later
+        raise HTTPException(
+            status_code=503,
+            detail=f"The language model is busy, please retry shortly: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing chat request: {str(e)}"
         )
 
-@app.post("/index_attachment", response_model=IndexAttachmentResponse, tags=["Document Management"])
+@app.post("/index_attachment", response_model=IndexJobResponse, tags=["Document Management"])
 async def index_attachment(request: IndexAttachmentRequest):
     """
-    Index documents for a specific user and thread.
+    Queue documents for indexing for a specific user and thread.
     
-    This endpoint processes and indexes documents using the vector database.
-    Documents are chunked, embedded, and stored for later retrieval.
+    Documents are chunked, embedded, and stored in the background; poll
+    /index_jobs/{job_id} or follow /index_jobs/{job_id}/events for progress.
     """
     try:
         # Validate file paths exist
@@ -312,24 +354,20 @@ async def index_attachment(request: IndexAttachmentRequest):
                     detail=f"File not found: {file_path}"
                 )
         
-        # Index documents using VectorService
-        result = await VectorService.index_documents(
-            file_paths=request.file_paths,
+        job = await get_index_job_queue().submit(
             user_id=request.user_id,
-            thread_id=request.thread_id
+            thread_id=request.thread_id,
+            file_paths=request.file_paths,
+            update_existing=request.update_existing
         )
         
-        # Handle the result properly
-        if result is None:
-            result = {}
-        
-        return IndexAttachmentResponse(
+        return IndexJobResponse(
+            job_id=job["_id"],
             user_id=request.user_id,
             thread_id=request.thread_id,
-            indexed_count=result.get("indexed_count", 0),
-            skipped_count=result.get("skipped_count", 0),
+            status=job["status"],
             success=True,
-            message=result.get("message", "Documents indexed successfully")
+            message=f"Indexing job queued for {len(request.file_paths)} files"
         )
         
     except HTTPException:
@@ -337,67 +375,168 @@ async def index_attachment(request: IndexAttachmentRequest):
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error indexing documents: {str(e)}"
+            detail=f"Error queuing indexing job: {str(e)}"
         )
 
-@app.post("/upload_and_index", tags=["Document Management"])
+# Upload requests being written to disk at once
+upload_slots = asyncio.Semaphore(UPLOAD_MAX_CONCURRENT)
+
+async def save_upload(file: UploadFile, file_path: str) -> Tuple[str, str]:
+    """Stream an upload to disk in large chunks off the event loop, returning its md5 and sha256.
+
+    The digests are computed while writing, so indexing never reads the file again to hash it.
+    The md5 identifies the file; the sha256 guards reusing another tenant's vectors for it.
+    """
+    max_bytes = UPLOAD_MAX_FILE_MB * 1024 * 1024
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds the {UPLOAD_MAX_FILE_MB} MB upload limit")
+
+    loop = asyncio.get_event_loop()
+    file_hash = hashlib.md5()
+    file_sha256 = hashlib.sha256()
+    written = 0
+    with open(file_path, "wb") as buffer:
+        def write_chunk(chunk: bytes):
+            buffer.write(chunk)
+            file_hash.update(chunk)
+            file_sha256.update(chunk)
+
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            written += len(chunk)
+            if written > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds the {UPLOAD_MAX_FILE_MB} MB upload limit")
+            await loop.run_in_executor(get_executor("files"), write_chunk, chunk)
+    return file_hash.hexdigest(), file_sha256.hexdigest()
+
+@app.post("/upload_and_index", response_model=IndexJobResponse, tags=["Document Management"])
 async def upload_and_index(
     user_id: str = Form(...),
     thread_id: str = Form(...),
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    update_existing: bool = Form(INDEX_UPDATE_BY_FILENAME)
 ):
     """
-    Upload and index documents for a specific user and thread.
+    Upload documents and queue them for indexing for a specific user and thread.
     
-    This endpoint handles file uploads and automatically indexes them.
+    With update_existing, a file whose name is already indexed in the thread is
+    replaced by the upload, re-embedding only its changed chunks.
+
+    Uploaded files are kept until the indexing job finishes. Files larger than
+    UPLOAD_MAX_FILE_MB are rejected with 413, and requests beyond
+    UPLOAD_MAX_CONCURRENT simultaneous uploads with 429.
     """
+    if upload_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many uploads in progress, please retry shortly")
+    
+    # Uploads must outlive the request, the job removes the directory when it is done
+    uploads_root = os.path.join(CACHE_DIR, "uploads")
+    os.makedirs(uploads_root, exist_ok=True)
+    upload_dir = tempfile.mkdtemp(dir=uploads_root)
     try:
-        # Create temporary directory for uploaded files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            file_paths = []
-            
-            # Save uploaded files to temporary directory
+        file_paths = []
+        file_hashes = []
+        file_sha256s = []
+        
+        # Save uploaded files to the upload directory
+        async with upload_slots:
             for file in files:
                 if file.filename:
-                    file_path = os.path.join(temp_dir, file.filename)
-                    with open(file_path, "wb") as buffer:
-                        shutil.copyfileobj(file.file, buffer)
+                    file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+                    file_hash, file_sha256 = await save_upload(file, file_path)
+                    file_hashes.append(file_hash)
+                    file_sha256s.append(file_sha256)
                     file_paths.append(file_path)
-            
-            if not file_paths:
-                raise HTTPException(
-                    status_code=400,
-                    detail="No valid files uploaded"
-                )
-            
-            # Index documents using VectorService
-            result = await VectorService.index_documents(
-                file_paths=file_paths,
-                user_id=user_id,
-                thread_id=thread_id
-            )
-            
-            # Handle the result properly
-            if result is None:
-                result = {}
-            
-            return IndexAttachmentResponse(
-                user_id=user_id,
-                thread_id=thread_id,
-                indexed_count=result.get("indexed_count", 0),
-                skipped_count=result.get("skipped_count", 0),
-                success=True,
-                message=result.get("message", "Documents indexed successfully")
+        
+        if not file_paths:
+            raise HTTPException(
+                status_code=400,
+                detail="No valid files uploaded"
             )
+        
+        job = await get_index_job_queue().submit(
+            user_id=user_id,
+            thread_id=thread_id,
+            file_paths=file_paths,
+            cleanup_dir=upload_dir,
+            file_hashes=file_hashes,
+            file_sha256s=file_sha256s,
+            update_existing=update_existing
+        )
+        
+        return IndexJobResponse(
+            job_id=job["_id"],
+            user_id=user_id,
+            thread_id=thread_id,
+            status=job["status"],
+            success=True,
+            message=f"Indexing job queued for {len(file_paths)} files"
+        )
             
     except HTTPException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
         raise
     except Exception as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
         raise HTTPException(
             status_code=500,
             detail=f"Error uploading and indexing documents: {str(e)}"
         )
 
+@app.get("/index_jobs/{job_id}", response_model=IndexJobStatusResponse, tags=["Document Management"])
+async def get_index_job(job_id: str):
+    """
+    Get the status and progress of an indexing job.
+    """
+    job = await get_index_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Indexing job not found: {job_id}"
+        )
+    return IndexJobStatusResponse(**job_view(job))
+
+async def stream_index_job_progress(job_id: str):
+    """Stream job snapshots whenever progress changes, until the job finishes."""
+    last_state = None
+    while True:
+        job = await get_index_job_queue().get(job_id)
+        if job is None:
+            yield f"data: {json.dumps({'type': 'status', 'status': 'error', 'message': 'Job not found'})}\n\n"
+            return
+        
+        snapshot = job_view(job)
+        state = (snapshot["status"], snapshot["progress"])
+        if state != last_state:
+            yield f"data: {json.dumps({'type': 'progress', **snapshot})}\n\n"
+            last_state = state
+        
+        if snapshot["status"] in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(0.5)
+
+@app.get("/index_jobs/{job_id}/events", tags=["Document Management"])
+async def index_job_events(job_id: str):
+    """
+    Stream indexing job progress as server-sent events.
+    
+    Each event carries the job status and its files parsed, chunks embedded and
+    chunks upserted counters; the stream ends when the job completes or fails.
+    """
+    if await get_index_job_queue().get(job_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Indexing job not found: {job_id}"
+        )
+    
+    return StreamingResponse(
+        stream_index_job_progress(job_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
 @app.delete("/delete_user_document", response_model=DeleteResponse, tags=["Data Management"])
 async def delete_user_document(request: DeleteRequest):
     """
@@ -478,13 +617,15 @@ async def delete_thread(request: DeleteRequest):
 async def health_check():
     """Health check endpoint to verify API status."""
     qdrant_status = "unknown"
+    embedding_cache = None
     try:
         # Try to connect to Qdrant
         from vector_db.vector_service import VectorService
         indexer = VectorService._get_indexer()
-        if indexer and indexer.qdrant_manager:
-            await indexer.qdrant_manager.client.get_collections()
+        if indexer and indexer.vector_backend:
+            await indexer.vector_backend.health_check()
             qdrant_status = "healthy"
+            embedding_cache = indexer.embedding_manager.cache_stats()
         else:
             qdrant_status = "not_initialized"
     except Exception as e:
@@ -494,7 +635,11 @@ async def health_check():
         "status": "healthy",
         "message": "IntelliFlow AI API is running",
         "workflow_initialized": workflow_graph is not None,
-        "qdrant_status": qdrant_status
+        "qdrant_status": qdrant_status,
+        "embedding_cache": embedding_cache,
+        "executors": executor_stats(),
+        "llm_scheduler": get_llm_scheduler().stats(),
+        "response_cache": get_response_cache().stats()
     }
 
 @app.get("/chat_history/{user_id}", response_model=ChatHistoryResponse, tags=["Chat"])
@@ -524,19 +669,19 @@ async def get_chat_history(user_id: str):
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return {
+    return JSONResponse(status_code=404, content={
         "error": "Not Found",
-        "message": "The requested resource was not found",
+        "message": getattr(exc, "detail", None) or "The requested resource was not found",
         "path": str(request.url.path)
-    }
+    })
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
-    return {
+    return JSONResponse(status_code=500, content={
         "error": "Internal Server Error",
         "message": "An unexpected error occurred",
         "path": str(request.url.path)
-    }
+    })
 
 if __name__ == "__main__":
     import uvicorn
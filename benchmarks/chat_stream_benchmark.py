@@ -0,0 +1,152 @@
+"""
+Benchmark /chat/stream: replayed answer (the previous implementation) vs token streaming.
+
+Both generators run the same two-node graph: an evidence node that takes EVIDENCE_SECONDS,
+then CallModelNode over a fake chat model that emits one chunk (a word or a space) every
+TOKEN_DELAY seconds, like a hosted LLM generating. The previous implementation is reproduced
+below as legacy_stream_chat_response. Reports time to the first content frame (TTFT), total time,
+SSE frames and bytes on the wire.
+
+Run from the project root:
+    python -m benchmarks.chat_stream_benchmark
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+import sys
+import time
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, END
+
+from api import stream_chat_response
+from models.state import State
+from services.call_model import CallModelNode
+
+ANSWER_WORDS = 250  # About 2 KB of text
+TOKEN_DELAY = 0.02
+EVIDENCE_SECONDS = 0.5
+
+VOCABULARY = (
+    "invoice shipment warranty contract clause payment supplier delivery schedule quarterly "
+    "revenue forecast budget compliance audit policy employee onboarding security incident "
+    "report customer ticket escalation release roadmap migration database latency throughput"
+).split()
+
+
+class PacedChatModel(GenericFakeChatModel):
+    """Fake chat model that streams its answer chunk by chunk at a fixed rate."""
+
+    token_delay: float = TOKEN_DELAY
+
+    def _stream(self, *args, **kwargs):
+        for chunk in super()._stream(*args, **kwargs):
+            time.sleep(self.token_delay)
+            yield chunk
+
+
+async def legacy_stream_chat_response(graph, initial_state, config, use_internet: bool, use_documents: bool):
+    """The previous /chat/stream generator: fixed status delay, then the finished answer replayed."""
+    try:
+        if use_documents:
+            yield f"data: {json.dumps({'type': 'status', 'status': 'analyzing_documents', 'message': 'Analyzing documents...'})}\n\n"
+            await asyncio.sleep(2)
+        yield f"data: {json.dumps({'type': 'status', 'status': 'thinking', 'message': 'Generating response...'})}\n\n"
+
+        response = await graph.ainvoke(initial_state, config=config)
+        final_message = response['recent_messages'][-1].content
+
+        current_text = ""
+        for char in final_message:
+            current_text += char
+            yield f"data: {json.dumps({'type': 'content', 'content': current_text, 'is_complete': False})}\n\n"
+            await asyncio.sleep(0.01)
+
+        yield f"data: {json.dumps({'type': 'content', 'content': current_text, 'is_complete': True})}\n\n"
+        yield f"data: {json.dumps({'type': 'status', 'status': 'complete', 'message': 'Response complete'})}\n\n"
+    except Exception as e:
+        error_message = f"Sorry, I encountered an error: {str(e)}"
+        yield f"data: {json.dumps({'type': 'content', 'content': error_message, 'is_complete': True})}\n\n"
+
+
+def build_graph(answer: str):
+    async def retrieve_only(state: State):
+        await asyncio.sleep(EVIDENCE_SECONDS)
+        return {"final_context": "Context: quarterly revenue report."}
+
+    model = PacedChatModel(messages=itertools.repeat(AIMessage(content=answer)))
+    workflow = StateGraph(State)
+    workflow.add_node("retrieve_only", retrieve_only)
+    workflow.add_node("call_model", CallModelNode(model=model).invoke)
+    workflow.set_entry_point("retrieve_only")
+    workflow.add_edge("retrieve_only", "call_model")
+    workflow.add_edge("call_model", END)
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def initial_state(query: str) -> State:
+    return State({
+        "recent_messages": [HumanMessage(content=query)],
+        "user_query": query,
+        "conversation_summary": "",
+        "do_retrieval": True,
+        "do_search": False,
+        "user_id": "bench_user",
+        "thread_id": "bench_thread",
+        "tasks": [],
+        "retrieved_docs": [],
+        "web_search_results": [],
+        "final_context": "",
+    })
+
+
+async def measure(events):
+    """TTFT, total seconds, frames, bytes and the final answer of one SSE stream."""
+    start_time = time.perf_counter()
+    ttft = None
+    frames = 0
+    wire_bytes = 0
+    answer = ""
+    async for event in events:
+        frames += 1
+        wire_bytes += len(event.encode())
+        payload = json.loads(event[len("data: "):])
+        if payload["type"] == "content":
+            if ttft is None:
+                ttft = time.perf_counter() - start_time
+            if payload["is_complete"]:
+                answer = payload["content"]
+    return ttft, time.perf_counter() - start_time, frames, wire_bytes, answer
+
+
+async def run_benchmark():
+    rng = random.Random(42)
+    answer = " ".join(rng.choices(VOCABULARY, k=ANSWER_WORDS))
+    query = "Summarize the quarterly revenue report"
+
+    print(f"\n{len(answer)} character answer, {ANSWER_WORDS} words, a chunk every {TOKEN_DELAY * 1000:.0f} ms, "
+          f"{EVIDENCE_SECONDS:.1f} s evidence")
+    print(f"{'endpoint':>9} | {'TTFT s':>7} | {'total s':>8} | {'frames':>7} | {'KB':>8} | {'answer ok':>9}")
+    print("-" * 62)
+    runs = [
+        ("previous", lambda graph, config: legacy_stream_chat_response(graph, initial_state(query), config, False, True)),
+        ("streaming", lambda graph, config: stream_chat_response(graph, initial_state(query), config)),
+    ]
+    for label, stream in runs:
+        graph = build_graph(answer)
+        config = RunnableConfig(configurable={"thread_id": f"bench_{label}"})
+        ttft, seconds, frames, wire_bytes, streamed_answer = await measure(stream(graph, config))
+        print(f"{label:>9} | {ttft:>7.2f} | {seconds:>8.2f} | {frames:>7} | {wire_bytes / 1024:>8.1f} | "
+              f"{str(streamed_answer == answer):>9}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    asyncio.run(run_benchmark())
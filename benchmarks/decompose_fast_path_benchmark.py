@@ -0,0 +1,137 @@
+"""
+Benchmark the decomposition fast path (SingleTaskNode) on a sample query log.
+
+Runs the classifier over QUERY_LOG, a mix of single questions, multi-part questions,
+follow-ups that need the history and queries with instructions on where to look.
+Reports how often the fast path fires and what the classifier costs per query.
+
+With GROQ_API_KEY set, every query also goes through DecomposeNode: the fast path is
+checked against its output (a fired query should come back as the same single task)
+and the latency saved is the measured decompose time of the fired queries. Without a
+key the saving is estimated from ASSUMED_DECOMPOSE_SECONDS.
+
+Run from the project root:
+    python -m benchmarks.decompose_fast_path_benchmark
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services.single_task_node import SingleTaskNode
+
+ASSUMED_DECOMPOSE_SECONDS = 0.4
+CLASSIFIER_REPEATS = 1000
+
+# (query, previous turns) as they reach route_after_intent_detection
+QUERY_LOG = [
+    ("What is Cognifoot AI?", []),
+    ("Who are the supervisors of the project?", []),
+    ("What was the total revenue in Q4?", []),
+    ("When is the next release scheduled?", []),
+    ("How many employees joined last quarter?", []),
+    ("What is the refund policy for enterprise customers?", []),
+    ("Summarize the project status.", []),
+    ("What does clause 7.2 of the contract say about termination?", []),
+    ("Which suppliers missed their delivery dates?", []),
+    ("What is the capital of France?", []),
+    ("Latest news on the Groq LPU", []),
+    ("Who won the 2022 World Cup?", []),
+    ("Explain the onboarding process for new hires", []),
+    ("What are the main risks listed in the audit?", []),
+    ("How does the caching layer reduce latency?", []),
+    ("What is the warranty period?", ["I'm reading the supplier contract."]),
+    ("What is the budget for the migration project?", ["Let's talk about the roadmap."]),
+    ("Define quarterly forecast variance", []),
+    ("What is the capital of France, and what is its main export?", []),
+    ("Compare the Q3 and Q4 revenue", []),
+    ("Who is the CEO and when was the company founded?", []),
+    ("What is Cognifoot AI, see the pdf.", []),
+    ("Summarize the project status from the attached report.", []),
+    ("Search the web for the latest Python release", []),
+    ("What was its total revenue?", ["I'm looking at the Q4 financial report."]),
+    ("Who approved it?", ["The budget was revised in March."]),
+    ("Can you explain that in more detail?", ["The escalation policy has three tiers."]),
+    ("What did they decide?", ["The board met on Friday."]),
+    ("List the incidents. Which ones were critical?", []),
+    ("What are the pros and cons of binary quantization?", []),
+    ("What is the latency target? What is the throughput target?", []),
+    ("Give me the revenue, the margin, and the headcount for each region over the last three fiscal years, broken down by quarter", []),
+    ("What is the escalation policy for security incidents?", []),
+    ("How long does a database migration usually take?", []),
+    ("Which customer tickets are still open?", []),
+    ("What is the deadline for the compliance audit?", []),
+    ("Tell me about the previous version", ["We shipped 2.0 last week."]),
+    ("Is the roadmap on track?", []),
+    ("What is the onboarding checklist?", []),
+    ("Who owns the payment service?", []),
+]
+
+
+def build_state(query: str, history):
+    messages = []
+    for i, text in enumerate(history):
+        messages.append(HumanMessage(content=text) if i % 2 == 0 else AIMessage(content=text))
+    messages.append(HumanMessage(content=query))
+    return {"recent_messages": messages, "user_query": query, "conversation_summary": "",
+            "user_id": "bench_user", "thread_id": "bench_thread"}
+
+
+async def decompose_all(states):
+    """Time DecomposeNode on every query, for agreement and measured latency."""
+    from langchain_groq import ChatGroq
+    from services.decompose_node import DecomposeNode
+    from config import UTILS_MODEL_ID
+
+    decomposer = DecomposeNode(llm=ChatGroq(model=UTILS_MODEL_ID))
+    results = []
+    for state in states:
+        start_time = time.perf_counter()
+        output = await decomposer.invoke(state)
+        results.append((output["tasks"], time.perf_counter() - start_time))
+    return results
+
+
+def run_benchmark():
+    classifier = SingleTaskNode()
+    states = [build_state(query, history) for query, history in QUERY_LOG]
+
+    start_time = time.perf_counter()
+    for _ in range(CLASSIFIER_REPEATS):
+        fired = [classifier.is_simple_query(state) for state in states]
+    classifier_us = (time.perf_counter() - start_time) / (CLASSIFIER_REPEATS * len(states)) * 1e6
+
+    print(f"\n{len(states)} queries, fast path fired on {sum(fired)} ({sum(fired) / len(states):.0%}), "
+          f"classifier {classifier_us:.1f} us/query")
+
+    if not os.getenv("GROQ_API_KEY"):
+        print(f"GROQ_API_KEY not set: latency saved estimated at {ASSUMED_DECOMPOSE_SECONDS:.2f} s per fired query, "
+              f"{sum(fired) * ASSUMED_DECOMPOSE_SECONDS:.1f} s over the log")
+        for (query, _), simple in zip(QUERY_LOG, fired):
+            print(f"  {'fast' if simple else 'llm ':>4} | {query}")
+        return
+
+    results = asyncio.run(decompose_all(states))
+    agree = 0
+    saved = 0.0
+    print(f"\n{'path':>4} | {'LLM s':>6} | {'agrees':>6} | query -> LLM tasks")
+    print("-" * 80)
+    for (query, _), simple, (tasks, seconds) in zip(QUERY_LOG, fired, results):
+        single = len(tasks) == 1
+        agrees = single if simple else True
+        agree += agrees
+        if simple:
+            saved += seconds
+        print(f"{'fast' if simple else 'llm':>4} | {seconds:>6.2f} | {str(agrees):>6} | {query} -> {tasks}")
+    print(f"\nFired queries decomposed into one task by the LLM: {agree - (len(states) - sum(fired))}/{sum(fired)}")
+    print(f"Latency saved: {saved:.2f} s over the log, {saved / max(1, sum(fired)):.2f} s per fired query")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    run_benchmark()
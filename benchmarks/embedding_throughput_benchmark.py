@@ -0,0 +1,79 @@
+"""
+Benchmark document embedding throughput across EmbeddingEngine settings.
+
+Embeds a synthetic set of chunks with realistic, uneven lengths (short headings up to
+full 2000-character chunks) with EMBEDDING_MODEL_ID, for every combination of worker
+processes, intra-op threads, batch size and length bucketing below. Reports chunks/sec
+per setting; the first call of each engine is a warm-up and is not timed.
+
+Run from the project root:
+    python -m benchmarks.embedding_throughput_benchmark
+"""
+
+import itertools
+import logging
+import os
+import random
+import sys
+import time
+
+from fastembed import TextEmbedding
+
+from vector_db.embedding_engine import EmbeddingEngine
+from config import EMBEDDING_MODEL_ID, CACHE_DIR
+
+CHUNK_COUNT = 2000
+CPU_COUNT = os.cpu_count() or 1
+
+WORKER_COUNTS = sorted({0, 2, max(2, CPU_COUNT // 4), max(2, CPU_COUNT // 2)})
+THREAD_COUNTS = [None, 1]  # None: ONNX default in-process, cores split evenly across workers
+BATCH_SIZES = [16, 64, 256]
+LENGTH_BUCKETING = [False, True]
+
+VOCABULARY = (
+    "invoice shipment warranty contract clause payment supplier delivery schedule quarterly "
+    "revenue forecast budget compliance audit policy employee onboarding security incident "
+    "report customer ticket escalation release roadmap migration database latency throughput"
+).split()
+
+
+def build_chunks(rng: random.Random):
+    chunks = []
+    for _ in range(CHUNK_COUNT):
+        # Most chunks are full-size, with a long tail of short ones (headings, file tails)
+        target = rng.choice([rng.randint(20, 300), rng.randint(1500, 2000), rng.randint(1500, 2000)])
+        words = []
+        while sum(len(word) + 1 for word in words) < target:
+            words.append(rng.choice(VOCABULARY))
+        chunks.append(" ".join(words))
+    return chunks
+
+
+def run_benchmark():
+    chunks = build_chunks(random.Random(42))
+    local_model = TextEmbedding(model_name=EMBEDDING_MODEL_ID, cache_dir=CACHE_DIR)
+
+    print(f"\n{CHUNK_COUNT} chunks, {EMBEDDING_MODEL_ID}, {CPU_COUNT} cores")
+    print(f"{'workers':>7} | {'threads':>7} | {'batch':>5} | {'bucketing':>9} | {'chunks/s':>9}")
+    print("-" * 50)
+    for workers, threads, batch_size, bucketing in itertools.product(WORKER_COUNTS, THREAD_COUNTS, BATCH_SIZES, LENGTH_BUCKETING):
+        if workers == 0 and threads is not None:
+            # The in-process session was created with ONNX's default threads
+            continue
+        engine = EmbeddingEngine(local_model, EMBEDDING_MODEL_ID, CACHE_DIR, batch_size=batch_size,
+                                 threads=threads, workers=workers, length_bucketing=bucketing)
+        engine.embed(chunks[:batch_size * max(workers, 1)])
+
+        start_time = time.perf_counter()
+        engine.embed(chunks)
+        seconds = time.perf_counter() - start_time
+        engine.shutdown()
+
+        print(f"{workers:>7} | {engine.threads or 'auto':>7} | {batch_size:>5} | {str(bucketing):>9} | "
+              f"{CHUNK_COUNT / seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    run_benchmark()
@@ -0,0 +1,123 @@
+"""
+Benchmark dense-only vs hybrid (dense + sparse, RRF) retrieval against a running Qdrant instance.
+
+Builds a synthetic corpus of support-style chunks that each mention a unique part number
+or error code, then asks one question per identifier. A query is a hit when the chunk
+holding its identifier is in the top-k results. Reports recall@k and p50/p95 latency.
+
+Run from the project root:
+    python -m benchmarks.hybrid_search_benchmark
+"""
+
+import asyncio
+import logging
+import random
+import string
+import sys
+import time
+import uuid
+import numpy as np
+from qdrant_client.http import models
+
+from vector_db.embedding_manager import EmbeddingManager
+from vector_db.qdrant_manager import QdrantManager, SPARSE_VECTOR_NAME
+from config import QDRANT_HOST, QDRANT_PORT, SPARSE_EMBEDDING_MODEL_ID
+
+COLLECTION_NAME = "bench_hybrid_search"
+CORPUS_SIZE = 2000
+QUERY_COUNT = 200
+TOP_K = 5
+UPSERT_BATCH = 256
+USER_ID = "bench_user"
+THREAD_ID = "bench_thread"
+
+TEMPLATES = [
+    "If the controller reports {code}, power-cycle the unit and check the sensor cable for damage.",
+    "Replacement part {code} fits all models shipped after 2021 and requires no firmware update.",
+    "Contact {name} in procurement before ordering {code}, lead times are currently six weeks.",
+    "Error {code} indicates the hydraulic pressure dropped below the safe operating threshold.",
+    "The warranty does not cover damage caused by installing {code} without a certified technician.",
+]
+NAMES = ["Okonkwo", "Lindqvist", "Takahashi", "Fernandes", "Kowalczyk", "Abernathy", "Nakamura"]
+
+
+def random_code(rng: random.Random) -> str:
+    letters = "".join(rng.choices(string.ascii_uppercase, k=2))
+    return f"{letters}-{rng.randint(1000, 9999)}-{rng.choice(string.ascii_uppercase)}"
+
+
+def build_corpus(rng: random.Random):
+    chunks, codes = [], []
+    for _ in range(CORPUS_SIZE):
+        code = random_code(rng)
+        text = rng.choice(TEMPLATES).format(code=code, name=rng.choice(NAMES))
+        chunks.append(text)
+        codes.append(code)
+    return chunks, codes
+
+
+async def seed_corpus(manager: QdrantManager, embedding_manager: EmbeddingManager, chunks, ids):
+    sparse_model = embedding_manager.sparse_embeddings
+    for start in range(0, len(chunks), UPSERT_BATCH):
+        batch = chunks[start:start + UPSERT_BATCH]
+        dense_vectors = embedding_manager.embed_documents(batch)
+        sparse_vectors = sparse_model.embed_documents(batch)
+        await manager.client.upsert(
+            collection_name=manager.collection_name,
+            points=[
+                models.PointStruct(
+                    id=point_id,
+                    vector={
+                        "": dense,
+                        SPARSE_VECTOR_NAME: models.SparseVector(indices=sparse.indices, values=sparse.values)
+                    },
+                    payload={
+                        "page_content": text,
+                        "metadata": {"user_id": USER_ID, "thread_id": THREAD_ID}
+                    }
+                )
+                for point_id, text, dense, sparse in zip(ids[start:start + UPSERT_BATCH], batch, dense_vectors, sparse_vectors)
+            ]
+        )
+
+
+async def evaluate(manager: QdrantManager, embedding_manager: EmbeddingManager, queries, expected_ids, hybrid: bool):
+    latencies, hits = [], 0
+    for query, expected_id in zip(queries, expected_ids):
+        start_time = time.perf_counter()
+        dense_vector = embedding_manager.embed_queries([query])[0]
+        sparse_vector = embedding_manager.embed_sparse_queries([query])[0] if hybrid else None
+        points = await manager.search(dense_vector, USER_ID, THREAD_ID, limit=TOP_K, sparse_vector=sparse_vector)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        hits += any(point.id == expected_id for point in points)
+    return hits / len(queries), np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+async def run_benchmark():
+    rng = random.Random(42)
+    embedding_manager = EmbeddingManager("fastembed", sparse_model_id=SPARSE_EMBEDDING_MODEL_ID)
+    manager = QdrantManager(QDRANT_HOST, QDRANT_PORT, COLLECTION_NAME)
+    await manager.create_collection(embedding_manager.get_embedding_dimension(), force_recreate=True, with_sparse=True)
+
+    chunks, codes = build_corpus(rng)
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    logging.info(f"Seeding {len(chunks)} synthetic chunks...")
+    await seed_corpus(manager, embedding_manager, chunks, ids)
+
+    sample = rng.sample(range(len(chunks)), QUERY_COUNT)
+    queries = [f"What should I know about {codes[i]}?" for i in sample]
+    expected_ids = [ids[i] for i in sample]
+
+    print(f"\n{'mode':>7} | {'recall@' + str(TOP_K):>9} | {'p50 ms':>8} | {'p95 ms':>8}")
+    print("-" * 42)
+    for hybrid in (False, True):
+        recall, p50, p95 = await evaluate(manager, embedding_manager, queries, expected_ids, hybrid)
+        print(f"{'hybrid' if hybrid else 'dense':>7} | {recall:>9.3f} | {p50:>8.2f} | {p95:>8.2f}")
+
+    await manager.delete_collection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    asyncio.run(run_benchmark())
@@ -0,0 +1,143 @@
+"""
+Benchmark PDF ingestion: Unstructured (the previous path) vs the text-layer fast path.
+
+Writes a corpus of born-digital PDFs (real text layer, Helvetica, no images), then loads
+and splits every file three ways:
+  - unstructured: UnstructuredPDFLoader(mode="single") + splitter, as before
+  - serial:       text layer page by page in this process
+  - parallel:     text layer through ParsingPool, page groups spread across workers
+Reports pages/s and chunks for each.
+
+Run from the project root:
+    python -m benchmarks.pdf_ingest_benchmark
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from langchain_community.document_loaders import UnstructuredPDFLoader
+
+from vector_db.document_processor import DocumentProcessor
+from vector_db.parsing_pool import ParsingPool
+
+FILE_COUNT = 8
+PAGES_PER_FILE = 60
+LINES_PER_PAGE = 45
+USER_ID = "bench_user"
+THREAD_ID = "bench_thread"
+
+VOCABULARY = (
+    "invoice shipment warranty contract clause payment supplier delivery schedule quarterly "
+    "revenue forecast budget compliance audit policy employee onboarding security incident "
+    "report customer ticket escalation release roadmap migration database latency throughput"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages):
+    """Write a minimal PDF 1.4 with one Helvetica text stream per page."""
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count))
+         + f"] /Count {page_count} >>").encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        content = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>").encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode())
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def write_corpus(directory: str, rng: random.Random):
+    file_paths = []
+    for i in range(FILE_COUNT):
+        pages = [
+            [" ".join(rng.choices(VOCABULARY, k=12)).capitalize() + "." for _ in range(LINES_PER_PAGE)]
+            for _ in range(PAGES_PER_FILE)
+        ]
+        file_path = os.path.join(directory, f"report_{i}.pdf")
+        write_pdf(file_path, pages)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def unstructured_chunks(processor: DocumentProcessor, file_path: str) -> int:
+    loader = UnstructuredPDFLoader(file_path, mode="single")
+    return sum(1 for _ in processor._split_text_stream(doc.page_content for doc in loader.lazy_load()))
+
+
+def serial_chunks(processor: DocumentProcessor, file_path: str) -> int:
+    return sum(len(batch) for batch in processor.iter_document_batches(file_path, USER_ID, THREAD_ID))
+
+
+async def parallel_chunks(pool: ParsingPool, file_paths) -> int:
+    async def parse(file_path: str) -> int:
+        return sum([len(batch) async for batch in pool.iter_document_batches(file_path, USER_ID, THREAD_ID)])
+    return sum(await asyncio.gather(*[parse(file_path) for file_path in file_paths]))
+
+
+def report(label: str, seconds: float, chunks):
+    pages = FILE_COUNT * PAGES_PER_FILE
+    print(f"{label:>12} | {pages / seconds:>8.1f} | {seconds:>8.2f} | {chunks:>7}")
+
+
+def run_benchmark():
+    processor = DocumentProcessor()
+    pool = ParsingPool()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_paths = write_corpus(temp_dir, random.Random(42))
+
+        # Start the workers outside the timed run
+        asyncio.run(parallel_chunks(pool, file_paths[:1]))
+
+        print(f"\n{FILE_COUNT} PDFs x {PAGES_PER_FILE} pages, {pool.max_workers} parser workers")
+        print(f"{'path':>12} | {'pages/s':>8} | {'seconds':>8} | {'chunks':>7}")
+        print("-" * 46)
+
+        start_time = time.perf_counter()
+        try:
+            chunks = sum(unstructured_chunks(processor, file_path) for file_path in file_paths)
+            report("unstructured", time.perf_counter() - start_time, chunks)
+        except Exception as e:
+            logging.warning(f"Unstructured path failed: {e}")
+            print(f"{'unstructured':>12} | {'failed':>8} |")
+
+        start_time = time.perf_counter()
+        chunks = sum(serial_chunks(processor, file_path) for file_path in file_paths)
+        report("serial", time.perf_counter() - start_time, chunks)
+
+        start_time = time.perf_counter()
+        chunks = asyncio.run(parallel_chunks(pool, file_paths))
+        report("parallel", time.perf_counter() - start_time, chunks)
+
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    run_benchmark()
@@ -0,0 +1,111 @@
+"""
+Benchmark the memory/latency/recall trade-off of vector storage options against a running Qdrant instance.
+
+For each configuration a scratch collection is filled with the same synthetic corpus
+(clustered, normalized 768-d vectors). Recall@k is measured against exact (brute-force)
+search on the unquantized collection. Vector RAM is estimated from the storage layout:
+float32 originals unless they are on disk, plus the quantized copy kept in RAM.
+
+Run from the project root:
+    python -m benchmarks.quantization_benchmark
+"""
+
+import asyncio
+import logging
+import sys
+import time
+import numpy as np
+from qdrant_client.http import models
+
+from vector_db.qdrant_manager import QdrantManager
+from config import QDRANT_HOST, QDRANT_PORT
+
+VECTOR_SIZE = 768
+CORPUS_SIZE = 50000
+CLUSTERS = 200
+QUERY_COUNT = 200
+TOP_K = 10
+UPSERT_BATCH = 1000
+USER_ID = "bench_user"
+THREAD_ID = "bench_thread"
+
+# (label, quantization, vectors on disk, oversampling, rescore)
+CONFIGURATIONS = [
+    ("float32 in RAM", None, False, None, True),
+    ("float32 on disk", None, True, None, True),
+    ("int8", "scalar", False, None, True),
+    ("int8 + disk, os=2", "scalar", True, 2.0, True),
+    ("int8, no rescore", "scalar", False, None, False),
+    ("binary", "binary", False, None, True),
+    ("binary + disk, os=3", "binary", True, 3.0, True),
+    ("binary, no rescore", "binary", False, None, False),
+]
+
+
+def synthetic_corpus(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Clustered vectors look more like real embeddings than isotropic noise."""
+    centroids = rng.standard_normal((CLUSTERS, VECTOR_SIZE)).astype(np.float32)
+    vectors = centroids[rng.integers(0, CLUSTERS, count)] + 0.5 * rng.standard_normal((count, VECTOR_SIZE)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimated_vector_ram_mb(quantization, on_disk: bool) -> float:
+    per_vector = 0 if on_disk else VECTOR_SIZE * 4
+    if quantization == "scalar":
+        per_vector += VECTOR_SIZE
+    elif quantization == "binary":
+        per_vector += VECTOR_SIZE / 8
+    return CORPUS_SIZE * per_vector / (1024 * 1024)
+
+
+async def seed(manager: QdrantManager, corpus: np.ndarray):
+    for start in range(0, len(corpus), UPSERT_BATCH):
+        await manager.client.upsert(
+            collection_name=manager.collection_name,
+            points=[
+                models.PointStruct(
+                    id=start + i,
+                    vector=vector.tolist(),
+                    payload={"metadata": {"user_id": USER_ID, "thread_id": THREAD_ID}}
+                )
+                for i, vector in enumerate(corpus[start:start + UPSERT_BATCH])
+            ]
+        )
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray):
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:TOP_K].tolist()) for row in scores]
+
+
+async def run_benchmark():
+    rng = np.random.default_rng(42)
+    corpus = synthetic_corpus(rng, CORPUS_SIZE)
+    queries = synthetic_corpus(rng, QUERY_COUNT)
+    ground_truth = exact_top_k(corpus, queries)
+
+    print(f"\n{'configuration':>22} | {'vector RAM MB':>13} | {'p50 ms':>8} | {'p95 ms':>8} | {'recall@' + str(TOP_K):>9}")
+    print("-" * 74)
+    for label, quantization, on_disk, oversampling, rescore in CONFIGURATIONS:
+        manager = QdrantManager(QDRANT_HOST, QDRANT_PORT, "bench_quantization")
+        await manager.create_collection(VECTOR_SIZE, force_recreate=True, quantization=quantization, on_disk=on_disk)
+        logging.info(f"Seeding {CORPUS_SIZE} vectors for '{label}'...")
+        await seed(manager, corpus)
+
+        latencies, recall = [], 0.0
+        for query, expected in zip(queries, ground_truth):
+            start_time = time.perf_counter()
+            points = await manager.search(query.tolist(), USER_ID, THREAD_ID, limit=TOP_K,
+                                          oversampling=oversampling, rescore=rescore)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            recall += len(expected & {point.id for point in points}) / TOP_K
+
+        print(f"{label:>22} | {estimated_vector_ram_mb(quantization, on_disk):>13.1f} | "
+              f"{np.percentile(latencies, 50):>8.2f} | {np.percentile(latencies, 95):>8.2f} | {recall / QUERY_COUNT:>9.3f}")
+        await manager.delete_collection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    asyncio.run(run_benchmark())
@@ -0,0 +1,77 @@
+"""
+Benchmark re-attaching files that are already indexed in another thread.
+
+A set of synthetic text files is indexed into a first thread (parse + split + embed + upsert),
+then the same files are attached to a second thread, which copies the stored vectors instead
+of re-embedding them. Reports wall time, chunks and the speedup of the re-attach.
+
+Run from the project root:
+    python -m benchmarks.reattach_benchmark
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from vector_db.document_indexer import DocumentIndexer
+from config import QDRANT_HOST, QDRANT_PORT, VECTOR_BACKEND
+
+COLLECTION_NAME = "bench_reattach"
+FILE_COUNT = 10
+WORDS_PER_FILE = 20000
+USER_ID = "bench_user"
+
+VOCABULARY = (
+    "invoice shipment warranty contract clause payment supplier delivery schedule quarterly "
+    "revenue forecast budget compliance audit policy employee onboarding security incident "
+    "report customer ticket escalation release roadmap migration database latency throughput"
+).split()
+
+
+def write_corpus(directory: str, rng: random.Random):
+    file_paths = []
+    for i in range(FILE_COUNT):
+        words = [rng.choice(VOCABULARY) for _ in range(WORDS_PER_FILE)]
+        # Break into sentences and paragraphs so the splitter behaves like on real text
+        sentences = [" ".join(words[j:j + 15]).capitalize() + "." for j in range(0, len(words), 15)]
+        paragraphs = ["\n".join(sentences[j:j + 8]) for j in range(0, len(sentences), 8)]
+        file_path = os.path.join(directory, f"document_{i}.txt")
+        with open(file_path, "w") as f:
+            f.write(f"Document {i}\n\n" + "\n\n".join(paragraphs))
+        file_paths.append(file_path)
+    return file_paths
+
+
+async def timed_index(indexer: DocumentIndexer, file_paths, thread_id: str):
+    start_time = time.perf_counter()
+    result = await indexer.index_documents(file_paths, USER_ID, thread_id)
+    return time.perf_counter() - start_time, result["indexed_count"]
+
+
+async def run_benchmark():
+    indexer = DocumentIndexer(QDRANT_HOST, QDRANT_PORT, COLLECTION_NAME, force_recreate=True, backend=VECTOR_BACKEND)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_paths = write_corpus(temp_dir, random.Random(42))
+        logging.info(f"Indexing {len(file_paths)} files into the first thread...")
+        cold_seconds, cold_chunks = await timed_index(indexer, file_paths, "bench_thread_a")
+        logging.info("Re-attaching the same files to a second thread...")
+        reattach_seconds, reattach_chunks = await timed_index(indexer, file_paths, "bench_thread_b")
+
+    print(f"\n{'run':>10} | {'chunks':>7} | {'seconds':>8} | {'chunks/s':>9}")
+    print("-" * 44)
+    print(f"{'cold':>10} | {cold_chunks:>7} | {cold_seconds:>8.2f} | {cold_chunks / cold_seconds:>9.1f}")
+    print(f"{'re-attach':>10} | {reattach_chunks:>7} | {reattach_seconds:>8.2f} | {reattach_chunks / reattach_seconds:>9.1f}")
+    print(f"\nRe-attach speedup: {cold_seconds / reattach_seconds:.1f}x")
+
+    await indexer.vector_backend.delete_collection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    asyncio.run(run_benchmark())
@@ -0,0 +1,106 @@
+"""
+Benchmark tenant-scoped search latency against a running Qdrant instance.
+
+Seeds a scratch collection with synthetic vectors for tenants of different sizes
+next to a large pool of other tenants' points, then compares:
+- filtered: the tenant filter is sent with the query (current DocumentIndexer.search)
+- post-filter: global top-k followed by client-side user/thread matching (old behaviour)
+
+Run from the project root:
+    python -m benchmarks.tenant_search_benchmark
+"""
+
+import asyncio
+import logging
+import sys
+import time
+import uuid
+import numpy as np
+from qdrant_client.http import models
+
+from vector_db.qdrant_manager import QdrantManager
+from config import QDRANT_HOST, QDRANT_PORT
+
+COLLECTION_NAME = "bench_tenant_search"
+VECTOR_SIZE = 768
+TENANT_SIZES = [10, 100, 1000, 10000]
+NOISE_POINTS = 50000
+QUERIES_PER_TENANT = 50
+TOP_K = 10
+UPSERT_BATCH = 1000
+
+
+def random_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, VECTOR_SIZE)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def seed_points(manager: QdrantManager, vectors: np.ndarray, user_id: str, thread_id: str):
+    for start in range(0, len(vectors), UPSERT_BATCH):
+        batch = vectors[start:start + UPSERT_BATCH]
+        await manager.client.upsert(
+            collection_name=manager.collection_name,
+            points=[
+                models.PointStruct(
+                    id=uuid.uuid4().hex,
+                    vector=vector.tolist(),
+                    payload={
+                        "page_content": "",
+                        "metadata": {"user_id": user_id, "thread_id": thread_id}
+                    }
+                )
+                for vector in batch
+            ]
+        )
+
+
+async def time_queries(manager: QdrantManager, queries: np.ndarray, user_id: str, thread_id: str, filtered: bool):
+    latencies, hits = [], 0
+    for query in queries:
+        start_time = time.perf_counter()
+        response = await manager.client.query_points(
+            collection_name=manager.collection_name,
+            query=query.tolist(),
+            query_filter=manager.tenant_filter(user_id, thread_id) if filtered else None,
+            limit=TOP_K if filtered else min(TOP_K * 2, 30),
+            with_payload=True
+        )
+        points = response.points
+        if not filtered:
+            points = [
+                p for p in points
+                if p.payload["metadata"]["user_id"] == user_id and p.payload["metadata"]["thread_id"] == thread_id
+            ][:TOP_K]
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        hits += len(points)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), hits / len(queries)
+
+
+async def run_benchmark():
+    rng = np.random.default_rng(42)
+    manager = QdrantManager(QDRANT_HOST, QDRANT_PORT, COLLECTION_NAME)
+    await manager.create_collection(VECTOR_SIZE, force_recreate=True)
+
+    logging.info(f"Seeding {NOISE_POINTS} noise points across other tenants...")
+    for i in range(10):
+        await seed_points(manager, random_vectors(rng, NOISE_POINTS // 10), f"noise_user_{i}", "noise_thread")
+
+    for size in TENANT_SIZES:
+        await seed_points(manager, random_vectors(rng, size), f"user_{size}", "thread")
+
+    print(f"\n{'tenant size':>12} | {'mode':>11} | {'p50 ms':>8} | {'p95 ms':>8} | {'avg hits':>8}")
+    print("-" * 60)
+    for size in TENANT_SIZES:
+        queries = random_vectors(rng, QUERIES_PER_TENANT)
+        for filtered in (True, False):
+            p50, p95, avg_hits = await time_queries(manager, queries, f"user_{size}", "thread", filtered)
+            mode = "filtered" if filtered else "post-filter"
+            print(f"{size:>12} | {mode:>11} | {p50:>8.2f} | {p95:>8.2f} | {avg_hits:>8.1f}")
+
+    await manager.delete_collection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    asyncio.run(run_benchmark())
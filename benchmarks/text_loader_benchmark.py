@@ -0,0 +1,125 @@
+"""
+Benchmark the streaming text reader against TextLoader for plain-text and code files.
+
+Synthetic prose (.txt), source code (.py) and a non-UTF-8 (cp1252) text file are loaded
+and split into chunks, once through TextLoader (full-file read, encoding autodetection)
+and once through the memory-mapped streaming reader. Reports throughput in MB/s, peak
+Python memory while splitting and how many chunks differ between the two paths.
+
+Run from the project root:
+    python -m benchmarks.text_loader_benchmark
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from langchain_community.document_loaders import TextLoader
+
+from vector_db.document_processor import DocumentProcessor
+
+FILE_MB = 32
+REPEATS = 3
+
+VOCABULARY = (
+    "invoice shipment warranty contract clause payment supplier delivery schedule quarterly "
+    "revenue forecast budget compliance audit policy employee onboarding security incident "
+    "report customer ticket escalation release roadmap migration database latency throughput"
+).split()
+ACCENTED = "café naïve façade déjà reçu élève".split()
+
+
+def write_prose(path: str, rng: random.Random, vocabulary, encoding: str = "utf-8"):
+    with open(path, "w", encoding=encoding) as f:
+        written = 0
+        while written < FILE_MB * 1024 * 1024:
+            sentences = [" ".join(rng.choices(vocabulary, k=15)).capitalize() + "." for _ in range(8)]
+            paragraph = "\n".join(sentences) + "\n\n"
+            written += f.write(paragraph)
+
+
+def write_code(path: str, rng: random.Random):
+    with open(path, "w") as f:
+        written = 0
+        function_number = 0
+        while written < FILE_MB * 1024 * 1024:
+            function_number += 1
+            body = "\n".join(
+                f"    {rng.choice(VOCABULARY)}_{i} = compute({', '.join(rng.choices(VOCABULARY, k=6))})"
+                for i in range(rng.randint(5, 30))
+            )
+            written += f.write(f"def handler_{function_number}(request):\n{body}\n    return None\n\n\n")
+
+
+def loader_chunks(processor: DocumentProcessor, path: str):
+    text_parts = (doc.page_content for doc in TextLoader(path, encoding="utf-8", autodetect_encoding=True).lazy_load())
+    return processor._split_text_stream(text_parts)
+
+
+def streaming_chunks(processor: DocumentProcessor, path: str):
+    return processor._split_text_stream(processor._read_text_stream(path), "")
+
+
+def measure(load, processor: DocumentProcessor, path: str):
+    """Best-of-REPEATS wall time, peak traced memory and the chunks. Chunks are not kept while
+    timing or tracing, so the peak is the working set of loading and splitting alone."""
+    seconds = []
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        for _ in load(processor, path):
+            pass
+        seconds.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    for _ in load(processor, path):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), peak, list(load(processor, path))
+
+
+def run_benchmark():
+    processor = DocumentProcessor()
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = [
+            ("prose .txt", os.path.join(temp_dir, "prose.txt")),
+            ("code .py", os.path.join(temp_dir, "module.py")),
+            ("cp1252 .txt", os.path.join(temp_dir, "legacy.txt")),
+        ]
+        write_prose(files[0][1], rng, VOCABULARY)
+        write_code(files[1][1], rng)
+        write_prose(files[2][1], rng, VOCABULARY + ACCENTED, encoding="cp1252")
+
+        print(f"\n{'file':>12} | {'path':>9} | {'MB/s':>7} | {'peak MB':>8} | {'chunks':>7} | {'differ':>6}")
+        print("-" * 65)
+        for label, path in files:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            streaming_seconds, streaming_peak, streaming_result = measure(streaming_chunks, processor, path)
+            try:
+                loader_seconds, loader_peak, loader_result = measure(loader_chunks, processor, path)
+            except Exception as e:
+                # TextLoader needs chardet to autodetect non-UTF-8 files
+                logging.warning(f"TextLoader failed on {label}: {e}")
+                loader_result = None
+
+            if loader_result is not None:
+                differ = len(set(loader_result) ^ set(streaming_result))
+                print(f"{label:>12} | {'loader':>9} | {size_mb / loader_seconds:>7.1f} | "
+                      f"{loader_peak / 1e6:>8.1f} | {len(loader_result):>7} | {'':>6}")
+            else:
+                differ = "n/a"
+                print(f"{label:>12} | {'loader':>9} | {'failed':>7} | {'':>8} | {'':>7} | {'':>6}")
+            print(f"{label:>12} | {'streaming':>9} | {size_mb / streaming_seconds:>7.1f} | "
+                  f"{streaming_peak / 1e6:>8.1f} | {len(streaming_result):>7} | {differ:>6}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    run_benchmark()
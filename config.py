@@ -1,8 +1,51 @@
+# Vector backend: "qdrant" (server) or "local" (in-process, persisted under CACHE_DIR)
+VECTOR_BACKEND = "qdrant"
+
 # Qdrant Configuration
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6334
 QDRANT_COLLECTION = "attachments"
 
+# Vector storage configuration (applied when the collection is created)
+QUANTIZATION = None  # None, "scalar" (int8, ~4x less RAM) or "binary" (1-bit, ~32x less RAM)
+VECTORS_ON_DISK = False  # Memory-map full-precision vectors, keep only quantized ones in RAM
+PAYLOAD_ON_DISK = None  # None keeps the Qdrant server default
+HNSW_M = 16
+HNSW_EF_CONSTRUCT = 100
+
+# Quantized search: fetch top_k * oversampling candidates, then rescore with original vectors
+SEARCH_OVERSAMPLING = None  # e.g. 2.0 for scalar, 3.0 for binary
+SEARCH_RESCORE = True
+
+# Document parsing runs in worker processes so large files never block the event loop
+PARSER_WORKERS = None  # None uses one worker per CPU core
+PARSE_TIMEOUT_SECONDS = 300  # Per file, parsing and splitting included
+PARSER_MEMORY_LIMIT_MB = None  # Virtual address-space cap per worker process. ONNX/torch OCR and layout models reserve far more than they use, so set it well above their footprint
+PARSE_QUEUE_BATCHES = 2  # Chunk batches a worker may produce ahead of the indexer, per file
+
+# Ingestion pipeline: chunks flow parse -> embed -> upsert in fixed-size batches over bounded queues
+INDEX_BATCH_SIZE = 64
+INDEX_QUEUE_BATCHES = 4  # Batches buffered between stages, bounds ingestion memory
+INDEX_JOB_WORKERS = 2  # Background indexing jobs run concurrently
+INDEX_JOB_LEASE_SECONDS = 60  # A running job whose owner has not heartbeated for this long is failed as interrupted
+INDEX_UPDATE_BY_FILENAME = False  # Default of the per-request update flag: a file name already in the thread is replaced, re-embedding only changed chunks
+INDEX_UPSERT_RETRIES = 2  # Retries per failed upsert batch, safe because point ids are deterministic
+
+# Uploads are streamed to disk in large chunks and hashed while they are written
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+UPLOAD_MAX_FILE_MB = 200  # Larger files are rejected with 413
+UPLOAD_MAX_CONCURRENT = 8  # Uploads written at once, more are rejected with 429
+
+# Threads per class of blocking work, so one class never queues behind another.
+# LLM calls and web searches are native async and use none of these.
+EXECUTOR_WORKERS = {
+    "embedding": 4,  # Query and document embedding
+    "storage": 4,  # Local vector backend reads and writes
+    "files": 8,  # Upload writes and file hashing
+    "rerank": 2,  # Cross-encoder scoring, when no model server is configured
+    "parsing": 16,  # Waiting on document parsing workers' results, one thread per file in flight
+}
+
 # Cache and search configuration
 CACHE_DIR = "./cache"
 RERANK_THRESHOLD = 0.1
@@ -14,6 +57,28 @@ USER_ID = "test_user"
 MODEL_ID = "llama-3.3-70b-versatile"
 UTILS_MODEL_ID = "llama3-8b-8192"
 
+# LLM scheduler: per-model request and token budgets (set them to your provider plan's limits).
+# Calls queue in priority lanes: interactive (answers), then utility (decompose/evaluate), then background (summaries).
+LLM_RATE_LIMITS = {
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12_000},
+    "llama3-8b-8192": {"rpm": 30, "tpm": 30_000},
+}
+LLM_DEFAULT_RATE_LIMIT = {"rpm": 30, "tpm": 6_000}  # Models not listed above
+LLM_DEADLINE_SECONDS = {"interactive": 60, "utility": 20, "background": 300}  # Give up when a call cannot start in time
+LLM_COMPLETION_TOKENS_ESTIMATE = 512  # Reserved per call until the provider reports actual usage
+
+# Cache for utility LLM responses (decompose, evaluate). The exact tier is keyed by model, prompt and inputs;
+# the semantic tier reuses responses to similar queries within one (user, thread, document set) only
+RESPONSE_CACHE = True
+RESPONSE_CACHE_MAX_ENTRIES = 5_000  # LRU bound per tier
+RESPONSE_CACHE_TTL_SECONDS = 3600
+RESPONSE_CACHE_SEMANTIC = False  # Embeds every cached query with EMBEDDING_MODEL_ID
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = 0.95  # Cosine similarity needed to reuse a response
+
+# Single short questions (no conjunctions, no pronouns needing history) skip the decompose LLM call
+DECOMPOSE_FAST_PATH = True
+FAST_PATH_MAX_WORDS = 20
+
 # Embedding model configuration 
 # BAAI/bge-small-en-v1.5
 # BAAI/bge-m3
@@ -22,7 +87,32 @@ UTILS_MODEL_ID = "llama3-8b-8192"
 # jinaai/jina-embeddings-v2-base-en
 EMBEDDING_MODEL_ID = "BAAI/bge-base-en-v1.5"
 
+# Document embedding engine (FastEmbed only): ONNX batch size, intra-op threads per session and
+# worker processes each owning a session. Batches are sorted by text length to cut padding.
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_THREADS = None  # None: ONNX Runtime default in-process, cores split evenly across workers
+EMBEDDING_WORKERS = 0  # 0 embeds in-process
+EMBEDDING_LENGTH_BUCKETING = True
+
+# Persistent chunk embedding cache under CACHE_DIR, keyed by model and chunk content hash
+EMBEDDING_CACHE = True
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000  # LRU bound, ~600 MB of float32 vectors at 768 dimensions
+
+# Sparse embedding model for hybrid (dense + sparse) search
+# Qdrant/bm25
+# prithivida/Splade_PP_en_v1
+SPARSE_EMBEDDING_MODEL_ID = "Qdrant/bm25"
+HYBRID_SEARCH = False  # Requires recreating the collection with a sparse vector
+
 RERANK_MODEL = "Xenova/ms-marco-MiniLM-L-12-v2"
+RERANK_CANDIDATES = 20  # Chunks retrieved per task before re-ranking
+RERANK_TOP_N = 5  # Chunks kept per task after re-ranking
+
+# Shared model server: one process owns the embedding and rerank models for all uvicorn workers
+# (start it with `python -m vector_db.model_server`). Concurrent requests are merged into one model call.
+MODEL_SERVER_SOCKET = None  # Unix socket path, e.g. "/tmp/abundance-models.sock"; None loads models per worker
+MODEL_SERVER_MAX_BATCH = 256  # Texts or pairs merged into one model call
+MODEL_SERVER_MAX_WAIT_MS = 5  # How long the first request of a batch waits for others
 
 SUMMARY_THRESHOLD = 8
 MESSAGES_TO_RETAIN = 4
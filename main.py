@@ -7,13 +7,14 @@ from config import THREAD_ID, USER_ID, SUMMARY_THRESHOLD, UTILS_MODEL_ID
 from utils.checkpointer import checkpointer, delete_thread_sync
 from services.summarizer import SummarizerNode
 from langchain_groq import ChatGroq
+from utils.llm_scheduler import ScheduledChatModel
 from models.state import State
 import os
 
 os.environ["ANONYMIZED_TELEMETRY"] = "false"
 os.environ['FASTEMBED_CACHE_PATH'] = 'cache'
 
-utils_model = ChatGroq(model=UTILS_MODEL_ID)
+utils_model = ScheduledChatModel(model=ChatGroq(model=UTILS_MODEL_ID), priority="background")
 summarizer = SummarizerNode(llm=utils_model)
 
 # MODIFICATION: The function now accepts the 'graph' object
@@ -1,4 +1,5 @@
 import asyncio
+from typing import Optional
 from config import (
     PROMPT_NO_SUMMARY_NO_CONTENT,
     PROMPT_SUMMARY_ONLY,
@@ -7,6 +8,7 @@ from config import (
 )
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
 from models.state import State
 
 def get_prompt_template(state: State) -> str:
@@ -26,7 +28,7 @@ class CallModelNode:
     def __init__(self, model: BaseChatModel):
         self.model = model
     
-    async def invoke(self, state: State):
+    async def invoke(self, state: State, config: Optional[RunnableConfig] = None):
         user_query = state.get("user_query", "")
         final_context = state.get("final_context", "")
         recent_messages = state.get("recent_messages", [])
@@ -40,12 +42,10 @@ class CallModelNode:
             HumanMessage(content=f"User Query: {user_query}\n\n{final_context.strip()}")
         )
         
-        # Run the model call in a thread pool since it's sync
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None, 
-            self.model.invoke, 
-            [SystemMessage(content=get_prompt_template(state))] + recent_messages
+        # The node's config carries LangGraph's callbacks, so graph.astream(stream_mode="messages") receives the tokens
+        response = await self.model.ainvoke(
+            [SystemMessage(content=get_prompt_template(state))] + recent_messages,
+            config
         )
         return {"recent_messages": [response], "tasks": [], "web_search_results": [], "retrieved_docs": []}
 
@@ -72,16 +72,9 @@ class CallModelNode:
         
         # Stream the response
         try:
-            # Use the model's stream method if available
-            if hasattr(self.model, 'astream'):
-                async for chunk in self.model.astream(messages):
-                    if hasattr(chunk, 'content') and chunk.content:
-                        yield chunk.content
-            else:
-                # Fallback to regular invoke
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, self.model.invoke, messages)
-                yield response.content
+            async for chunk in self.model.astream(messages):
+                if hasattr(chunk, 'content') and chunk.content:
+                    yield chunk.content
         except Exception as e:
             yield f"Error generating response: {str(e)}"
 
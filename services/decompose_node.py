@@ -7,6 +7,7 @@ from langchain_core.messages import BaseMessage
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 from models.state import State
+from utils.response_cache import get_response_cache, fingerprint, model_identity
 
 class DecomposedTasks(BaseModel):
     """The Pydantic schema for the output."""
@@ -56,6 +57,7 @@ class DecomposeNode:
                 ),
             ]
         )
+        self._prompt_repr = self.prompt.pretty_repr()
 
     async def invoke(self, state: State):
         recent_messages = state.get("recent_messages", [])
@@ -72,10 +74,16 @@ class DecomposeNode:
 
         print("---DECOMPOSING TASK---")
         chain = self.prompt | self.llm | self.output_parser
+        inputs = {"history": history_str, "query": last_user_message}
         try:
-            # Run the chain in a thread pool since it's sync
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, chain.invoke, {"history": history_str, "query": last_user_message})
+            # Repeated questions (e.g. the same FAQ from many users) skip the LLM round trip
+            response = await get_response_cache().get_or_compute(
+                "decompose",
+                (model_identity(self.llm), self._prompt_repr, inputs),
+                lambda: chain.ainvoke(inputs),
+                semantic_text=last_user_message,
+                scope=(state.get("user_id"), state.get("thread_id"), fingerprint([history_str]))
+            )
             # The JsonOutputParser will return a dictionary
             return {"tasks": response.get("tasks", [last_user_message])}
         except json.JSONDecodeError as e:
@@ -1,5 +1,6 @@
 import asyncio
 from models.state import State
+from utils.response_cache import get_response_cache, fingerprint, model_identity
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers.string import StrOutputParser
@@ -32,6 +33,7 @@ class EvaluatorNode:
             ]
         )
         self.chain = self.prompt | self.llm | StrOutputParser()
+        self._prompt_repr = self.prompt.pretty_repr()
 
     async def invoke(self, state: State):
         retrieved_docs = state.get("retrieved_docs", [])
@@ -53,12 +55,14 @@ class EvaluatorNode:
             # Combine the content of all docs for the task
             combined_context = "\n-----\n".join([doc.page_content for doc in docs])
 
-            # Run the LLM call in a thread pool since it's sync
-            loop = asyncio.get_event_loop()
-            rewritten_content = await loop.run_in_executor(None, self.chain.invoke, {
-                "task": task,
-                "context": combined_context
-            })
+            # The same task over the same chunks is rewritten once
+            rewritten_content = await get_response_cache().get_or_compute(
+                "evaluate",
+                (model_identity(self.llm), self._prompt_repr, task, combined_context),
+                lambda: self.chain.ainvoke({"task": task, "context": combined_context}),
+                semantic_text=task,
+                scope=(state.get("user_id"), state.get("thread_id"), fingerprint(doc.page_content for doc in docs))
+            )
 
             # Create a new Document with the rewritten content
             # and combined metadata from the first document in the group
@@ -0,0 +1,51 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List
+from models.state import State
+from langchain.schema import Document
+from vector_db import get_global_reranker
+from config import RERANK_THRESHOLD, RERANK_TOP_N
+
+class RerankNode:
+    async def invoke(self, state: State) -> Dict[str, List[Document]]:
+        """
+        Re-ranks retrieved chunks against their source task with a cross-encoder,
+        dropping chunks below RERANK_THRESHOLD and keeping the best RERANK_TOP_N per task.
+        """
+        retrieved_docs = state.get("retrieved_docs", [])
+        if not retrieved_docs:
+            return {"retrieved_docs": []}
+
+        print(f"---RE-RANKING {len(retrieved_docs)} CHUNKS---")
+        try:
+            # Score every (task, chunk) pair of the turn in one batched call
+            pairs = [(doc.metadata.get("source_task", ""), doc.page_content) for doc in retrieved_docs]
+            scores = await get_global_reranker().ascore_pairs(pairs)
+        except Exception as e:
+            print(f"Re-ranking failed, keeping top {RERANK_TOP_N} chunks per task: {e}")
+            return {"retrieved_docs": self._top_n_per_task(retrieved_docs)}
+
+        docs_by_task = defaultdict(list)
+        for doc, score in zip(retrieved_docs, scores):
+            if score < RERANK_THRESHOLD:
+                continue
+            doc.metadata["rerank_score"] = score
+            docs_by_task[doc.metadata.get("source_task")].append(doc)
+
+        reranked_docs: List[Document] = []
+        for docs in docs_by_task.values():
+            docs.sort(key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+            reranked_docs.extend(docs[:RERANK_TOP_N])
+
+        print(f"---KEPT {len(reranked_docs)}/{len(retrieved_docs)} CHUNKS AFTER RE-RANKING---")
+        return {"retrieved_docs": reranked_docs}
+
+    def _top_n_per_task(self, docs: List[Document]) -> List[Document]:
+        docs_by_task = defaultdict(list)
+        for doc in docs:
+            docs_by_task[doc.metadata.get("source_task")].append(doc)
+        return [doc for task_docs in docs_by_task.values() for doc in task_docs[:RERANK_TOP_N]]
+
+    # Sync wrapper for backward compatibility
+    def invoke_sync(self, state: State) -> Dict[str, List[Document]]:
+        return asyncio.run(self.invoke(state))
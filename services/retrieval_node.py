@@ -2,24 +2,13 @@ import asyncio
 from typing import Dict, List
 from models.state import State
 from vector_db.vector_service import VectorService
+from config import RERANK_CANDIDATES
 from langchain.schema import Document
 
 class RetrievalNode:
-    async def _retrieve_for_task(self, task: str, user_id: str, thread_id: str) -> List[Document]:
-        """Helper function to retrieve documents for a single task using a hybrid strategy."""
-        print(f"---STARTING RETRIEVAL FOR TASK: '{task}'---")
-        try:
-            retrieved_docs = await VectorService.retrieve_documents(query=task, user_id=user_id, thread_id=thread_id)
-            for doc in retrieved_docs:
-                doc.metadata["source_task"] = task
-            return retrieved_docs[:5]
-        except Exception as e:
-            print(f"Error retrieving documents for task '{task}': {e}")
-            return []
-
     async def invoke(self, state: State) -> Dict[str, List[Document]]:
         """
-        Retrieves documents for each task in parallel using async operations.
+        Retrieves documents for all tasks with a single batched search.
         """
         do_retrieval = state.get("do_retrieval", False)
         if not do_retrieval:
@@ -33,26 +22,24 @@ class RetrievalNode:
         if not tasks:
             return {"retrieved_docs": []}
 
-        print(f"---RETRIEVING IN PARALLEL FOR {len(tasks)} TASKS---")
+        print(f"---RETRIEVING IN ONE BATCH FOR {len(tasks)} TASKS---")
         
-        # Create async tasks for parallel retrieval
-        retrieval_tasks = [
-            self._retrieve_for_task(task, user_id, thread_id) for task in tasks
-        ]
-        
-        # Execute all retrieval tasks in parallel
-        all_doc_lists = await asyncio.gather(*retrieval_tasks, return_exceptions=True)
+        # One embedding call and one Qdrant batch request for all tasks of the turn
+        try:
+            # Retrieve a wide candidate set, the rerank node narrows it down per task
+            doc_lists = await VectorService.retrieve_documents_batch(
+                queries=tasks, user_id=user_id, thread_id=thread_id, top_k=RERANK_CANDIDATES
+            )
+        except Exception as e:
+            print(f"Batch retrieval failed for tasks {tasks}: {e}")
+            doc_lists = []
         
         all_docs: List[Document] = []
-        for i, result in enumerate(all_doc_lists):
-            if isinstance(result, Exception):
-                task_name = tasks[i]
-                print(f"Task '{task_name}' failed during retrieval: {result}")
-            elif isinstance(result, list):
-                # Safe to extend since we've confirmed it's a list
-                all_docs.extend(result)
+        for docs in doc_lists:
+            all_docs.extend(docs)
 
-        unique_docs = {doc.page_content: doc for doc in all_docs}.values()
+        # Dedupe within each task only: a chunk retrieved for two tasks is evidence for both
+        unique_docs = {(doc.metadata.get("source_task"), doc.page_content): doc for doc in all_docs}.values()
         print(f"---RETRIEVED {len(unique_docs)} UNIQUE DOCUMENTS FROM ALL TASKS---")
         return {"retrieved_docs": list(unique_docs)}
 
@@ -21,9 +21,7 @@ class SearchNode:
         """Perform a content search and return results."""
         print("---SEARCHING THE WEB---")
         try:
-            # Run the search in a thread pool since TavilySearch is sync
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(None, self.content_search.invoke, query)
+            results = await self.content_search.ainvoke(query)
             formatted_results = self._format_results(results.get("results", []))
             if formatted_results:
                 return formatted_results
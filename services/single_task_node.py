@@ -0,0 +1,54 @@
+import re
+import asyncio
+from models.state import State
+from config import FAST_PATH_MAX_WORDS
+
+# Joins what are probably separate questions, which DecomposeNode should split
+CONJUNCTION_PATTERN = re.compile(r"\b(and|also|or|plus|then|as well as|along with|versus|vs)\b|[;&]", re.IGNORECASE)
+# Refer back to the conversation, so the query must be rewritten with the history
+PRONOUN_PATTERN = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|him|his|she|her|there|above|previous|same|former|latter)\b",
+    re.IGNORECASE
+)
+# Instructions on where to look, which DecomposeNode strips from the task
+INSTRUCTION_PATTERN = re.compile(
+    r"\b(pdf|file|document|doc|attachment|attached|upload|uploaded|web|internet|online|google)\b",
+    re.IGNORECASE
+)
+SENTENCE_END_PATTERN = re.compile(r"[.?!]+\s+\S")
+
+class SingleTaskNode:
+    """Fast path around DecomposeNode for queries that are already a single task.
+
+    A short question with no conjunctions, no references to the conversation and no
+    instructions on where to look comes back from decomposition unchanged, so it
+    becomes the only task without an LLM round trip.
+    """
+
+    def __init__(self, max_words: int = FAST_PATH_MAX_WORDS):
+        self.max_words = max_words
+
+    def is_simple_query(self, state: State) -> bool:
+        recent_messages = state.get("recent_messages", [])
+        if not recent_messages or not isinstance(recent_messages[-1].content, str):
+            return False
+
+        query = recent_messages[-1].content.strip()
+        if not query or len(query.split()) > self.max_words:
+            return False
+        if query.count("?") > 1 or SENTENCE_END_PATTERN.search(query):
+            return False
+        if CONJUNCTION_PATTERN.search(query) or INSTRUCTION_PATTERN.search(query):
+            return False
+
+        # Pronouns only need rewriting when there is a conversation to resolve them against
+        has_history = len(recent_messages) > 1 or bool(state.get("conversation_summary"))
+        return not (has_history and PRONOUN_PATTERN.search(query))
+
+    async def invoke(self, state: State):
+        print("---SINGLE TASK, SKIPPING DECOMPOSITION---")
+        return {"tasks": [state["recent_messages"][-1].content.strip()]}
+
+    # Sync wrapper for backward compatibility
+    def invoke_sync(self, state: State):
+        return asyncio.run(self.invoke(state))
@@ -53,9 +53,7 @@ class SummarizerNode:
 
         messages = self._build_prompt_messages(summary, messages_to_summarize)
     
-        # Run the LLM call in a thread pool since it's sync
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, self.llm.invoke, messages)
+        response = await self.llm.ainvoke(messages)
         new_summary = response.content
 
         messages_to_delete = [
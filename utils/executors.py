@@ -0,0 +1,88 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from config import EXECUTOR_WORKERS
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that records queue depth and how long tasks wait for a thread.
+
+    A drop-in for loop.run_in_executor; ``stats()`` reports the current queue, the
+    deepest it has been and wait times over the last WAIT_SAMPLES tasks.
+    """
+
+    WAIT_SAMPLES = 1024
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self.workers = max_workers
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=self.WAIT_SAMPLES)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.max_wait = 0.0
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        submitted_at = time.perf_counter()
+        with self._stats_lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        def run():
+            waited = time.perf_counter() - submitted_at
+            with self._stats_lock:
+                self.queued -= 1
+                self.running += 1
+                self._waits.append(waited)
+                self.max_wait = max(self.max_wait, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        try:
+            return super().submit(run)
+        except RuntimeError:
+            # Shut down: the task never queued
+            with self._stats_lock:
+                self.queued -= 1
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "max_queued": self.max_queued,
+                "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                "wait_ms_max": round(1000 * self.max_wait, 2),
+            }
+
+# Named executors, created on first use and sized from EXECUTOR_WORKERS
+_executors: Dict[str, InstrumentedExecutor] = {}
+_executors_lock = threading.Lock()
+
+def get_executor(name: str) -> InstrumentedExecutor:
+    """Get the executor for one class of blocking work, creating it if necessary."""
+    with _executors_lock:
+        if name not in _executors:
+            if name not in EXECUTOR_WORKERS:
+                raise ValueError(f"Unknown executor: {name}. Configure it in EXECUTOR_WORKERS")
+            _executors[name] = InstrumentedExecutor(name, EXECUTOR_WORKERS[name])
+        return _executors[name]
+
+def executor_stats() -> Dict[str, Dict[str, float]]:
+    """Queue depth and wait-time statistics of every executor started so far."""
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {executor.name: executor.stats() for executor in executors}
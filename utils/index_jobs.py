@@ -0,0 +1,245 @@
+import os
+import uuid
+import shutil
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from pymongo import ReturnDocument
+from utils.checkpointer import get_mongo_client
+from vector_db.vector_service import VectorService
+from config import INDEX_JOB_WORKERS, INDEX_JOB_LEASE_SECONDS, INDEX_UPDATE_BY_FILENAME
+
+PROGRESS_COUNTERS = ("files_parsed", "files_skipped", "chunks_reused", "chunks_embedded", "chunks_upserted")
+TERMINAL_STATUSES = ("completed", "failed")
+# Owner of jobs failed by recovery, so their previous owner can no longer write to them
+RECOVERED_OWNER = "reaper"
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class IndexJobQueue:
+    """Runs document indexing in the background with bounded concurrency.
+
+    Jobs are persisted in the ``index_jobs`` Mongo collection, so their status
+    outlives the request that created them. While a job runs, its progress
+    counters live in memory and are flushed to Mongo every PROGRESS_FLUSH_SECONDS,
+    which doubles as the owner's heartbeat.
+
+    Several processes (e.g. uvicorn workers) may share the collection: a job is
+    claimed atomically by exactly one of them, and a running job is only failed
+    as interrupted once its owner has missed heartbeats for ``lease_seconds``.
+    """
+
+    PROGRESS_FLUSH_SECONDS = 1.0
+
+    def __init__(self, workers: int = INDEX_JOB_WORKERS, lease_seconds: float = INDEX_JOB_LEASE_SECONDS):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running_jobs: Dict[str, Dict[str, Any]] = {}
+        self._pending: Set[str] = set()
+
+    @property
+    def _collection(self):
+        return get_mongo_client()['abundance_ai']['index_jobs']
+
+    async def start(self):
+        """Start the workers and pick up jobs left behind by other processes."""
+        self._queue = asyncio.Queue()
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+        logging.info(f"Started {self.workers} indexing job workers as {self.owner} ({self._queue.qsize()} jobs pending)")
+
+    def _enqueue(self, job_id: str):
+        if job_id not in self._pending:
+            self._pending.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _recover(self):
+        """Fail jobs whose owner stopped heartbeating and queue unclaimed jobs.
+
+        A job interrupted mid-run may have indexed part of its files, so it is not
+        retried blindly. Queued jobs are safe to queue in every process, since only
+        one claim can succeed.
+        """
+        stale_before = _now() - timedelta(seconds=self.lease_seconds)
+        try:
+            while True:
+                job = await self._collection.find_one_and_update(
+                    {"status": "running", "owner": {"$ne": self.owner}, "updated_at": {"$lt": stale_before}},
+                    {"$set": {"status": "failed", "error": "Interrupted by a server restart",
+                              "owner": RECOVERED_OWNER, "updated_at": _now()}}
+                )
+                if job is None:
+                    break
+                logging.warning(f"Indexing job {job['_id']} owned by {job.get('owner')} was interrupted")
+                # The previous owner's writes no longer match the job, and it stops at its next heartbeat
+                if job.get("cleanup_dir"):
+                    shutil.rmtree(job["cleanup_dir"], ignore_errors=True)
+            async for job in self._collection.find({"status": "queued"}, sort=[("created_at", 1)]):
+                self._enqueue(job["_id"])
+        except Exception as e:
+            logging.error(f"Could not recover indexing jobs: {e}")
+
+    async def _reaper(self):
+        # A sibling process can die while this one keeps serving
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            await self._recover()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id: str, thread_id: str, file_paths: List[str],
+                     cleanup_dir: Optional[str] = None,
+                     file_hashes: Optional[List[Optional[str]]] = None,
+                     file_sha256s: Optional[List[Optional[str]]] = None,
+                     update_existing: bool = INDEX_UPDATE_BY_FILENAME) -> Dict[str, Any]:
+        """Persist a new job and queue it. cleanup_dir is removed once the job finishes.
+
+        file_hashes and file_sha256s, aligned with file_paths, are md5 and sha256
+        digests computed during upload. update_existing replaces files already
+        indexed in the thread under the same name.
+        """
+        if self._queue is None:
+            raise RuntimeError("Index job queue is not started")
+
+        now = _now()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "thread_id": thread_id,
+            "file_paths": file_paths,
+            "file_hashes": file_hashes,
+            "file_sha256s": file_sha256s,
+            "update_existing": update_existing,
+            "cleanup_dir": cleanup_dir,
+            "status": "queued",
+            "progress": {"files_total": len(file_paths), **{counter: 0 for counter in PROGRESS_COUNTERS}},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        await self._collection.insert_one(job)
+        self._enqueue(job["_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job, with live progress if it is running in this process."""
+        if job_id in self._running_jobs:
+            return self._running_jobs[job_id]
+        return await self._collection.find_one({"_id": job_id})
+
+    async def _save(self, job: Dict[str, Any], *fields: str) -> bool:
+        """Write fields of a running job, returning False if this process no longer owns it."""
+        job["updated_at"] = _now()
+        # Recovery hands failed jobs to RECOVERED_OWNER, so a job it failed is never resurrected
+        result = await self._collection.update_one(
+            {"_id": job["_id"], "owner": self.owner, "status": "running"},
+            {"$set": {field: job[field] for field in (*fields, "updated_at")}}
+        )
+        return result.matched_count > 0
+
+    async def _flush_progress(self, job: Dict[str, Any]):
+        """Heartbeat until the job is lost to recovery, e.g. after missing heartbeats while Mongo was unreachable."""
+        while True:
+            await asyncio.sleep(self.PROGRESS_FLUSH_SECONDS)
+            try:
+                if not await self._save(job, "progress"):
+                    return
+            except Exception as e:
+                logging.warning(f"Could not save progress of indexing job {job['_id']}: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logging.error(f"Indexing job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self._collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "owner": self.owner, "updated_at": _now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            # Claimed by another process, or no longer queued
+            return
+
+        self._running_jobs[job_id] = job
+        logging.info(f"Running indexing job {job_id} ({len(job['file_paths'])} files)")
+
+        def on_progress(counter: str, count: int):
+            job["progress"][counter] = job["progress"].get(counter, 0) + count
+
+        indexing = asyncio.create_task(VectorService.index_documents(
+            file_paths=job["file_paths"],
+            user_id=job["user_id"],
+            thread_id=job["thread_id"],
+            progress=on_progress,
+            update_existing=job.get("update_existing", INDEX_UPDATE_BY_FILENAME),
+            file_hashes=job.get("file_hashes"),
+            file_sha256s=job.get("file_sha256s")
+        ))
+        flusher = asyncio.create_task(self._flush_progress(job))
+        try:
+            await asyncio.wait({indexing, flusher}, return_when=asyncio.FIRST_COMPLETED)
+            if not indexing.done():
+                # Recovery failed the job and removed its files, its record is no longer ours
+                logging.warning(f"Indexing job {job_id} was failed by recovery while running here, stopping it")
+                return
+            try:
+                job["result"] = indexing.result()
+                job["status"] = "completed"
+            except Exception as e:
+                logging.error(f"Indexing job {job_id} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            if await self._save(job, "status", "progress", "result", "error"):
+                if job.get("cleanup_dir"):
+                    shutil.rmtree(job["cleanup_dir"], ignore_errors=True)
+            else:
+                logging.warning(f"Indexing job {job_id} was failed by recovery before it finished here")
+            logging.info(f"Indexing job {job_id} {job['status']}")
+        finally:
+            indexing.cancel()
+            flusher.cancel()
+            self._running_jobs.pop(job_id, None)
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public, JSON-serializable view of a job document."""
+    return {
+        "job_id": job["_id"],
+        "user_id": job["user_id"],
+        "thread_id": job["thread_id"],
+        "status": job["status"],
+        "progress": dict(job["progress"]),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat()
+    }
+
+# Global job queue instance - started by the API lifespan
+_job_queue = None
+
+def get_index_job_queue() -> IndexJobQueue:
+    """Get the global IndexJobQueue instance, creating it if necessary."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = IndexJobQueue()
+    return _job_queue
@@ -0,0 +1,337 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from config import (
+    LLM_RATE_LIMITS,
+    LLM_DEFAULT_RATE_LIMIT,
+    LLM_DEADLINE_SECONDS,
+    LLM_COMPLETION_TOKENS_ESTIMATE,
+)
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "utility": 1, "background": 2}
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The rate budget cannot start an LLM call before the caller's deadline."""
+
+class TokenBucket:
+    """Budget refilled continuously at ``per_minute`` units per minute, up to ``per_minute``.
+
+    Takes may overdraw it, so a call larger than the whole budget still runs once the
+    bucket is full and the following calls wait for the debt to refill.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (after a refill)."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    deadline: float = field(compare=False)
+    wake: Callable[[], None] = field(compare=False, repr=False)
+
+class _ModelBudget:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiters: List[_Waiter] = []
+        self.granted = 0
+        self.throttled = 0
+        self.deadline_exceeded = 0
+        self.provider_rate_limited = 0
+
+@dataclass
+class Grant:
+    model_id: str
+    tokens: int
+
+class LLMScheduler:
+    """Shared admission control for chat model calls.
+
+    Each model has token buckets for requests and tokens per minute. Callers queue by
+    priority lane and, within a lane, in arrival order; only the head of a model's
+    queue may start, once both buckets cover it. A caller whose deadline falls before
+    the budget for everyone ahead of it (and itself) refills gives up immediately with
+    LLMDeadlineExceeded instead of timing out at the provider.
+
+    State is guarded by a thread lock and waiters are woken through their own event
+    loop, so callers on different loops (e.g. background summarization) share budgets.
+    """
+
+    def __init__(self, rate_limits: Dict[str, Dict[str, int]] = LLM_RATE_LIMITS,
+                 default_rate_limit: Dict[str, int] = LLM_DEFAULT_RATE_LIMIT):
+        self.rate_limits = rate_limits
+        self.default_rate_limit = default_rate_limit
+        self._budgets: Dict[str, _ModelBudget] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _budget(self, model_id: str) -> _ModelBudget:
+        if model_id not in self._budgets:
+            limits = self.rate_limits.get(model_id, self.default_rate_limit)
+            self._budgets[model_id] = _ModelBudget(limits["rpm"], limits["tpm"])
+        return self._budgets[model_id]
+
+    @staticmethod
+    def _wake_head(budget: _ModelBudget):
+        if budget.waiters:
+            budget.waiters[0].wake()
+
+    def _remove(self, budget: _ModelBudget, waiter: _Waiter):
+        if waiter in budget.waiters:
+            budget.waiters.remove(waiter)
+            heapq.heapify(budget.waiters)
+            self._wake_head(budget)
+
+    def _evaluate(self, model_id: str, waiter: _Waiter) -> Optional[float]:
+        """Start the waiter (None) or return how long to wait before looking again.
+
+        Raises LLMDeadlineExceeded when the estimated start falls after the deadline.
+        """
+        now = time.monotonic()
+        with self._lock:
+            budget = self._budget(model_id)
+            budget.requests.refill(now)
+            budget.tokens.refill(now)
+            ahead = [other for other in budget.waiters if other < waiter]
+            # A call larger than the whole budget only needs a full bucket, the debt delays the next ones
+            needed_tokens = sum(min(other.tokens, budget.tokens.capacity) for other in ahead + [waiter])
+            wait = max(budget.requests.time_until(len(ahead) + 1), budget.tokens.time_until(needed_tokens))
+            if not ahead and wait <= 0:
+                budget.waiters.remove(waiter)
+                heapq.heapify(budget.waiters)
+                budget.requests.take(1)
+                budget.tokens.take(waiter.tokens)
+                budget.granted += 1
+                self._wake_head(budget)
+                return None
+            if now + wait > waiter.deadline:
+                budget.deadline_exceeded += 1
+                self._remove(budget, waiter)
+                raise LLMDeadlineExceeded(
+                    f"{model_id}: rate budget frees up in {wait:.1f}s, "
+                    f"past the deadline in {max(0.0, waiter.deadline - now):.1f}s"
+                )
+            # The head sleeps until its budget refills, the rest until they are woken or time out
+            return wait if not ahead else waiter.deadline - now
+
+    def _enqueue(self, model_id: str, priority: str, tokens: int, deadline_seconds: Optional[float],
+                 wake: Callable[[], None]) -> _Waiter:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Use one of {list(PRIORITIES)}")
+        if deadline_seconds is None:
+            deadline_seconds = LLM_DEADLINE_SECONDS[priority]
+        waiter = _Waiter(PRIORITIES[priority], next(self._seq), tokens, time.monotonic() + deadline_seconds, wake)
+        with self._lock:
+            budget = self._budget(model_id)
+            heapq.heappush(budget.waiters, waiter)
+            # A higher priority arrival displaces the current head, which must look again
+            self._wake_head(budget)
+        return waiter
+
+    def _count_throttled(self, model_id: str):
+        with self._lock:
+            self._budget(model_id).throttled += 1
+
+    async def acquire(self, model_id: str, priority: str, tokens: int, deadline_seconds: Optional[float] = None) -> Grant:
+        """Wait for budget to start one call of about ``tokens`` prompt plus completion tokens."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(model_id, priority, tokens, deadline_seconds,
+                               lambda: loop.call_soon_threadsafe(event.set))
+        throttled = False
+        try:
+            while True:
+                event.clear()
+                timeout = self._evaluate(model_id, waiter)
+                if timeout is None:
+                    return Grant(model_id, tokens)
+                if not throttled:
+                    throttled = True
+                    self._count_throttled(model_id)
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            # Cancelled callers leave the queue too
+            with self._lock:
+                self._remove(self._budget(model_id), waiter)
+            raise
+
+    def acquire_sync(self, model_id: str, priority: str, tokens: int, deadline_seconds: Optional[float] = None) -> Grant:
+        """Blocking variant of acquire for sync model calls."""
+        event = threading.Event()
+        waiter = self._enqueue(model_id, priority, tokens, deadline_seconds, event.set)
+        throttled = False
+        try:
+            while True:
+                event.clear()
+                timeout = self._evaluate(model_id, waiter)
+                if timeout is None:
+                    return Grant(model_id, tokens)
+                if not throttled:
+                    throttled = True
+                    self._count_throttled(model_id)
+                event.wait(timeout)
+        except BaseException:
+            with self._lock:
+                self._remove(self._budget(model_id), waiter)
+            raise
+
+    def settle(self, grant: Grant, used_tokens: Optional[int]):
+        """Correct the token bucket from the estimate to what the provider reported."""
+        if used_tokens is None:
+            return
+        with self._lock:
+            budget = self._budget(grant.model_id)
+            budget.tokens.level = min(budget.tokens.capacity, budget.tokens.level + grant.tokens - used_tokens)
+            self._wake_head(budget)
+
+    def record_rate_limited(self, model_id: str):
+        """The provider rejected a call with 429: empty the buckets so queued calls back off."""
+        with self._lock:
+            budget = self._budget(model_id)
+            budget.provider_rate_limited += 1
+            budget.requests.level = min(budget.requests.level, 0.0)
+            budget.tokens.level = min(budget.tokens.level, 0.0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue length per lane, throttle events and remaining budget per model."""
+        now = time.monotonic()
+        with self._lock:
+            stats = {}
+            for model_id, budget in self._budgets.items():
+                budget.requests.refill(now)
+                budget.tokens.refill(now)
+                stats[model_id] = {
+                    "queued": {lane: sum(1 for w in budget.waiters if w.priority == rank) for lane, rank in PRIORITIES.items()},
+                    "granted": budget.granted,
+                    "throttled": budget.throttled,
+                    "deadline_exceeded": budget.deadline_exceeded,
+                    "provider_rate_limited": budget.provider_rate_limited,
+                    "requests_available": round(budget.requests.level, 1),
+                    "tokens_available": round(budget.tokens.level),
+                }
+            return stats
+
+_global_scheduler: Optional[LLMScheduler] = None
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the global LLMScheduler instance, creating it if necessary."""
+    global _global_scheduler
+    if _global_scheduler is None:
+        _global_scheduler = LLMScheduler()
+    return _global_scheduler
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model wrapper that admits every call through the shared LLMScheduler.
+
+    Drop-in for the wrapped model in chains and graph nodes: callbacks, streaming and
+    ainvoke/astream behave as before, the call just waits for its lane's budget first.
+    """
+
+    model: BaseChatModel
+    priority: str = "interactive"
+    deadline_seconds: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.model._llm_type}"
+
+    @property
+    def model_id(self) -> str:
+        return getattr(self.model, "model_name", None) or self.model._llm_type
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        # About four characters per token; the completion is reserved up to max_tokens
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return prompt_tokens + (getattr(self.model, "max_tokens", None) or LLM_COMPLETION_TOKENS_ESTIMATE)
+
+    @staticmethod
+    def _used_tokens(message: BaseMessage) -> Optional[int]:
+        usage = getattr(message, "usage_metadata", None)
+        return usage.get("total_tokens") if usage else None
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        scheduler = get_llm_scheduler()
+        grant = scheduler.acquire_sync(self.model_id, self.priority, self._estimate_tokens(messages), self.deadline_seconds)
+        try:
+            result = self.model._generate(messages, stop=stop, **kwargs)
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                scheduler.record_rate_limited(self.model_id)
+            raise
+        scheduler.settle(grant, self._used_tokens(result.generations[0].message) if result.generations else None)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        scheduler = get_llm_scheduler()
+        grant = await scheduler.acquire(self.model_id, self.priority, self._estimate_tokens(messages), self.deadline_seconds)
+        try:
+            result = await self.model._agenerate(messages, stop=stop, **kwargs)
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                scheduler.record_rate_limited(self.model_id)
+            raise
+        scheduler.settle(grant, self._used_tokens(result.generations[0].message) if result.generations else None)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        scheduler = get_llm_scheduler()
+        grant = scheduler.acquire_sync(self.model_id, self.priority, self._estimate_tokens(messages), self.deadline_seconds)
+        used_tokens = None
+        try:
+            for chunk in self.model._stream(messages, stop=stop, **kwargs):
+                used_tokens = self._used_tokens(chunk.message) or used_tokens
+                yield chunk
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                scheduler.record_rate_limited(self.model_id)
+            raise
+        scheduler.settle(grant, used_tokens)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        scheduler = get_llm_scheduler()
+        grant = await scheduler.acquire(self.model_id, self.priority, self._estimate_tokens(messages), self.deadline_seconds)
+        used_tokens = None
+        try:
+            async for chunk in self.model._astream(messages, stop=stop, **kwargs):
+                used_tokens = self._used_tokens(chunk.message) or used_tokens
+                yield chunk
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                scheduler.record_rate_limited(self.model_id)
+            raise
+        scheduler.settle(grant, used_tokens)
@@ -0,0 +1,191 @@
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.executors import get_executor
+from config import (
+    RESPONSE_CACHE,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_SEMANTIC,
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+)
+
+def cache_key(*parts: Any) -> str:
+    """Stable hash of the parts that determine an LLM response."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def fingerprint(texts: Iterable[str]) -> str:
+    """Order-independent hash of a set of texts, e.g. the chunks an answer was derived from."""
+    return cache_key(sorted(hashlib.md5(text.encode('utf-8')).hexdigest() for text in texts))
+
+def model_identity(llm: Any) -> str:
+    return getattr(llm, "model_id", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    compute_seconds: float
+    vector: Optional[np.ndarray] = None
+
+class ResponseCache:
+    """Two-tier cache for utility LLM responses, with TTL and LRU eviction.
+
+    The exact tier is keyed by a hash of (namespace, model, prompt, inputs), so any caller
+    sending the same inputs gets the same response. The optional semantic tier matches a
+    query embedding against earlier ones by cosine similarity, but only within one
+    scope, (namespace, user, thread, fingerprint of the documents or history the
+    response was derived from), so responses never cross tenants or contexts.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS, semantic: bool = RESPONSE_CACHE_SEMANTIC,
+                 semantic_threshold: float = RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+                 embed_query: Optional[Callable[[str], List[float]]] = None):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.semantic_threshold = semantic_threshold
+        self._embed_query = embed_query
+        self._exact: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._semantic: Dict[Tuple, "OrderedDict[str, _Entry]"] = defaultdict(OrderedDict)
+        # Recency across all scopes, for one LRU bound on the semantic tier
+        self._semantic_order: "OrderedDict[Tuple[Tuple, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "saved_seconds": 0.0}
+        )
+
+    async def _embed(self, text: str) -> np.ndarray:
+        if self._embed_query is None:
+            # The same embedding model as retrieval, loaded with the global indexer
+            from vector_db import get_global_indexer
+            self._embed_query = get_global_indexer().embedding_manager.embed_query
+        loop = asyncio.get_event_loop()
+        vector = np.asarray(await loop.run_in_executor(get_executor("embedding"), self._embed_query, text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _get_exact(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._exact[key]
+            return None
+        self._exact.move_to_end(key)
+        return entry
+
+    def _get_semantic(self, scope: Tuple, vector: np.ndarray, now: float) -> Optional[_Entry]:
+        entries = self._semantic.get(scope)
+        if not entries:
+            return None
+        best_key, best_score = None, self.semantic_threshold
+        for key, entry in list(entries.items()):
+            if entry.expires_at <= now:
+                del entries[key]
+                self._semantic_order.pop((scope, key), None)
+                continue
+            score = float(np.dot(entry.vector, vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        self._semantic_order.move_to_end((scope, best_key))
+        return entries[best_key]
+
+    def _put(self, key: str, scope: Optional[Tuple], vector: Optional[np.ndarray], entry: _Entry):
+        self._exact[key] = entry
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if scope is not None and vector is not None:
+            entry.vector = vector
+            self._semantic[scope][key] = entry
+            self._semantic_order[(scope, key)] = None
+            self._semantic_order.move_to_end((scope, key))
+            while len(self._semantic_order) > self.max_entries:
+                (old_scope, old_key), _ = self._semantic_order.popitem(last=False)
+                self._semantic[old_scope].pop(old_key, None)
+                if not self._semantic[old_scope]:
+                    del self._semantic[old_scope]
+
+    async def get_or_compute(self, namespace: str, key_parts: Tuple, compute: Callable[[], Awaitable[Any]],
+                             semantic_text: Optional[str] = None, scope: Optional[Tuple] = None) -> Any:
+        """Return the cached response for these inputs, or compute and cache it.
+
+        Only successful responses are cached; exceptions from ``compute`` propagate.
+        ``semantic_text`` and ``scope`` opt the call into the semantic tier.
+        """
+        if not self.enabled:
+            return await compute()
+
+        key = cache_key(namespace, *key_parts)
+        semantic_scope = (namespace, *scope) if scope is not None else None
+        stats = self._stats[namespace]
+        with self._lock:
+            entry = self._get_exact(key, time.monotonic())
+            if entry is not None:
+                stats["exact_hits"] += 1
+                stats["saved_seconds"] += entry.compute_seconds
+                return copy.deepcopy(entry.value)
+
+        vector = None
+        if self.semantic and semantic_text and semantic_scope is not None:
+            try:
+                vector = await self._embed(semantic_text)
+            except Exception as e:
+                logging.warning(f"Semantic cache lookup failed, using the exact tier only: {e}")
+            if vector is not None:
+                with self._lock:
+                    entry = self._get_semantic(semantic_scope, vector, time.monotonic())
+                    if entry is not None:
+                        stats["semantic_hits"] += 1
+                        stats["saved_seconds"] += entry.compute_seconds
+                        return copy.deepcopy(entry.value)
+
+        with self._lock:
+            stats["misses"] += 1
+        start_time = time.perf_counter()
+        value = await compute()
+        compute_seconds = time.perf_counter() - start_time
+        with self._lock:
+            self._put(key, semantic_scope, vector,
+                      _Entry(copy.deepcopy(value), time.monotonic() + self.ttl_seconds, compute_seconds))
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, and hit rates and latency saved per namespace."""
+        with self._lock:
+            namespaces = {}
+            for namespace, counts in self._stats.items():
+                lookups = counts["exact_hits"] + counts["semantic_hits"] + counts["misses"]
+                namespaces[namespace] = {
+                    **counts,
+                    "saved_seconds": round(counts["saved_seconds"], 3),
+                    "hit_rate": round((counts["exact_hits"] + counts["semantic_hits"]) / lookups, 4) if lookups else 0.0,
+                }
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._exact),
+                "semantic_entries": len(self._semantic_order),
+                "namespaces": namespaces,
+            }
+
+_global_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Get the global ResponseCache instance, creating it if necessary."""
+    global _global_response_cache
+    if _global_response_cache is None:
+        _global_response_cache = ResponseCache()
+    return _global_response_cache
@@ -6,19 +6,34 @@ using Qdrant vector database and FastEmbed embeddings.
 
 Components:
 - EmbeddingManager: Handles text embeddings
+- EmbeddingCache: Persistent cache of chunk embeddings keyed by content hash
+- EmbeddingEngine: Length-bucketed document embedding over worker processes
 - DocumentProcessor: Processes PDF documents 
+- ParsingPool: Runs DocumentProcessor in worker processes with timeouts and memory limits
+- VectorBackend: Interface implemented by the vector stores below
 - QdrantManager: Manages Qdrant database operations
+- LocalVectorBackend: In-process NumPy vector store persisted under CACHE_DIR
 - DocumentIndexer: Main interface combining all components
+- Reranker: Cross-encoder re-ranking of retrieved chunks
+- ModelServer / ModelClient: Shared, micro-batched embedding and rerank models over a Unix socket
 """
 
 from .embedding_manager import EmbeddingManager
+from .embedding_cache import EmbeddingCache
+from .embedding_engine import EmbeddingEngine
 from .document_processor import DocumentProcessor  
+from .parsing_pool import ParsingPool
+from .vector_backend import VectorBackend
 from .qdrant_manager import QdrantManager
+from .local_backend import LocalVectorBackend
 from .document_indexer import DocumentIndexer
-from config import QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION
+from .reranker import Reranker
+from .model_server import ModelServer, ModelClient
+from config import QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION, HYBRID_SEARCH, VECTOR_BACKEND
 
 # Global indexer instance - initialized once and shared across the application
 _global_indexer = None
+_global_reranker = None
 
 def get_global_indexer():
     """Get the global DocumentIndexer instance, creating it if necessary."""
@@ -30,14 +45,32 @@ def get_global_indexer():
             collection_name=QDRANT_COLLECTION,
             distance_threshold=0.7,  # Restored to proper value
             embedding_provider="fastembed",  # fastembed or deepinfra
-            force_recreate=False  # Set to True to recreate collection
+            force_recreate=False,  # Set to True to recreate collection
+            hybrid_search=HYBRID_SEARCH,  # Dense + sparse retrieval fused with RRF
+            backend=VECTOR_BACKEND  # qdrant or local
         )
     return _global_indexer
 
+def get_global_reranker():
+    """Get the global Reranker instance, creating it if necessary."""
+    global _global_reranker
+    if _global_reranker is None:
+        _global_reranker = Reranker()
+    return _global_reranker
+
 __all__ = [
     'EmbeddingManager',
+    'EmbeddingCache',
+    'EmbeddingEngine',
     'DocumentProcessor', 
+    'ParsingPool',
+    'VectorBackend',
     'QdrantManager',
+    'LocalVectorBackend',
     'DocumentIndexer',
-    'get_global_indexer'
+    'Reranker',
+    'ModelServer',
+    'ModelClient',
+    'get_global_indexer',
+    'get_global_reranker'
 ]
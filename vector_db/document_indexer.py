@@ -1,13 +1,38 @@
+import os
 import logging
 import asyncio
-from typing import List, Dict, Any, Literal
+import time
+from typing import Callable, List, Dict, Any, Literal, Optional, Set, Tuple
 from langchain.schema import Document
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from qdrant_client.http import models
 
 from .embedding_manager import EmbeddingManager
 from .document_processor import DocumentProcessor
+from .parsing_pool import ParsingPool
+from .vector_backend import VectorBackend
 from .qdrant_manager import QdrantManager
+from .local_backend import LocalVectorBackend
+from utils.executors import get_executor
+from config import (
+    SPARSE_EMBEDDING_MODEL_ID,
+    QUANTIZATION,
+    VECTORS_ON_DISK,
+    PAYLOAD_ON_DISK,
+    HNSW_M,
+    HNSW_EF_CONSTRUCT,
+    SEARCH_OVERSAMPLING,
+    SEARCH_RESCORE,
+    INDEX_BATCH_SIZE,
+    INDEX_QUEUE_BATCHES,
+    INDEX_UPSERT_RETRIES,
+    INDEX_UPDATE_BY_FILENAME,
+)
+
+# Marks the end of a stage's output on the ingestion pipeline queues
+_END_OF_STREAM = object()
+
+# Called with ("files_parsed" | "files_skipped" | "chunks_reused" | "chunks_embedded" | "chunks_upserted", increment)
+ProgressCallback = Callable[[str, int], None]
 
 class DocumentIndexer:
     def __init__(self, 
@@ -16,22 +41,33 @@ class DocumentIndexer:
                  collection_name: str = "documents",
                  distance_threshold: float = 0.7,  # Restored to proper value
                  embedding_provider: Literal["fastembed", "deepinfra"] = "fastembed",
-                 force_recreate: bool = False):
+                 force_recreate: bool = False,
+                 hybrid_search: bool = False,
+                 backend: Literal["qdrant", "local"] = "qdrant"):
         
         logging.info("Initializing DocumentIndexer...")
         
         # Initialize components
-        self.embedding_manager = EmbeddingManager(embedding_provider)
+        self.embedding_manager = EmbeddingManager(
+            embedding_provider,
+            sparse_model_id=SPARSE_EMBEDDING_MODEL_ID if hybrid_search else None
+        )
         self.document_processor = DocumentProcessor()
-        self.qdrant_manager = QdrantManager(qdrant_host, qdrant_port, collection_name)
+        self.parsing_pool = ParsingPool()
+        if backend == "qdrant":
+            self.vector_backend: VectorBackend = QdrantManager(qdrant_host, qdrant_port, collection_name)
+        elif backend == "local":
+            self.vector_backend = LocalVectorBackend(collection_name)
+        else:
+            raise ValueError(f"Unsupported vector backend: {backend}")
         
         self.collection_name = collection_name
         self.distance_threshold = distance_threshold
+        self.hybrid_search = hybrid_search
         
         # Store initialization parameters for async initialization
         self._force_recreate = force_recreate
         self._initialized = False
-        self.vector_store = None
 
         logging.info("DocumentIndexer initialized (async initialization pending)")
 
@@ -42,134 +78,402 @@ class DocumentIndexer:
             
         vector_size = self.embedding_manager.get_embedding_dimension()
         
-        if not await self.qdrant_manager.collection_exists() or force_recreate:
-            await self.qdrant_manager.create_collection(vector_size, force_recreate)
-        
-        # Create sync client for QdrantVectorStore using the same connection details
-        try:
-            from qdrant_client import QdrantClient
-            
-            # Try gRPC first, then fallback to HTTP (same as async client)
-            try:
-                sync_client = QdrantClient(host=self.qdrant_manager.host, grpc_port=6334, prefer_grpc=True)
-                logging.info("Using gRPC connection for sync client")
-            except Exception:
-                sync_client = QdrantClient(host=self.qdrant_manager.host, port=6333)
-                logging.info("Using HTTP connection for sync client")
-            
-            self.vector_store = QdrantVectorStore(
-                client=sync_client,
-                collection_name=self.collection_name,
-                embedding=self.embedding_manager.embeddings,
+        if not await self.vector_backend.collection_exists() or force_recreate:
+            await self.vector_backend.create_collection(
+                vector_size,
+                force_recreate,
+                with_sparse=self.hybrid_search,
+                quantization=QUANTIZATION,
+                on_disk=VECTORS_ON_DISK,
+                on_disk_payload=PAYLOAD_ON_DISK,
+                hnsw_m=HNSW_M,
+                hnsw_ef_construct=HNSW_EF_CONSTRUCT
             )
-            
-            self._initialized = True
-            logging.info(f"Vector store initialized successfully for collection '{self.collection_name}'")
-        except Exception as e:
-            logging.error(f"Failed to initialize vector store: {e}")
-            self._initialized = False
-            raise
+        
+        self._initialized = True
+        logging.info(f"Vector store initialized successfully for collection '{self.collection_name}'")
     
-    async def index_documents(self, file_paths: List[str], user_id:str, thread_id: str) -> Dict[str, Any]:
+    async def index_documents(self, file_paths: List[str], user_id:str, thread_id: str,
+                              progress: Optional[ProgressCallback] = None,
+                              update_existing: bool = INDEX_UPDATE_BY_FILENAME,
+                              file_hashes: Optional[List[Optional[str]]] = None,
+                              file_sha256s: Optional[List[Optional[str]]] = None) -> Dict[str, Any]:
+        """Index files into a thread, skipping files it already has.
+
+        file_hashes and file_sha256s are the files' md5 and sha256 digests where the
+        caller already has them (e.g. computed during upload); files are then never
+        read just to be hashed. The md5 identifies a file, but vectors indexed in
+        another thread are only reused when their sha256 and size match as well,
+        since md5 collisions can be crafted.
+
+        With update_existing, a file whose name is already indexed in the thread
+        replaces that version: chunks with unchanged content keep their stored
+        vectors, only new chunks are embedded and removed ones are deleted.
+        """
         # Ensure vector store is initialized
         if not self._initialized:
             await self._initialize_vector_store(self._force_recreate)
             
         logging.info(f"Indexing {len(file_paths)} documents for user '{user_id}' in thread '{thread_id}'")
         
+        report = progress or (lambda event, count: None)
+        
         # Filter out files that already exist
         files_to_process = []
+        files_to_copy = []
         skipped_files = []
         
-        # Check file existence in parallel
-        existence_tasks = [self.qdrant_manager.document_exists(
-            self.document_processor.calculate_file_hash(file_path),
-            user_id,
-            thread_id
-        ) for file_path in file_paths]
-        
-        # Also check global existence for debugging
-        global_existence_tasks = [self.qdrant_manager.document_exists_globally(
-            self.document_processor.calculate_file_hash(file_path)
-        ) for file_path in file_paths]
+        # Hash every file without known digests once, off the event loop
+        loop = asyncio.get_event_loop()
+        file_hashes = list(file_hashes or [None] * len(file_paths))
+        file_sha256s = list(file_sha256s or [None] * len(file_paths))
+        unhashed = [i for i in range(len(file_paths)) if not file_hashes[i] or not file_sha256s[i]]
+        computed_digests = await asyncio.gather(*[
+            loop.run_in_executor(get_executor("files"), self.document_processor.calculate_file_digests, file_paths[i])
+            for i in unhashed
+        ])
+        for i, (file_hash, file_sha256) in zip(unhashed, computed_digests):
+            file_hashes[i], file_sha256s[i] = file_hash, file_sha256
+        # Stored on every chunk of a file, and required to match before its vectors are reused elsewhere
+        content_digests = {
+            file_path: {"file_sha256": file_sha256, "file_size": os.path.getsize(file_path)}
+            for file_path, file_sha256 in zip(file_paths, file_sha256s)
+        }
         
-        existence_results = await asyncio.gather(*existence_tasks, return_exceptions=True)
-        global_existence_results = await asyncio.gather(*global_existence_tasks, return_exceptions=True)
+        # One batched lookup for all files instead of per-file count calls
+        try:
+            local_hashes, global_hashes = await self.vector_backend.find_existing_hashes(file_hashes, user_id, thread_id)
+        except Exception as e:
+            logging.error(f"Error checking file existence: {e}")
+            local_hashes, global_hashes = set(), set()
         
-        for i, (file_path, exists, global_exists) in enumerate(zip(file_paths, existence_results, global_existence_results)):
-            if isinstance(exists, Exception):
-                logging.error(f"Error checking file existence for {file_path}: {exists}")
-                files_to_process.append(file_path)
-            elif exists:
+        for file_path, file_hash in zip(file_paths, file_hashes):
+            if file_hash in local_hashes:
                 logging.info(f"Skipping existing file '{file_path}' in thread '{thread_id}' (already indexed)")
                 skipped_files.append(file_path)
+                report("files_skipped", 1)
+            elif file_hash in global_hashes:
+                logging.info(f"Reusing vectors for file '{file_path}' in thread '{thread_id}' (indexed in another thread)")
+                files_to_copy.append((file_path, file_hash))
             else:
-                if isinstance(global_exists, bool) and global_exists:
-                    logging.info(f"Processing file '{file_path}' for thread '{thread_id}' (duplicating from another thread)")
-                else:
-                    logging.info(f"Processing new file '{file_path}' for thread '{thread_id}' (first time indexing)")
+                logging.info(f"Processing new file '{file_path}' for thread '{thread_id}' (first time indexing)")
                 files_to_process.append(file_path)
         
+        previous_chunks = {}
+        if update_existing:
+            previous_chunks = await self._find_previous_versions(
+                files_to_process + [file_path for file_path, _ in files_to_copy], user_id, thread_id
+            )
+        
+        # Files indexed elsewhere are copied with their vectors, skipping parsing and embedding
+        copied_count = 0
+        copied_files = 0
+        if files_to_copy:
+            async def copy_file(file_path: str, file_hash: str) -> int:
+                try:
+                    copied = await self.vector_backend.copy_document(
+                        file_hash, user_id, thread_id,
+                        metadata_updates={"source_file": file_path, "source_name": os.path.basename(file_path)},
+                        content_digest=content_digests[file_path]
+                    )
+                    if copied and file_path in previous_chunks:
+                        await self.vector_backend.delete_stale_chunks(os.path.basename(file_path), file_hash, user_id, thread_id)
+                    return copied
+                except Exception as e:
+                    logging.error(f"Error copying vectors for {file_path}: {e}")
+                    return 0
+            
+            copy_counts = await asyncio.gather(*[copy_file(file_path, file_hash) for file_path, file_hash in files_to_copy])
+            for (file_path, _), count in zip(files_to_copy, copy_counts):
+                if count:
+                    copied_count += count
+                    copied_files += 1
+                    report("files_parsed", 1)
+                    report("chunks_upserted", count)
+                else:
+                    # No source with a matching sha256, the source points vanished or the copy failed, index from scratch
+                    files_to_process.append(file_path)
+            logging.info(f"Reused {copied_count} chunks from {copied_files} files indexed in other threads")
+        
         if not files_to_process:
+            if copied_count:
+                message = f"Successfully indexed {copied_count} document chunks from {copied_files} files"
+            else:
+                message = f"All {len(file_paths)} files already indexed in thread '{thread_id}'"
             return {
-                "message": f"All {len(file_paths)} files already indexed in thread '{thread_id}'",
-                "indexed_count": 0,
+                "message": message,
+                "indexed_count": copied_count,
+                "reused_count": copied_count,
+                "embedded_count": 0,
                 "skipped_count": len(skipped_files),
                 "user_id": user_id,
                 "thread_id": thread_id,
             }
         
-        # Process documents in parallel
-        async def process_file(file_path: str) -> List[Document]:
-            try:
-                documents = self.document_processor.load_document(file_path, user_id, thread_id)
-                logging.info(f"Loaded {len(documents)} chunks from {file_path}")
-                return documents
-            except Exception as e:
-                logging.error(f"Error processing {file_path}: {e}")
-                return []
-        
-        processing_tasks = [process_file(file_path) for file_path in files_to_process]
-        all_document_lists = await asyncio.gather(*processing_tasks)
+        hashes_by_path = dict(zip(file_paths, file_hashes))
+        logging.info(f"Streaming {len(files_to_process)} files through the ingestion pipeline...")
+        pipeline_count, pipeline_files, pipeline_reused = await self._ingest_files(
+            files_to_process, hashes_by_path, user_id, thread_id, report, previous_chunks, content_digests
+        )
         
-        all_documents = []
-        for doc_list in all_document_lists:
-            all_documents.extend(doc_list)
-        
-        if not all_documents:
+        if not pipeline_count and not copied_count:
             return {
                 "message": "No documents were loaded",
                 "indexed_count": 0,
+                "reused_count": 0,
+                "embedded_count": 0,
                 "skipped_count": len(skipped_files),
                 "user_id": user_id,
                 "thread_id": thread_id
             }
         
-        try:
-            logging.info(f"Uploading {len(all_documents)} document chunks to Qdrant...")
-            if self.vector_store is not None:
-                self.vector_store.add_documents(all_documents)
-                indexed_count = len(all_documents)
-                logging.info(f"Upload completed: {indexed_count} chunks")
-            else:
-                logging.error("Vector store is not initialized")
-                indexed_count = 0
-            
-        except Exception as e:
-            logging.error(f"Upload failed: {e}")
-            indexed_count = 0
-        
-        logging.info(f"Indexing completed: {indexed_count} chunks indexed, "
-                     f"{len(skipped_files)} files skipped")
+        indexed_count = pipeline_count + copied_count
+        indexed_files = pipeline_files + copied_files
+        reused_count = copied_count + pipeline_reused
+        logging.info(f"Indexing completed: {indexed_count} chunks indexed ({reused_count} reused, "
+                     f"{indexed_count - reused_count} embedded), {len(skipped_files)} files skipped")
 
         return {
-            "message": f"Successfully indexed {indexed_count} document chunks from {len(files_to_process)} files",
+            "message": f"Successfully indexed {indexed_count} document chunks from {indexed_files} files",
             "indexed_count": indexed_count,
+            "reused_count": reused_count,
+            "embedded_count": indexed_count - reused_count,
             "skipped_count": len(skipped_files),
             "user_id": user_id,
             "thread_id": thread_id
         }
+
+    async def _find_previous_versions(self, file_paths: List[str], user_id: str,
+                                      thread_id: str) -> Dict[str, List[Tuple[str, str]]]:
+        """Stored (point id, content_hash) chunks of an older version of each file, by file path."""
+        names = [os.path.basename(file_path) for file_path in file_paths]
+        # Two files with the same name in one upload are ambiguous, index those side by side
+        unique_names = {name for name in names if names.count(name) == 1}
+        if not unique_names:
+            return {}
+        try:
+            chunks_by_name = await self.vector_backend.get_source_chunks(sorted(unique_names), user_id, thread_id)
+        except Exception as e:
+            logging.warning(f"Could not look up previous file versions: {e}")
+            return {}
+        return {
+            file_path: chunks_by_name[name]
+            for file_path, name in zip(file_paths, names)
+            if name in unique_names and name in chunks_by_name
+        }
+
+    async def _ingest_files(self, file_paths: List[str], hashes_by_path: Dict[str, str],
+                            user_id: str, thread_id: str, report: ProgressCallback,
+                            previous_chunks: Optional[Dict[str, List[Tuple[str, str]]]] = None,
+                            content_digests: Optional[Dict[str, Dict[str, Any]]] = None) -> Tuple[int, int, int]:
+        """Stream files through parse -> embed -> upsert, returning (chunks indexed, files indexed, chunks reused).
+
+        Parsing yields fixed-size chunk batches from the worker pool, and bounded queues
+        between the stages keep memory flat whatever the file size. Embedding batch N
+        overlaps the upsert of batch N-1. Upserts do not wait for Qdrant to apply them;
+        a single barrier follows the last one. Point ids are deterministic, so a failed
+        batch is retried as is. A file with a batch that still fails is removed again,
+        so a partial file is never reported as indexed by the duplicate check.
+
+        For files in previous_chunks, chunks whose content_hash is already stored are
+        neither embedded nor upserted; once the file succeeds the stored points are
+        moved over to the new version and the rest of the old version is deleted.
+        """
+        parsed_batches: asyncio.Queue = asyncio.Queue(maxsize=INDEX_QUEUE_BATCHES)
+        embedded_batches: asyncio.Queue = asyncio.Queue(maxsize=INDEX_QUEUE_BATCHES)
+        parse_slots = asyncio.Semaphore(self.parsing_pool.max_workers)
+        chunk_totals: Dict[str, int] = {}
+        failed_files: Set[str] = set()
+
+        # content_hash -> stored point ids of the previous version, claimed as matching chunks arrive
+        reusable: Dict[str, Dict[str, List[str]]] = {}
+        for file_path, chunks in (previous_chunks or {}).items():
+            for point_id, content_hash in chunks:
+                reusable.setdefault(file_path, {}).setdefault(content_hash, []).append(point_id)
+        reused_points: Dict[str, Dict[str, Dict[str, Any]]] = {file_path: {} for file_path in reusable}
+
+        def claim_reused(batch: List[Document]) -> List[Document]:
+            """Drop chunks an older version already stores, returning those that need embedding."""
+            fresh = []
+            for doc in batch:
+                source_file = doc.metadata["source_file"]
+                point_ids = reusable.get(source_file, {}).get(doc.metadata["content_hash"])
+                if point_ids:
+                    reused_points[source_file][point_ids.pop(0)] = doc.metadata
+                else:
+                    fresh.append(doc)
+            if len(fresh) < len(batch):
+                report("chunks_reused", len(batch) - len(fresh))
+            return fresh
+
+        def fail_batch(batch: List[Document]):
+            failed_files.update(doc.metadata["source_file"] for doc in batch)
+
+        async def parse_file(file_path: str):
+            total = 0
+            try:
+                async with parse_slots:
+                    async for batch in self.parsing_pool.iter_document_batches(
+                        file_path, user_id, thread_id, INDEX_BATCH_SIZE, hashes_by_path[file_path]
+                    ):
+                        total += len(batch)
+                        await parsed_batches.put(batch)
+                chunk_totals[file_path] = total
+                report("files_parsed", 1)
+                logging.info(f"Loaded {total} chunks from {file_path}")
+            except Exception as e:
+                logging.error(f"Error processing {file_path}: {e}")
+                failed_files.add(file_path)
+
+        async def parse_stage():
+            await asyncio.gather(*[parse_file(file_path) for file_path in file_paths])
+            await parsed_batches.put(_END_OF_STREAM)
+
+        async def embed_batch(batch: List[Document], embed_slots: asyncio.Semaphore):
+            # Embedding is CPU-bound, keep it off the event loop
+            loop = asyncio.get_event_loop()
+            try:
+                vectors, sparse_vectors = await loop.run_in_executor(get_executor("embedding"), self._embed_documents, batch)
+                report("chunks_embedded", len(batch))
+                await embedded_batches.put((batch, vectors, sparse_vectors))
+            except Exception as e:
+                logging.error(f"Embedding failed for a batch of {len(batch)} chunks: {e}")
+                fail_batch(batch)
+            finally:
+                # Held until the batch is queued, so a slow upsert stage still bounds memory
+                embed_slots.release()
+
+        async def embed_stage():
+            # With embedding worker processes, several batches are embedded at once
+            embed_slots = asyncio.Semaphore(self.embedding_manager.parallelism)
+            embedding_tasks = []
+            pending = None
+            while True:
+                batch = pending if pending is not None else await parsed_batches.get()
+                pending = None
+                if batch is _END_OF_STREAM:
+                    break
+                # Top up short batches (file tails, small files) with batches that are already queued
+                while len(batch) < INDEX_BATCH_SIZE and not parsed_batches.empty():
+                    queued = parsed_batches.get_nowait()
+                    if queued is _END_OF_STREAM or len(batch) + len(queued) > INDEX_BATCH_SIZE:
+                        pending = queued
+                        break
+                    batch = batch + queued
+                batch = claim_reused(batch)
+                if not batch:
+                    continue
+                await embed_slots.acquire()
+                embedding_tasks.append(asyncio.create_task(embed_batch(batch, embed_slots)))
+            await asyncio.gather(*embedding_tasks)
+            await embedded_batches.put(_END_OF_STREAM)
+
+        async def upsert_batch(batch: List[Document], vectors, sparse_vectors):
+            for attempt in range(INDEX_UPSERT_RETRIES + 1):
+                try:
+                    await self.vector_backend.upsert_documents(batch, vectors, sparse_vectors, wait=False)
+                    report("chunks_upserted", len(batch))
+                    return
+                except Exception as e:
+                    if attempt == INDEX_UPSERT_RETRIES:
+                        logging.error(f"Upload failed for a batch of {len(batch)} chunks: {e}")
+                        fail_batch(batch)
+                        return
+                    logging.warning(f"Upload failed for a batch of {len(batch)} chunks, retrying: {e}")
+                    await asyncio.sleep(2 ** attempt)
+
+        async def upsert_stage():
+            while (item := await embedded_batches.get()) is not _END_OF_STREAM:
+                await upsert_batch(*item)
+
+        await asyncio.gather(parse_stage(), embed_stage(), upsert_stage())
+        try:
+            await self.vector_backend.wait_for_writes()
+        except Exception as e:
+            # Without the barrier nothing is known to be stored, treat every file as failed
+            logging.error(f"Waiting for upserts to be applied failed: {e}")
+            failed_files.update(file_paths)
+
+        # The chunk count is only known once a file is fully parsed, set it on the stored chunks now
+        async def finalize_file(file_path: str) -> Tuple[int, int]:
+            file_hash = hashes_by_path[file_path]
+            if file_path in failed_files:
+                # The previous version is only touched once the new one is complete, so it stays intact
+                await self.vector_backend.delete_document(file_hash, user_id, thread_id)
+                return 0, 0
+            total = chunk_totals.get(file_path, 0)
+            reused = reused_points.get(file_path, {})
+            if total and file_path in reusable:
+                try:
+                    if reused:
+                        await self.vector_backend.move_points(reused)
+                except Exception as e:
+                    # Reused chunks were never upserted, so the new version is incomplete without them
+                    logging.error(f"Could not move reused chunks to the new version of {file_path}: {e}")
+                    await self.vector_backend.delete_document(file_hash, user_id, thread_id)
+                    return 0, 0
+                try:
+                    await self.vector_backend.delete_stale_chunks(os.path.basename(file_path), file_hash, user_id, thread_id)
+                except Exception as e:
+                    logging.warning(f"Could not delete the previous version of {file_path}: {e}")
+                logging.info(f"Replaced previous version of {file_path}: {len(reused)} chunks reused, "
+                             f"{total - len(reused)} embedded")
+            if total:
+                try:
+                    await self.vector_backend.update_document_metadata(
+                        file_hash, user_id, thread_id,
+                        {"document_total_chunks": total, **(content_digests or {}).get(file_path, {})}
+                    )
+                except Exception as e:
+                    logging.warning(f"Could not set chunk totals for {file_path}: {e}")
+            return total, len(reused)
+
+        results = await asyncio.gather(*[finalize_file(file_path) for file_path in file_paths])
+        totals = [total for total, _ in results]
+        logging.info(f"Upload completed: {sum(totals)} chunks")
+        return sum(totals), sum(1 for total in totals if total), sum(reused for _, reused in results)
         
+    async def _log_tenant_size(self, user_id: str, thread_id: str, elapsed_ms: float):
+        """Debug-log search latency next to the tenant's point count.
+
+        Counting is a query of its own, so it only runs when debug logging is on,
+        after the search has been timed.
+        """
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return
+        try:
+            count = await self.vector_backend.count_tenant_points(user_id, thread_id)
+            logging.debug(f"Search for user '{user_id}' thread '{thread_id}' took {elapsed_ms:.1f} ms over {count} points")
+        except Exception as e:
+            logging.debug(f"Could not count points for user '{user_id}' thread '{thread_id}': {e}")
+
+    def _cosine_score_threshold(self) -> float:
+        """Map distance_threshold (a relevance score in [0, 1], as normalized by
+        QdrantVectorStore) onto the raw cosine similarity Qdrant filters on."""
+        return 2 * self.distance_threshold - 1
+
+    def _embed_documents(self, documents: List[Document]) -> Tuple[List[List[float]], Optional[List[models.SparseVector]]]:
+        """Embed chunks with the dense model and, for hybrid search, the sparse model."""
+        texts = [doc.page_content for doc in documents]
+        content_hashes = [doc.metadata.get("content_hash") for doc in documents]
+        dense_vectors = self.embedding_manager.embed_documents(texts, content_hashes)
+        sparse_vectors = self.embedding_manager.embed_sparse_documents(texts) if self.hybrid_search else None
+        return dense_vectors, sparse_vectors
+
+    def _embed_queries(self, queries: List[str]) -> Tuple[List[List[float]], Optional[List[models.SparseVector]]]:
+        """Embed queries with the dense model and, for hybrid search, the sparse model."""
+        dense_vectors = self.embedding_manager.embed_queries(queries)
+        sparse_vectors = self.embedding_manager.embed_sparse_queries(queries) if self.hybrid_search else None
+        return dense_vectors, sparse_vectors
+
+    @staticmethod
+    def _point_to_document(point) -> Document:
+        """Convert a Qdrant point stored by QdrantVectorStore back into a Document."""
+        payload = point.payload or {}
+        metadata = payload.get("metadata") or {}
+        metadata["_id"] = point.id
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
     async def search(self, query: str, user_id: str, thread_id: str, top_k: int = 10) -> List[Document]:
         # Ensure vector store is initialized
         if not self._initialized:
@@ -182,40 +486,89 @@ class DocumentIndexer:
         logging.info(f"Searching for: '{query[:50]}{'...' if len(query) > 50 else ''}' (top_k={top_k})")
 
         try:
-            if self.vector_store is None:
-                logging.error("Vector store is not initialized")
-                return []
-                
-            search_k = min(top_k * 2, 30)
-            results = self.vector_store.similarity_search_with_relevance_scores(
-                query=query,
-                k=search_k
-            )
+            start_time = time.perf_counter()
 
-            filtered_results = []
-            for doc, score in results:
-                if score >= self.distance_threshold:  # e.g., 0.7
-                    doc_user_id = doc.metadata.get('user_id')
-                    doc_thread_id = doc.metadata.get('thread_id')
-
-                    if doc_user_id == user_id and doc_thread_id == thread_id:
-                        filtered_results.append(doc)
-                        if len(filtered_results) >= top_k:
-                            break
-                    else:
-                        logging.debug(f"Metadata mismatch - Expected: user={user_id}, thread={thread_id}, "
-                                    f"Got: user={doc_user_id}, thread={doc_thread_id}")
-                else:
-                    logging.debug(f"Filtered out - Relevance Score: {score:.3f} < threshold: {self.distance_threshold}")
+            # Embedding is CPU-bound, keep it off the event loop
+            loop = asyncio.get_event_loop()
+            dense_vectors, sparse_vectors = await loop.run_in_executor(get_executor("embedding"), self._embed_queries, [query])
 
-            logging.info(f"Search completed: {len(filtered_results)}/{len(results)} results passed filtering")
-            return filtered_results
+            # Scope the ANN search to the caller's thread inside Qdrant so the HNSW
+            # walk only visits this tenant's points instead of post-filtering a global top-k
+            points = await self.vector_backend.search(
+                dense_vectors[0],
+                user_id,
+                thread_id,
+                limit=top_k,
+                score_threshold=self._cosine_score_threshold(),
+                sparse_vector=sparse_vectors[0] if sparse_vectors else None,
+                oversampling=SEARCH_OVERSAMPLING,
+                rescore=SEARCH_RESCORE
+            )
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+            results = [self._point_to_document(point) for point in points]
+            logging.info(f"Search completed in {elapsed_ms:.1f} ms for user '{user_id}' thread '{thread_id}': "
+                         f"{len(results)} results above threshold {self.distance_threshold}")
+            await self._log_tenant_size(user_id, thread_id, elapsed_ms)
+            return results
 
         except Exception as e:
             logging.error(f"Search failed: {e}")
             # Return empty list instead of crashing
             return []
     
+    async def search_batch(self, queries: List[str], user_id: str, thread_id: str, top_k: int = 10) -> List[List[Document]]:
+        """Search for several queries with one embedding call and one Qdrant batch request.
+
+        Returns one result list per query, in order, with ``source_task`` set to the query.
+        """
+        if not queries:
+            return []
+
+        if not self._initialized:
+            try:
+                await self._initialize_vector_store(self._force_recreate)
+            except Exception as e:
+                logging.error(f"Failed to initialize vector store for batch search: {e}")
+                return [[] for _ in queries]
+
+        logging.info(f"Batch searching {len(queries)} queries (top_k={top_k})")
+
+        try:
+            start_time = time.perf_counter()
+
+            # Embedding is CPU-bound, keep it off the event loop
+            loop = asyncio.get_event_loop()
+            dense_vectors, sparse_vectors = await loop.run_in_executor(get_executor("embedding"), self._embed_queries, queries)
+
+            point_lists = await self.vector_backend.search_batch(
+                dense_vectors,
+                user_id,
+                thread_id,
+                limit=top_k,
+                score_threshold=self._cosine_score_threshold(),
+                sparse_vectors=sparse_vectors,
+                oversampling=SEARCH_OVERSAMPLING,
+                rescore=SEARCH_RESCORE
+            )
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+            results = []
+            for query, points in zip(queries, point_lists):
+                documents = [self._point_to_document(point) for point in points]
+                for doc in documents:
+                    doc.metadata["source_task"] = query
+                results.append(documents)
+
+            logging.info(f"Batch search completed in {elapsed_ms:.1f} ms for user '{user_id}' thread '{thread_id}': "
+                         f"{sum(len(r) for r in results)} results across {len(queries)} queries")
+            await self._log_tenant_size(user_id, thread_id, elapsed_ms)
+            return results
+
+        except Exception as e:
+            logging.error(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+    
     # Sync wrappers for backward compatibility
     def index_documents_sync(self, file_paths: List[str], user_id:str, thread_id: str) -> Dict[str, Any]:
         try:
@@ -233,4 +586,10 @@ class DocumentIndexer:
             # No event loop running, create one
             return asyncio.run(self.search(query, user_id, thread_id, top_k))
     
-
+    def search_batch_sync(self, queries: List[str], user_id: str, thread_id: str, top_k: int = 10) -> List[List[Document]]:
+        try:
+            loop = asyncio.get_event_loop()
+            return loop.run_until_complete(self.search_batch(queries, user_id, thread_id, top_k))
+        except RuntimeError:
+            # No event loop running, create one
+            return asyncio.run(self.search_batch(queries, user_id, thread_id, top_k))
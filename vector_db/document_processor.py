@@ -1,7 +1,13 @@
+import io
+import os
+import mmap
+import codecs
 import hashlib
 import logging
-from typing import List
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
+from pypdf import PdfReader, PdfWriter
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
@@ -15,6 +21,11 @@ from langchain_community.document_loaders import (
     CSVLoader
 )
 
+try:
+    import chardet
+except ImportError:  # Only needed for text files that are not UTF-8
+    chardet = None
+
 # --- Basic Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -29,14 +40,37 @@ class DocumentProcessor:
         '.r', '.sql', '.sh', '.bat', '.ps1',
         '.xml', '.md', '.rst', '.toml', '.ini'
     }
+
+    # Plain-text and code formats, read by the streaming text reader instead of a LangChain loader
+    TEXT_EXTENSIONS = SUPPORTED_EXTENSIONS - {
+        '.pdf', '.docx', '.doc', '.ppt', '.pptx', '.csv', '.xlsx', '.xls', '.odt', '.json'
+    }
+
+    # Text held by the streaming splitter at once, independent of file size
+    SPLIT_WINDOW_CHARS = 256_000
+    # Bytes decoded per step by the text reader, and bytes inspected to pick the encoding
+    READ_BLOCK_BYTES = 1024 * 1024
+    ENCODING_SNIFF_BYTES = 64 * 1024
+    # PDF pages extracted together; pages without a text layer in a group share one Unstructured call
+    PDF_PAGES_PER_GROUP = 8
     
     def calculate_file_hash(self, file_path: str) -> str:
         hash_md5 = hashlib.md5()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 hash_md5.update(chunk)
         return hash_md5.hexdigest()
 
+    def calculate_file_digests(self, file_path: str) -> Tuple[str, str]:
+        """md5 and sha256 of a file in one read."""
+        hash_md5 = hashlib.md5()
+        hash_sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hash_md5.update(chunk)
+                hash_sha256.update(chunk)
+        return hash_md5.hexdigest(), hash_sha256.hexdigest()
+
     def _get_appropriate_loader(self, file_path_str: str, file_extension: str):
         if file_extension == '.pdf':
             return UnstructuredPDFLoader(file_path_str, mode="single")
@@ -55,6 +89,48 @@ class DocumentProcessor:
         else: # Covers all other text-based formats
             return TextLoader(file_path_str, encoding='utf-8', autodetect_encoding=True)
 
+    @staticmethod
+    def _detect_encoding(prefix: bytes) -> str:
+        """Pick the encoding of a text file from its first bytes: BOM, then UTF-8, then chardet."""
+        # UTF-32 LE starts with the UTF-16 LE BOM, so it is checked first
+        for bom, encoding in ((codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+                              (codecs.BOM_UTF8, 'utf-8-sig'),
+                              (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+            if prefix.startswith(bom):
+                return encoding
+        try:
+            # Not final, the prefix may end inside a multi-byte character
+            codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        if chardet is not None:
+            detected = chardet.detect(prefix).get('encoding')
+            if detected:
+                return detected
+        return 'cp1252'
+
+    def _read_text_stream(self, file_path: str) -> Iterator[str]:
+        """Decode a text file from a memory map in READ_BLOCK_BYTES steps, never holding the whole text.
+
+        Newlines are translated like a file opened in text mode (what TextLoader does).
+        Bytes invalid in the detected encoding are replaced rather than failing the file.
+        """
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoding = self._detect_encoding(data[:self.ENCODING_SNIFF_BYTES])
+                decoder = io.IncrementalNewlineDecoder(
+                    codecs.getincrementaldecoder(encoding)(errors='replace'), translate=True
+                )
+                for start in range(0, size, self.READ_BLOCK_BYTES):
+                    end = start + self.READ_BLOCK_BYTES
+                    text = decoder.decode(data[start:end], final=end >= size)
+                    if text:
+                        yield text
+
     def _get_text_splitter(self) -> RecursiveCharacterTextSplitter:
         return RecursiveCharacterTextSplitter(
             chunk_size=2000,
@@ -64,56 +140,182 @@ class DocumentProcessor:
             separators=["\n\n", "\n", ". ", "? ", "! ", " ", ""]
         )
 
-    def load_document(self, file_path: str, user_id: str, thread_id: str) -> List[Document]:
+    def _split_text_stream(self, text_parts: Iterable[str], separator: str = "\n\n") -> Iterator[str]:
+        """Split a stream of text parts as if they were joined with separator.
+
+        Text is fed to the splitter in windows of SPLIT_WINDOW_CHARS; the last chunk of
+        each window is carried into the next one, so boundaries and overlap closely follow
+        splitting the whole text at once while only a window is held in memory.
+        """
+        text_splitter = self._get_text_splitter()
+        buffer = ""
+        for part in text_parts:
+            if not part:
+                continue
+            if buffer:
+                buffer += separator
+            for start in range(0, len(part), self.SPLIT_WINDOW_CHARS):
+                buffer += part[start:start + self.SPLIT_WINDOW_CHARS]
+                if len(buffer) >= self.SPLIT_WINDOW_CHARS:
+                    chunks = text_splitter.split_text(buffer)
+                    if len(chunks) < 2:
+                        continue
+                    yield from chunks[:-1]
+                    # Carry the raw tail, chunks are whitespace-stripped and the cut may fall between words
+                    buffer = buffer[max(buffer.rfind(chunks[-1]), 0):]
+        if buffer:
+            yield from text_splitter.split_text(buffer)
+
+    @staticmethod
+    def count_pdf_pages(file_path: str) -> int:
+        """Page count from the PDF's page tree; raises if the file cannot be opened without Unstructured."""
+        return len(PdfReader(file_path).pages)
+
+    def _ocr_pdf_pages(self, reader: PdfReader, page_indexes: List[int]) -> Dict[int, str]:
+        """Run Unstructured on pages without a text layer, copied into one temporary PDF."""
+        writer = PdfWriter()
+        for page_index in page_indexes:
+            writer.add_page(reader.pages[page_index])
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            writer.write(f)
+            temp_path = f.name
+        try:
+            docs = UnstructuredPDFLoader(temp_path, mode="paged").load()
+        except Exception as e:
+            logging.warning(f"Unstructured fallback failed for {len(page_indexes)} pages without text: {e}")
+            return {}
+        finally:
+            os.unlink(temp_path)
+
+        texts: Dict[int, str] = {}
+        for doc in docs:
+            page_number = doc.metadata.get("page_number")
+            if page_number and page_number <= len(page_indexes):
+                page_index = page_indexes[page_number - 1]
+                texts[page_index] = (texts[page_index] + "\n\n" if page_index in texts else "") + doc.page_content
+        return texts
+
+    def iter_pdf_page_chunks(self, file_path: str, first_page: int = 0,
+                             last_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (1-based page number, chunk) for pages [first_page, last_page) of a PDF.
+
+        Text comes from the embedded text layer; only pages without one are sent to
+        Unstructured. Pages are split separately, so every chunk belongs to one page.
+        """
+        reader = PdfReader(file_path)
+        last_page = len(reader.pages) if last_page is None else min(last_page, len(reader.pages))
+        text_splitter = self._get_text_splitter()
+        for group_start in range(first_page, last_page, self.PDF_PAGES_PER_GROUP):
+            group = range(group_start, min(group_start + self.PDF_PAGES_PER_GROUP, last_page))
+            texts: Dict[int, str] = {}
+            for page_index in group:
+                try:
+                    texts[page_index] = reader.pages[page_index].extract_text() or ""
+                except Exception as e:
+                    logging.warning(f"Could not extract text of page {page_index + 1} of {file_path}: {e}")
+                    texts[page_index] = ""
+            empty_pages = [page_index for page_index in group if not texts[page_index].strip()]
+            if empty_pages:
+                texts.update(self._ocr_pdf_pages(reader, empty_pages))
+            for page_index in group:
+                for chunk in text_splitter.split_text(texts.get(page_index, "")):
+                    yield page_index + 1, chunk
+
+    def _iter_pdf_chunks(self, file_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        try:
+            page_count = self.count_pdf_pages(file_path)
+        except Exception as e:
+            # Damaged or encrypted files: let Unstructured try the whole document as before
+            logging.warning(f"Could not read the text layer of {file_path} ({e}), parsing it with Unstructured")
+            loader = UnstructuredPDFLoader(file_path, mode="single")
+            for chunk in self._split_text_stream(doc.page_content for doc in loader.lazy_load()):
+                yield chunk, {}
+            return
+        for page_number, chunk in self.iter_pdf_page_chunks(file_path, 0, page_count):
+            yield chunk, {'page_number': page_number}
+
+    @staticmethod
+    def make_chunk(chunk: str, user_id: str, thread_id: str, file_hash: str, file_path: str,
+                   chunk_number: int, extra_metadata: Optional[Dict[str, Any]] = None) -> Document:
+        file_path_obj = Path(file_path)
+        return Document(
+            page_content=chunk,
+            metadata={
+                'user_id': user_id,
+                'thread_id': thread_id,
+                'file_hash': file_hash,
+                'content_hash': hashlib.md5(chunk.encode('utf-8')).hexdigest(),
+                'source_file': str(file_path_obj),
+                'source_name': file_path_obj.name,
+                'chunk_number': chunk_number,
+                **(extra_metadata or {})
+            }
+        )
+
+    def iter_document_batches(self, file_path: str, user_id: str, thread_id: str,
+                              batch_size: int = 64, file_hash: Optional[str] = None) -> Iterator[List[Document]]:
+        """Load and split a file lazily, yielding chunks in batches of batch_size.
+
+        Pass file_hash when it is already known so the file is not read again to hash it.
+        ``document_total_chunks`` is only known once the file is exhausted, so it is
+        left out here; load_document and the indexer fill it in afterwards.
+        Missing and unsupported files yield nothing, loader errors propagate.
+        """
         file_path_obj = Path(file_path)
         if not file_path_obj.is_file():
             logging.error(f"File not found or is not a file: {file_path}")
-            return []
+            return
 
         file_extension = file_path_obj.suffix.lower()
         if not self.is_supported_file(str(file_path_obj)):
             logging.warning(f"Unsupported file type: {file_extension}. Skipping.")
-            return []
-        
+            return
+
         logging.info(f"Processing '{file_path_obj.name}' with hybrid strategy.")
-        
-        try:
-            loader = self._get_appropriate_loader(str(file_path_obj), file_extension)
-            docs_from_loader = loader.load()
-            final_docs = []
-
-            logging.info(f"Non-PDF detected. Using whole-document splitting.")
-            full_text = "\n\n".join(doc.page_content for doc in docs_from_loader if doc.page_content)
-            if full_text:
-                text_splitter = self._get_text_splitter()
-                final_docs = text_splitter.create_documents([full_text])
-
-            if not final_docs:
-                logging.warning(f"No content processed for {file_path_obj.name}. Skipping.")
-                return []
-
-            file_hash = self.calculate_file_hash(str(file_path_obj))
-            total_chunks = len(final_docs)
-            for i, doc in enumerate(final_docs):
-                content_hash = hashlib.md5(doc.page_content.encode('utf-8')).hexdigest()
-                new_metadata = doc.metadata.copy()
-                new_metadata.update({
-                    'user_id': user_id,
-                    'thread_id': thread_id,
-                    'file_hash': file_hash,
-                    'content_hash': content_hash,
-                    'source_file': str(file_path_obj),
-                    'chunk_number': i + 1,
-                    'document_total_chunks': total_chunks
-                })
-                doc.metadata = new_metadata
-
-            logging.info(f"Successfully processed '{file_path_obj.name}', created {total_chunks} chunks.")
-            return final_docs
+        file_hash = file_hash or self.calculate_file_hash(str(file_path_obj))
+
+        if file_extension == '.pdf':
+            chunks = self._iter_pdf_chunks(str(file_path_obj))
+        else:
+            if file_extension in self.TEXT_EXTENSIONS:
+                # One file is one continuous text, read in blocks that are joined back without a separator
+                text_parts = self._read_text_stream(str(file_path_obj))
+                separator = ""
+            else:
+                loader = self._get_appropriate_loader(str(file_path_obj), file_extension)
+                text_parts = (doc.page_content for doc in loader.lazy_load())
+                separator = "\n\n"
+            chunks = ((chunk, None) for chunk in self._split_text_stream(text_parts, separator))
+
+        batch = []
+        chunk_number = 0
+        for chunk, extra_metadata in chunks:
+            chunk_number += 1
+            batch.append(self.make_chunk(chunk, user_id, thread_id, file_hash, str(file_path_obj),
+                                         chunk_number, extra_metadata))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+        logging.info(f"Successfully processed '{file_path_obj.name}', created {chunk_number} chunks.")
 
+    def load_document(self, file_path: str, user_id: str, thread_id: str) -> List[Document]:
+        try:
+            final_docs = [doc for batch in self.iter_document_batches(file_path, user_id, thread_id) for doc in batch]
         except Exception as e:
             logging.error(f"Error processing {file_path}: {e}", exc_info=True)
             return []
+
+        if not final_docs:
+            logging.warning(f"No content processed for {Path(file_path).name}. Skipping.")
+            return []
+
+        total_chunks = len(final_docs)
+        for doc in final_docs:
+            doc.metadata['document_total_chunks'] = total_chunks
+        return final_docs
     
     def is_supported_file(self, file_path: str) -> bool:
         return Path(file_path).suffix.lower() in self.SUPPORTED_EXTENSIONS
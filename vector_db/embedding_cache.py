@@ -0,0 +1,208 @@
+import os
+import re
+import time
+import fcntl
+import sqlite3
+import logging
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+from config import CACHE_DIR
+
+class EmbeddingCache:
+    """Persistent, content-addressed cache of document embeddings for one model.
+
+    Vectors live in a memory-mapped float32 ``.npy`` matrix under
+    ``CACHE_DIR/embeddings/<model>``; a SQLite index maps each chunk's
+    content_hash to its row and last use. When ``max_entries`` is reached the
+    least recently used rows are overwritten.
+
+    Several processes (e.g. uvicorn workers that each load the models) may share
+    the directory. SQLite is the only record of which row holds what, and every
+    access holds an flock on the directory's lock file, shared for lookups and
+    exclusive for writes, so rows are never handed out twice and a replaced vector
+    file is re-mapped before use. Recency updates from lookups are kept in memory
+    and written with the next put, or every TICK_FLUSH_ENTRIES hashes, so reads
+    never wait on a disk write.
+    """
+
+    INITIAL_CAPACITY = 1024
+    TICK_FLUSH_ENTRIES = 1024
+    LOOKUP_BATCH = 500  # Below SQLite's bound on query parameters
+
+    def __init__(self, model_id: str, dimension: int, max_entries: int, cache_dir: Optional[str] = None):
+        self.model_id = model_id
+        self.dimension = dimension
+        self.max_entries = max_entries
+        model_dir = re.sub(r"[^A-Za-z0-9._-]+", "__", model_id)
+        self.cache_dir = os.path.join(cache_dir or os.path.join(CACHE_DIR, "embeddings"), model_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._lock_file = open(os.path.join(self.cache_dir, "lock"), "a+")
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # content_hash -> last use, not yet written to SQLite
+        self._pending_ticks: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._vectors_inode: Optional[int] = None
+
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), check_same_thread=False)
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._db.execute("CREATE TABLE IF NOT EXISTS entries (content_hash TEXT PRIMARY KEY, slot INTEGER NOT NULL, tick INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_tick ON entries (tick)")
+            self._db.commit()
+            self._open_vectors()
+            entries = self._count()
+        logging.info(f"Embedding cache for '{model_id}' at {self.cache_dir}: {entries} entries")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.cache_dir, "vectors.npy")
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        fcntl.flock(self._lock_file, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _sync_vectors(self):
+        """Map the current vector file, which another process may have replaced while growing it."""
+        inode = os.stat(self._vectors_path).st_ino
+        if self._vectors is None or inode != self._vectors_inode:
+            self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+            self._vectors_inode = inode
+
+    def _open_vectors(self):
+        """Check the vector file against the index, or start over (under the exclusive lock)."""
+        if os.path.exists(self._vectors_path):
+            self._sync_vectors()
+            entries = self._count()
+            max_slot = self._db.execute("SELECT COALESCE(MAX(slot), -1) FROM entries").fetchone()[0]
+            consistent = (
+                self._vectors.shape[1] == self.dimension
+                and entries <= min(self.max_entries, self._vectors.shape[0])
+                and max_slot < entries
+            )
+            if consistent:
+                return
+            logging.warning(f"Embedding cache for '{self.model_id}' does not match the current settings, clearing it")
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+        self._allocate(min(self.INITIAL_CAPACITY, self.max_entries))
+
+    def _allocate(self, capacity: int, keep_rows: Optional[np.ndarray] = None):
+        tmp_path = self._vectors_path + ".tmp"
+        vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dimension))
+        if keep_rows is not None and len(keep_rows):
+            vectors[:len(keep_rows)] = keep_rows
+        vectors.flush()
+        del vectors
+        self._vectors = None
+        os.replace(tmp_path, self._vectors_path)
+        self._sync_vectors()
+
+    def _lookup(self, content_hashes: Sequence[str]) -> Dict[str, int]:
+        slots = {}
+        unique = list(dict.fromkeys(content_hashes))
+        for start in range(0, len(unique), self.LOOKUP_BATCH):
+            batch = unique[start:start + self.LOOKUP_BATCH]
+            slots.update(self._db.execute(
+                f"SELECT content_hash, slot FROM entries WHERE content_hash IN ({','.join('?' * len(batch))})", batch
+            ))
+        return slots
+
+    def _flush_ticks(self):
+        if self._pending_ticks:
+            self._db.executemany("UPDATE entries SET tick = ? WHERE content_hash = ?",
+                                 [(tick, content_hash) for content_hash, tick in self._pending_ticks.items()])
+            self._pending_ticks.clear()
+
+    def _free_slots(self, needed: int) -> List[int]:
+        """Hand out unused rows, growing the file geometrically and evicting LRU entries at the cap."""
+        used = self._count()
+        capacity = self._vectors.shape[0]
+        if used + needed > capacity and capacity < self.max_entries:
+            new_capacity = min(self.max_entries, max(used + needed, 2 * capacity))
+            self._allocate(new_capacity, np.array(self._vectors[:used]))
+            capacity = new_capacity
+
+        # Rows are only freed by eviction and reused at once, so rows [0, used) are always taken
+        free = list(range(used, min(capacity, self.max_entries, used + needed)))
+        if len(free) < needed:
+            evicted = self._db.execute(
+                "SELECT content_hash, slot FROM entries ORDER BY tick LIMIT ?", (needed - len(free),)
+            ).fetchall()
+            self._db.executemany("DELETE FROM entries WHERE content_hash = ?", [(content_hash,) for content_hash, _ in evicted])
+            free.extend(slot for _, slot in evicted)
+            self._evictions += len(evicted)
+        return free
+
+    def get_many(self, content_hashes: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector for each hash, or None where it is missing."""
+        with self._lock:
+            with self._file_lock(fcntl.LOCK_SH):
+                self._sync_vectors()
+                slots = self._lookup(content_hashes)
+                results = [self._vectors[slots[content_hash]].tolist() if content_hash in slots else None
+                           for content_hash in content_hashes]
+
+            tick = time.time_ns()
+            for content_hash in slots:
+                self._pending_ticks[content_hash] = tick
+            hits = sum(result is not None for result in results)
+            self._hits += hits
+            self._misses += len(results) - hits
+
+            if len(self._pending_ticks) >= self.TICK_FLUSH_ENTRIES:
+                with self._file_lock(fcntl.LOCK_EX):
+                    self._flush_ticks()
+                    self._db.commit()
+            return results
+
+    def put_many(self, content_hashes: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for hashes that are not cached yet."""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._sync_vectors()
+            self._flush_ticks()
+            # Another process may have cached some of them since the lookup
+            present = self._lookup(content_hashes)
+            new_entries = {}
+            for content_hash, vector in zip(content_hashes, vectors):
+                if content_hash not in present:
+                    new_entries[content_hash] = vector
+
+            if new_entries:
+                # Never cache more than fits, keep the last ones of an oversized batch
+                items = list(new_entries.items())[-self.max_entries:]
+                slots = self._free_slots(len(items))
+                tick = time.time_ns()
+                rows = []
+                for (content_hash, vector), slot in zip(items, slots):
+                    self._vectors[slot] = vector
+                    rows.append((content_hash, slot, tick))
+                self._vectors.flush()
+                self._db.executemany("INSERT OR REPLACE INTO entries (content_hash, slot, tick) VALUES (?, ?, ?)", rows)
+            self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            with self._file_lock(fcntl.LOCK_SH):
+                entries = self._count()
+            lookups = self._hits + self._misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,103 @@
+import os
+import logging
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List, Optional
+
+# --- Worker process side ---
+
+_model = None
+
+def _init_worker(model_name: str, cache_dir: str, threads: Optional[int]):
+    global _model
+    from fastembed import TextEmbedding
+    _model = TextEmbedding(model_name=model_name, cache_dir=cache_dir, threads=threads)
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return np.stack(list(_model.passage_embed(texts, batch_size=len(texts)))).astype(np.float32)
+
+# --- Parent process side ---
+
+class EmbeddingEngine:
+    """Data-parallel document embedding on FastEmbed's ONNX models.
+
+    Texts are sorted by length before being cut into batches of ``batch_size``, so
+    each ONNX batch pads to about the same length. With ``workers`` > 0 every worker
+    process owns a session with ``threads`` intra-op threads and batches run on all
+    of them at once; with 0 they run one after another on the in-process model.
+    """
+
+    def __init__(self, local_model: Any, model_name: str, cache_dir: str, batch_size: int = 64,
+                 threads: Optional[int] = None, workers: int = 0, length_bucketing: bool = True):
+        self.local_model = local_model
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self.workers = workers
+        # Split the cores between the workers unless told otherwise, so sessions do not oversubscribe
+        self.threads = threads or (max(1, (os.cpu_count() or 1) // workers) if workers else None)
+        self.length_bucketing = length_bucketing
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: ONNX Runtime thread pools do not survive a fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.cache_dir, self.threads)
+                )
+                logging.info(f"Started {self.workers} embedding workers with {self.threads} threads each")
+            return self._executor
+
+    def _batches(self, texts: List[str]) -> List[List[int]]:
+        order = range(len(texts))
+        if self.length_bucketing:
+            order = sorted(order, key=lambda i: len(texts[i]))
+        order = list(order)
+        return [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, returning vectors in input order."""
+        if not texts:
+            return []
+
+        batches = self._batches(texts)
+        if self.workers:
+            executor = self._get_executor()
+            futures = [executor.submit(_embed_batch, [texts[i] for i in batch]) for batch in batches]
+            try:
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise RuntimeError("An embedding worker died, the pool will be restarted for the next batch")
+        else:
+            results = [
+                list(self.local_model.passage_embed([texts[i] for i in batch], batch_size=len(batch)))
+                for batch in batches
+            ]
+
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, vectors in zip(batches, results):
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector.tolist()
+        return embeddings
+
+    @property
+    def parallelism(self) -> int:
+        """Batches worth embedding at the same time."""
+        return max(1, self.workers)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,21 +1,65 @@
 import logging
+import hashlib
 import os
-from typing import List, Literal, Dict
+from typing import List, Literal, Dict, Optional
 from langchain_community.embeddings import FastEmbedEmbeddings
 from langchain_deepinfra import DeepInfraEmbeddings
-from config import EMBEDDING_MODEL_ID, CACHE_DIR
+from langchain_qdrant import FastEmbedSparse
+from qdrant_client.http import models
+from .embedding_cache import EmbeddingCache
+from .embedding_engine import EmbeddingEngine
+from .model_server import ModelClient
+from config import (
+    EMBEDDING_MODEL_ID,
+    CACHE_DIR,
+    EMBEDDING_CACHE,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    EMBEDDING_WORKERS,
+    EMBEDDING_LENGTH_BUCKETING,
+    MODEL_SERVER_SOCKET,
+)
 
 class EmbeddingManager:
-    """Embedding manager supporting FastEmbed and DeepInfra providers."""
+    """Embedding manager supporting FastEmbed and DeepInfra providers.
     
-    def __init__(self, embedding_provider: Literal["fastembed", "deepinfra"] = "fastembed"):
+    With a model_server socket the FastEmbed models are not loaded here; every call goes
+    to the shared model server, which also owns the embedding cache.
+    """
+    
+    def __init__(self, embedding_provider: Literal["fastembed", "deepinfra"] = "fastembed",
+                 sparse_model_id: Optional[str] = None, model_server: Optional[str] = MODEL_SERVER_SOCKET):
         self.provider = embedding_provider
+        self.engine = None
+        self.client = None
+        self.sparse_model_id = sparse_model_id
+        
+        if embedding_provider == "fastembed" and model_server:
+            self.client = ModelClient(model_server)
+            self.embeddings = None
+            self.sparse_embeddings = None
+            self.cache = None
+            logging.info(f"Using shared model server at {model_server} for embeddings")
+            return
         
         if embedding_provider == "fastembed":
+            # With worker processes the in-process session only embeds queries, so it keeps ONNX's default threads
             self.embeddings = FastEmbedEmbeddings(
                 model_name=EMBEDDING_MODEL_ID,
                 cache_dir=CACHE_DIR,
-                doc_embed_type="passage"
+                doc_embed_type="passage",
+                batch_size=EMBEDDING_BATCH_SIZE,
+                threads=None if EMBEDDING_WORKERS else EMBEDDING_THREADS
+            )
+            self.engine = EmbeddingEngine(
+                self.embeddings.model,
+                EMBEDDING_MODEL_ID,
+                CACHE_DIR,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                threads=EMBEDDING_THREADS,
+                workers=EMBEDDING_WORKERS,
+                length_bucketing=EMBEDDING_LENGTH_BUCKETING
             )
             logging.info(f"Initialized FastEmbed embedding manager with model: {EMBEDDING_MODEL_ID}")
             
@@ -34,6 +78,21 @@ class EmbeddingManager:
             
         else:
             raise ValueError(f"Unsupported embedding provider: {embedding_provider}")
+        
+        # Sparse embeddings always run locally through FastEmbed
+        self.sparse_embeddings = None
+        if sparse_model_id:
+            self.sparse_embeddings = FastEmbedSparse(model_name=sparse_model_id, cache_dir=CACHE_DIR)
+            logging.info(f"Initialized FastEmbed sparse embeddings with model: {sparse_model_id}")
+        
+        # Providers may serve the same model id with different weights, so each gets its own cache
+        self.cache = None
+        if EMBEDDING_CACHE:
+            self.cache = EmbeddingCache(
+                f"{embedding_provider}/{EMBEDDING_MODEL_ID}",
+                self.get_embedding_dimension(),
+                EMBEDDING_CACHE_MAX_ENTRIES
+            )
     
     def get_embedding_dimension(self) -> int:
         """Get the dimension of the embedding model."""
@@ -48,14 +107,98 @@ class EmbeddingManager:
     
     def embed_query(self, query: str) -> List[float]:
         """Embed a single query using consistent embedding type."""
+        if self.client is not None:
+            return self.client.embed_queries([query])[0]
         return self.embeddings.embed_query(query)
     
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed a list of documents."""
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched call."""
+        if not queries:
+            return []
+        
+        if self.client is not None:
+            return self.client.embed_queries(queries)
+        
+        if self.provider == "fastembed":
+            # FastEmbedEmbeddings only exposes single-query embedding, so batch through the model directly
+            embeddings = self.embeddings.model.query_embed(queries, batch_size=self.embeddings.batch_size)
+            return [embedding.tolist() for embedding in embeddings]
+        
+        # DeepInfra embeds queries and documents with the same model call
+        return self.embeddings.embed_documents(queries)
+    
+    def embed_sparse_queries(self, queries: List[str]) -> List[models.SparseVector]:
+        """Embed queries with the sparse model for hybrid search."""
+        if self.client is not None and self.sparse_model_id:
+            return self.client.embed_sparse_queries(queries)
+        if self.sparse_embeddings is None:
+            raise ValueError("Sparse embeddings are not enabled for this embedding manager")
+        
+        sparse_vectors = [self.sparse_embeddings.embed_query(query) for query in queries]
+        return [models.SparseVector(indices=v.indices, values=v.values) for v in sparse_vectors]
+    
+    def embed_sparse_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        """Embed documents with the sparse model for hybrid search."""
+        if self.client is not None and self.sparse_model_id:
+            return self.client.embed_sparse_documents(texts)
+        if self.sparse_embeddings is None:
+            raise ValueError("Sparse embeddings are not enabled for this embedding manager")
+        
+        sparse_vectors = self.sparse_embeddings.embed_documents(texts)
+        return [models.SparseVector(indices=v.indices, values=v.values) for v in sparse_vectors]
+    
+    def embed_documents(self, texts: List[str], content_hashes: Optional[List[Optional[str]]] = None) -> List[List[float]]:
+        """Embed a list of documents, reusing cached vectors for content embedded before.
+        
+        content_hashes are the chunks' md5 hashes when the caller already has them.
+        """
         if not texts:
             return []
         
-        logging.info(f"Embedding {len(texts)} documents...")
-        embeddings = self.embeddings.embed_documents(texts)
+        if self.client is not None:
+            return self.client.embed_documents(texts, content_hashes)
+        
+        if self.cache is None:
+            logging.info(f"Embedding {len(texts)} documents...")
+            embeddings = self._embed_texts(texts)
+            logging.info(f"Successfully embedded {len(embeddings)} documents")
+            return embeddings
+        
+        content_hashes = content_hashes or [None] * len(texts)
+        hashes = [
+            content_hash or hashlib.md5(text.encode('utf-8')).hexdigest()
+            for text, content_hash in zip(texts, content_hashes)
+        ]
+        embeddings = self.cache.get_many(hashes)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        logging.info(f"Embedding {len(missing)} documents ({len(texts) - len(missing)} from cache)...")
+        if missing:
+            new_embeddings = self._embed_texts([texts[i] for i in missing])
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
+            self.cache.put_many([hashes[i] for i in missing], new_embeddings)
         logging.info(f"Successfully embedded {len(embeddings)} documents")
         return embeddings
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if self.engine is not None:
+            return self.engine.embed(texts)
+        return self.embeddings.embed_documents(texts)
+    
+    @property
+    def parallelism(self) -> int:
+        """Document batches the indexer may embed at the same time."""
+        if self.client is not None:
+            return self.client.info()["parallelism"]
+        return self.engine.parallelism if self.engine is not None else 1
+    
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hit rate and size of the embedding cache, None when it is disabled."""
+        if self.client is not None:
+            try:
+                return self.client.call("info")["cache"]
+            except OSError as e:
+                logging.warning(f"Could not read cache stats from the model server: {e}")
+                return None
+        return self.cache.stats() if self.cache is not None else None
@@ -64,6 +64,6 @@ if __name__ == "__main__":
     
     # os.environ['FASTEMBED_CACHE_PATH'] = 'cache'
     # indexer = get_global_indexer()
-    # indexer.qdrant_manager.delete_collection() 
+    # indexer.vector_backend.delete_collection() 
     
     main()
@@ -0,0 +1,479 @@
+import os
+import json
+import shutil
+import asyncio
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain.schema import Document
+from qdrant_client.http import models
+
+from .vector_backend import VectorBackend, chunk_point_id
+from utils.executors import get_executor
+from config import CACHE_DIR
+
+class LocalVectorBackend(VectorBackend):
+    """In-process vector store for tests, benchmarks and single-box deployments.
+
+    Normalized embeddings live in a memory-mapped ``.npy`` matrix under
+    ``CACHE_DIR/vectors/<collection>``, with payloads in a JSON-lines file next to it.
+    Tenant and file-hash filters are evaluated as vectorized masks over payload arrays
+    and top-k is a single matrix product, so semantics match QdrantManager with
+    exact (brute-force) search.
+
+    Deleted rows are tombstoned (their payload becomes null, which no filter
+    matches) and recorded with an appended line, and the files are compacted once
+    tombstones make up COMPACT_FRACTION of the rows, so deletes stay amortized
+    O(deleted rows).
+    """
+
+    INITIAL_CAPACITY = 1024
+    COMPACT_FRACTION = 0.25
+
+    def __init__(self, collection_name: str = "documents", storage_dir: Optional[str] = None):
+        self.collection_name = collection_name
+        self.storage_dir = os.path.join(storage_dir or os.path.join(CACHE_DIR, "vectors"), collection_name)
+        self._lock = threading.RLock()
+        self._reset_state()
+        self._load()
+        logging.info(f"Using local vector backend at {self.storage_dir}")
+
+    # --- Storage ---
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.storage_dir, "meta.json")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.storage_dir, "vectors.npy")
+
+    @property
+    def _payloads_path(self) -> str:
+        return os.path.join(self.storage_dir, "payloads.jsonl")
+
+    def _reset_state(self):
+        self._dim = None
+        self._count = 0
+        self._deleted = 0
+        self._vectors = None
+        self._ids: List[str] = []
+        self._payloads: List[dict] = []
+        self._id_to_row = {}
+        self._user_ids = np.empty(0, dtype=object)
+        self._thread_ids = np.empty(0, dtype=object)
+        self._file_hashes = np.empty(0, dtype=object)
+
+    def _exists_on_disk(self) -> bool:
+        return os.path.exists(self._meta_path)
+
+    def _load(self):
+        if not self._exists_on_disk():
+            return
+
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self._dim = meta["dim"]
+        self._count = meta["count"]
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+
+        with open(self._payloads_path) as f:
+            for line in f:
+                record = json.loads(line)
+                if "deleted_rows" in record:
+                    for row in record["deleted_rows"]:
+                        self._payloads[row] = None
+                else:
+                    self._ids.append(record["id"])
+                    self._payloads.append(record["payload"])
+        if len(self._ids) > self._count:
+            # Drop rows of an append that was interrupted before the count was written
+            self._ids = self._ids[:self._count]
+            self._payloads = self._payloads[:self._count]
+            self._write_payloads()
+        self._deleted = sum(payload is None for payload in self._payloads)
+        self._rebuild_indexes()
+
+    @staticmethod
+    def _payload_column(payloads: List[Optional[dict]], key: str) -> np.ndarray:
+        return np.array([((payload or {}).get("metadata") or {}).get(key) for payload in payloads], dtype=object)
+
+    def _rebuild_indexes(self):
+        self._id_to_row = {point_id: row for row, point_id in enumerate(self._ids) if self._payloads[row] is not None}
+        self._user_ids = self._payload_column(self._payloads, "user_id")
+        self._thread_ids = self._payload_column(self._payloads, "thread_id")
+        self._file_hashes = self._payload_column(self._payloads, "file_hash")
+
+    def _append_indexes(self, point_ids: List[str], payloads: List[dict]):
+        for offset, point_id in enumerate(point_ids):
+            self._id_to_row[point_id] = self._count + offset
+        self._user_ids = np.concatenate([self._user_ids, self._payload_column(payloads, "user_id")])
+        self._thread_ids = np.concatenate([self._thread_ids, self._payload_column(payloads, "thread_id")])
+        self._file_hashes = np.concatenate([self._file_hashes, self._payload_column(payloads, "file_hash")])
+
+    def _write_meta(self):
+        with open(self._meta_path, "w") as f:
+            json.dump({"dim": self._dim, "count": self._count}, f)
+
+    def _write_payloads(self):
+        with open(self._payloads_path, "w") as f:
+            for point_id, payload in zip(self._ids, self._payloads):
+                f.write(json.dumps({"id": point_id, "payload": payload}) + "\n")
+
+    def _append_payloads(self, records: List[dict]):
+        with open(self._payloads_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def _allocate(self, capacity: int, keep_rows: Optional[np.ndarray] = None):
+        """(Re)create the memory-mapped matrix with the given row capacity."""
+        tmp_path = self._vectors_path + ".tmp"
+        vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self._dim))
+        if keep_rows is not None and len(keep_rows):
+            vectors[:len(keep_rows)] = keep_rows
+        vectors.flush()
+        del vectors
+        self._vectors = None
+        os.replace(tmp_path, self._vectors_path)
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _tenant_mask(self, user_id: str, thread_id: str) -> np.ndarray:
+        return (self._user_ids == user_id) & (self._thread_ids == thread_id)
+
+    def _document_mask(self, file_hash: str, user_id: str, thread_id: str) -> np.ndarray:
+        return (self._file_hashes == file_hash) & self._tenant_mask(user_id, thread_id)
+
+    def _delete_rows(self, mask: np.ndarray) -> int:
+        """Tombstone the live rows where mask is True, compacting once tombstones pile up."""
+        rows = [int(row) for row in np.flatnonzero(mask) if self._payloads[row] is not None]
+        if not rows:
+            return 0
+
+        for row in rows:
+            self._payloads[row] = None
+            del self._id_to_row[self._ids[row]]
+        self._user_ids[rows] = None
+        self._thread_ids[rows] = None
+        self._file_hashes[rows] = None
+        self._deleted += len(rows)
+
+        if self._deleted >= self.COMPACT_FRACTION * self._count:
+            self._compact()
+        else:
+            self._append_payloads([{"deleted_rows": rows}])
+        return len(rows)
+
+    def _compact(self):
+        """Rewrite the matrix and payloads without tombstoned rows."""
+        keep = [row for row, payload in enumerate(self._payloads) if payload is not None]
+        kept_vectors = np.array(self._vectors[keep])
+        self._ids = [self._ids[i] for i in keep]
+        self._payloads = [self._payloads[i] for i in keep]
+        self._count = len(keep)
+        self._deleted = 0
+        self._allocate(max(self.INITIAL_CAPACITY, self._count), kept_vectors)
+        self._rebuild_indexes()
+        self._write_payloads()
+        self._write_meta()
+
+    # --- Sync implementations, run on the default executor by the async API ---
+
+    def _create_collection(self, vector_size: int, force_recreate: bool):
+        with self._lock:
+            if force_recreate:
+                self._delete_collection()
+            if self._exists_on_disk():
+                return
+            os.makedirs(self.storage_dir, exist_ok=True)
+            self._dim = vector_size
+            self._allocate(self.INITIAL_CAPACITY)
+            self._write_payloads()
+            self._write_meta()
+
+    def _delete_collection(self):
+        with self._lock:
+            self._vectors = None
+            shutil.rmtree(self.storage_dir, ignore_errors=True)
+            self._reset_state()
+
+    def _upsert(self, documents: List[Document], vectors: List[List[float]]) -> List[str]:
+        with self._lock:
+            if self._vectors is None:
+                raise ValueError(f"Collection '{self.collection_name}' does not exist")
+
+            normalized = self._normalize(vectors)
+            point_ids = [chunk_point_id(doc.metadata) for doc in documents]
+            new_payloads = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+            # Like Qdrant, the last occurrence of an id repeated within the batch wins
+            last_index = {point_id: i for i, point_id in enumerate(point_ids)}
+
+            # Points that already exist are overwritten in place, the rest are appended
+            appended = []
+            replaced = False
+            for point_id, i in last_index.items():
+                row = self._id_to_row.get(point_id)
+                if row is None:
+                    appended.append(i)
+                else:
+                    self._vectors[row] = normalized[i]
+                    self._payloads[row] = new_payloads[i]
+                    replaced = True
+
+            needed = self._count + len(appended)
+            if needed > self._vectors.shape[0]:
+                # Grow geometrically so appends stay amortized O(1)
+                capacity = max(needed, 2 * self._vectors.shape[0])
+                self._allocate(capacity, np.array(self._vectors[:self._count]))
+
+            self._vectors[self._count:needed] = normalized[appended]
+            self._vectors.flush()
+
+            appended_ids = [point_ids[i] for i in appended]
+            appended_payloads = [new_payloads[i] for i in appended]
+            self._append_indexes(appended_ids, appended_payloads)
+            self._ids.extend(appended_ids)
+            self._payloads.extend(appended_payloads)
+            self._count = needed
+            if replaced:
+                self._write_payloads()
+            else:
+                self._append_payloads([{"id": point_id, "payload": payload}
+                                       for point_id, payload in zip(appended_ids, appended_payloads)])
+            self._write_meta()
+            return point_ids
+
+    def _copy_document(self, file_hash: str, user_id: str, thread_id: str,
+                       metadata_updates: Optional[Dict[str, Any]],
+                       content_digest: Optional[Dict[str, Any]] = None) -> int:
+        with self._lock:
+            mask = self._file_hashes == file_hash
+            for key, value in (content_digest or {}).items():
+                mask &= self._payload_column(self._payloads, key) == value
+            matches = np.flatnonzero(mask)
+            if not len(matches):
+                return 0
+
+            # Copy from the first thread holding the file, not from every thread
+            first = matches[0]
+            rows = matches[(self._user_ids[matches] == self._user_ids[first])
+                           & (self._thread_ids[matches] == self._thread_ids[first])]
+            documents = [
+                Document(
+                    page_content=self._payloads[row]["page_content"],
+                    metadata={**self._payloads[row]["metadata"], "user_id": user_id, "thread_id": thread_id,
+                              **(metadata_updates or {})}
+                )
+                for row in rows
+            ]
+            return len(self._upsert(documents, np.array(self._vectors[rows])))
+
+    def _search_batch(self, query_vectors: List[List[float]], user_id: str, thread_id: str,
+                      limit: int, score_threshold: Optional[float]) -> List[List[models.ScoredPoint]]:
+        with self._lock:
+            if not self._count:
+                return [[] for _ in query_vectors]
+
+            rows = np.flatnonzero(self._tenant_mask(user_id, thread_id))
+            if not len(rows):
+                return [[] for _ in query_vectors]
+
+            scores = self._normalize(query_vectors) @ self._vectors[rows].T
+            k = min(limit, len(rows))
+            results = []
+            for query_scores in scores:
+                top = np.argpartition(-query_scores, k - 1)[:k]
+                top = top[np.argsort(-query_scores[top])]
+                points = []
+                for i in top:
+                    score = float(query_scores[i])
+                    if score_threshold is not None and score < score_threshold:
+                        break
+                    payload = self._payloads[rows[i]]
+                    points.append(models.ScoredPoint(
+                        id=self._ids[rows[i]],
+                        version=0,
+                        score=score,
+                        # Callers annotate metadata, so hand out a copy
+                        payload={"page_content": payload["page_content"], "metadata": dict(payload["metadata"])}
+                    ))
+                results.append(points)
+            return results
+
+    # --- VectorBackend API ---
+
+    async def create_collection(self, vector_size: int, force_recreate: bool = False, with_sparse: bool = False,
+                                **storage_options):
+        """Create collection for storing vectors. Quantization and HNSW options do not apply to exact search."""
+        if with_sparse:
+            raise ValueError("Hybrid search requires the Qdrant backend")
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(get_executor("storage"), self._create_collection, vector_size, force_recreate)
+
+    async def collection_exists(self) -> bool:
+        return self._exists_on_disk()
+
+    async def health_check(self) -> None:
+        return None
+
+    async def count_tenant_points(self, user_id: str, thread_id: str) -> int:
+        # The lock can be held by a long write, so never take it on the event loop
+        def count():
+            with self._lock:
+                return int(self._tenant_mask(user_id, thread_id).sum())
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), count)
+
+    async def document_exists(self, file_hash: str, user_id: str, thread_id: str) -> bool:
+        def exists():
+            with self._lock:
+                return bool(np.any(self._document_mask(file_hash, user_id, thread_id)))
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), exists)
+
+    async def document_exists_globally(self, file_hash: str) -> bool:
+        def exists():
+            with self._lock:
+                return bool(np.any(self._file_hashes == file_hash))
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), exists)
+
+    async def find_existing_hashes(self, file_hashes: List[str], user_id: str, thread_id: str) -> Tuple[Set[str], Set[str]]:
+        def find():
+            with self._lock:
+                matches = np.isin(self._file_hashes, list(file_hashes))
+                local_hashes = set(self._file_hashes[matches & self._tenant_mask(user_id, thread_id)].tolist())
+                global_hashes = set(self._file_hashes[matches].tolist())
+            return local_hashes, global_hashes
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), find)
+
+    async def upsert_documents(self, documents: List[Document], vectors: List[List[float]],
+                               sparse_vectors: Optional[List[models.SparseVector]] = None,
+                               wait: bool = True) -> List[str]:
+        """Writes are applied before returning, so wait has no effect."""
+        if not documents:
+            return []
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), self._upsert, documents, vectors)
+
+    async def wait_for_writes(self) -> None:
+        return None
+
+    async def copy_document(self, file_hash: str, user_id: str, thread_id: str,
+                            metadata_updates: Optional[Dict[str, Any]] = None,
+                            content_digest: Optional[Dict[str, Any]] = None) -> int:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), self._copy_document, file_hash, user_id, thread_id,
+                                          metadata_updates, content_digest)
+
+    async def update_document_metadata(self, file_hash: str, user_id: str, thread_id: str,
+                                       metadata: Dict[str, Any]) -> None:
+        def update():
+            with self._lock:
+                rows = np.flatnonzero(self._document_mask(file_hash, user_id, thread_id))
+                for row in rows:
+                    self._payloads[row]["metadata"].update(metadata)
+                if len(rows):
+                    self._write_payloads()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(get_executor("storage"), update)
+
+    async def get_source_chunks(self, source_names: List[str], user_id: str,
+                                thread_id: str) -> Dict[str, List[Tuple[str, str]]]:
+        names = set(source_names)
+
+        def collect() -> Dict[str, List[Tuple[int, str, str]]]:
+            chunks = {}
+            with self._lock:
+                for row in np.flatnonzero(self._tenant_mask(user_id, thread_id)):
+                    metadata = self._payloads[row]["metadata"]
+                    if metadata.get("source_name") in names:
+                        chunks.setdefault(metadata["source_name"], []).append(
+                            (metadata.get("chunk_number") or 0, self._ids[row], metadata.get("content_hash"))
+                        )
+            return chunks
+        loop = asyncio.get_event_loop()
+        chunks = await loop.run_in_executor(get_executor("storage"), collect)
+        return {
+            source_name: [(point_id, content_hash) for _, point_id, content_hash in sorted(points)]
+            for source_name, points in chunks.items()
+        }
+
+    async def move_points(self, metadata_by_id: Dict[str, Dict[str, Any]]) -> None:
+        def move():
+            with self._lock:
+                rows = [self._id_to_row[point_id] for point_id in metadata_by_id if point_id in self._id_to_row]
+                if len(rows) < len(metadata_by_id):
+                    raise ValueError(f"{len(metadata_by_id) - len(rows)} reused points no longer exist")
+                if not rows:
+                    return
+                documents = [
+                    Document(
+                        page_content=self._payloads[row]["page_content"],
+                        metadata={**self._payloads[row]["metadata"], **metadata_by_id[self._ids[row]]}
+                    )
+                    for row in rows
+                ]
+                new_ids = set(self._upsert(documents, np.array(self._vectors[rows])))
+                mask = np.zeros(self._count, dtype=bool)
+                mask[[self._id_to_row[point_id] for point_id in metadata_by_id if point_id not in new_ids]] = True
+                self._delete_rows(mask)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(get_executor("storage"), move)
+
+    async def delete_stale_chunks(self, source_name: str, file_hash: str, user_id: str, thread_id: str) -> None:
+        def delete():
+            with self._lock:
+                names = self._payload_column(self._payloads, "source_name")
+                return self._delete_rows(self._tenant_mask(user_id, thread_id) & (names == source_name)
+                                         & (self._file_hashes != file_hash))
+        loop = asyncio.get_event_loop()
+        deleted = await loop.run_in_executor(get_executor("storage"), delete)
+        logging.info(f"Deleted {deleted} stale chunks of '{source_name}' for user '{user_id}' thread '{thread_id}'")
+
+    async def search_batch(self, query_vectors: List[List[float]], user_id: str, thread_id: str,
+                           limit: int = 10, score_threshold: Optional[float] = None,
+                           sparse_vectors: Optional[List[models.SparseVector]] = None,
+                           oversampling: Optional[float] = None, rescore: bool = True) -> List[List[models.ScoredPoint]]:
+        """Exact top-k over the tenant's rows; sparse and quantization arguments are ignored."""
+        if not query_vectors:
+            return []
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("storage"), self._search_batch, query_vectors, user_id, thread_id, limit, score_threshold)
+
+    async def delete_collection(self):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(get_executor("storage"), self._delete_collection)
+        logging.info(f"Deleted collection '{self.collection_name}'")
+
+    async def delete_document(self, file_hash: str, user_id: str, thread_id: str) -> None:
+        def delete():
+            with self._lock:
+                return self._delete_rows(self._document_mask(file_hash, user_id, thread_id))
+        loop = asyncio.get_event_loop()
+        deleted = await loop.run_in_executor(get_executor("storage"), delete)
+        logging.info(f"Deleted {deleted} chunks of document {file_hash[:8]}... for user '{user_id}' thread '{thread_id}'")
+
+    async def delete_by_thread_id(self, user_id: str, thread_id: str) -> None:
+        def delete():
+            with self._lock:
+                return self._delete_rows(self._tenant_mask(user_id, thread_id))
+        loop = asyncio.get_event_loop()
+        deleted = await loop.run_in_executor(get_executor("storage"), delete)
+        logging.info(f"Deleted {deleted} documents for user '{user_id}' thread '{thread_id}'")
+
+    async def delete_by_user_id(self, user_id: str) -> None:
+        def delete():
+            with self._lock:
+                return self._delete_rows(self._user_ids == user_id)
+        loop = asyncio.get_event_loop()
+        deleted = await loop.run_in_executor(get_executor("storage"), delete)
+        logging.info(f"Deleted {deleted} documents for user '{user_id}'")
@@ -0,0 +1,312 @@
+"""
+Shared model server for embedding and re-ranking.
+
+One process loads the dense, sparse and cross-encoder models once and serves every
+uvicorn worker over a Unix domain socket, instead of each worker holding its own
+ONNX copies. Requests arriving close together are merged into one model call
+(dynamic micro-batching). Workers use it when MODEL_SERVER_SOCKET is set.
+
+Run from the project root:
+    python -m vector_db.model_server
+"""
+
+import os
+import json
+import socket
+import struct
+import asyncio
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from qdrant_client.http import models
+
+from config import (
+    MODEL_SERVER_SOCKET,
+    MODEL_SERVER_MAX_BATCH,
+    MODEL_SERVER_MAX_WAIT_MS,
+    EMBEDDING_MODEL_ID,
+    SPARSE_EMBEDDING_MODEL_ID,
+    HYBRID_SEARCH,
+)
+
+# Frame: header length and body length (network order), a JSON header, then a raw body
+_FRAME = struct.Struct("!II")
+BATCHED_OPS = ("embed_documents", "embed_queries", "embed_sparse_documents", "embed_sparse_queries", "rerank")
+
+def _encode_frame(header: Dict[str, Any], body: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header).encode()
+    return _FRAME.pack(len(header_bytes), len(body)) + header_bytes + body
+
+def _encode_result(request_id: int, result: Any) -> bytes:
+    """Dense vectors and scores travel as raw float32, sparse vectors as JSON."""
+    if isinstance(result, list) and result and isinstance(result[0], models.SparseVector):
+        return _encode_frame({"id": request_id, "ok": True,
+                              "sparse": [{"indices": v.indices, "values": v.values} for v in result]})
+    if isinstance(result, list):
+        array = np.asarray(result, dtype=np.float32)
+        return _encode_frame({"id": request_id, "ok": True, "shape": list(array.shape)}, array.tobytes())
+    return _encode_frame({"id": request_id, "ok": True, "result": result})
+
+def _decode_result(header: Dict[str, Any], body: bytes) -> Any:
+    if not header.get("ok"):
+        raise RuntimeError(f"Model server error: {header.get('error')}")
+    if "sparse" in header:
+        return [models.SparseVector(indices=v["indices"], values=v["values"]) for v in header["sparse"]]
+    if "shape" in header:
+        return np.frombuffer(body, dtype=np.float32).reshape(header["shape"]).tolist()
+    return header.get("result")
+
+# --- Server ---
+
+@dataclass
+class _Request:
+    items: List[Any]
+    content_hashes: Optional[List[Optional[str]]]
+    future: asyncio.Future = field(repr=False)
+
+class ModelServer:
+    """Serves batched embed and rerank requests from the models loaded in this process."""
+
+    def __init__(self, socket_path: str = MODEL_SERVER_SOCKET, max_batch: int = MODEL_SERVER_MAX_BATCH,
+                 max_wait_ms: float = MODEL_SERVER_MAX_WAIT_MS):
+        from .embedding_manager import EmbeddingManager
+        from .reranker import Reranker
+
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        # model_server=None: this process owns the models instead of being a client of itself
+        self.embedding_manager = EmbeddingManager(
+            "fastembed",
+            sparse_model_id=SPARSE_EMBEDDING_MODEL_ID if HYBRID_SEARCH else None,
+            model_server=None
+        )
+        self.reranker = Reranker(model_server=None)
+        self._handlers: Dict[str, Callable[[List[Any], List[Optional[str]]], Any]] = {
+            "embed_documents": lambda texts, hashes: self.embedding_manager.embed_documents(texts, hashes),
+            "embed_queries": lambda texts, _: self.embedding_manager.embed_queries(texts),
+            "embed_sparse_documents": lambda texts, _: self.embedding_manager.embed_sparse_documents(texts),
+            "embed_sparse_queries": lambda texts, _: self.embedding_manager.embed_sparse_queries(texts),
+            "rerank": lambda pairs, _: self.reranker.score_pairs([tuple(pair) for pair in pairs]),
+        }
+        self._queues: Dict[str, asyncio.Queue] = {}
+        # One model call per operation at a time, different operations run side by side
+        self._executor = ThreadPoolExecutor(max_workers=len(BATCHED_OPS), thread_name_prefix="model-server")
+        self.batches = 0
+        self.requests = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "model_id": EMBEDDING_MODEL_ID,
+            "dimension": self.embedding_manager.get_embedding_dimension(),
+            "sparse": self.embedding_manager.sparse_embeddings is not None,
+            "parallelism": self.embedding_manager.parallelism,
+            "cache": self.embedding_manager.cache_stats(),
+            "requests": self.requests,
+            "batches": self.batches,
+        }
+
+    async def _batcher(self, op: str):
+        """Merge queued requests for one operation until max_batch items or max_wait has passed."""
+        loop = asyncio.get_event_loop()
+        queue = self._queues[op]
+        while True:
+            requests = [await queue.get()]
+            size = len(requests[0].items)
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    request = queue.get_nowait() if not queue.empty() else await asyncio.wait_for(
+                        queue.get(), max(0.0, deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    break
+                requests.append(request)
+                size += len(request.items)
+
+            items = [item for request in requests for item in request.items]
+            hashes = [
+                content_hash
+                for request in requests
+                for content_hash in (request.content_hashes or [None] * len(request.items))
+            ]
+            try:
+                results = await loop.run_in_executor(self._executor, self._handlers[op], items, hashes)
+            except Exception as e:
+                logging.error(f"Model server {op} batch of {len(items)} failed: {e}")
+                if len(requests) == 1:
+                    if not requests[0].future.done():
+                        requests[0].future.set_exception(e)
+                else:
+                    # One bad request must not fail the requests it was merged with
+                    for request in requests:
+                        await self._run_alone(op, request)
+                continue
+
+            self.batches += 1
+            offset = 0
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_result(results[offset:offset + len(request.items)])
+                offset += len(request.items)
+
+    async def _run_alone(self, op: str, request: _Request):
+        loop = asyncio.get_event_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor, self._handlers[op], request.items,
+                request.content_hashes or [None] * len(request.items)
+            )
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        self.batches += 1
+        if not request.future.done():
+            request.future.set_result(result)
+
+    async def _handle_request(self, header: Dict[str, Any], writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        request_id = header.get("id")
+        op = header.get("op")
+        try:
+            if op == "info":
+                response = _encode_result(request_id, self.info())
+            elif op in self._queues:
+                self.requests += 1
+                future = asyncio.get_event_loop().create_future()
+                await self._queues[op].put(_Request(header.get("items") or [], header.get("content_hashes"), future))
+                response = _encode_result(request_id, await future)
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            response = _encode_frame({"id": request_id, "ok": False, "error": str(e)})
+        async with write_lock:
+            writer.write(response)
+            await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on one connection are answered as they finish, matched by id
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                header_length, body_length = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+                header = json.loads(await reader.readexactly(header_length))
+                if body_length:
+                    await reader.readexactly(body_length)
+                task = asyncio.create_task(self._handle_request(header, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(self):
+        self._queues = {op: asyncio.Queue() for op in BATCHED_OPS}
+        batchers = [asyncio.create_task(self._batcher(op)) for op in BATCHED_OPS]
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Only processes of the same user may connect, so the socket must never exist with looser permissions
+        umask = os.umask(0o077)
+        try:
+            server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Model server listening on {self.socket_path} "
+                     f"(max batch {self.max_batch}, max wait {self.max_wait * 1000:.0f} ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for batcher in batchers:
+                batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+# --- Client ---
+
+class ModelClient:
+    """Blocking client for ModelServer, one connection per calling thread.
+
+    Callers run on executor threads (embedding) or hop onto one (re-ranking), so
+    concurrent callers use separate connections and the server batches them together.
+    """
+
+    def __init__(self, socket_path: str = MODEL_SERVER_SOCKET, timeout: float = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connection(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+            self._local.connection = connection
+            self._local.next_id = 0
+        return connection
+
+    @staticmethod
+    def _read_exactly(connection: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            received = connection.recv(size - len(data))
+            if not received:
+                raise ConnectionError("Model server closed the connection")
+            data.extend(received)
+        return bytes(data)
+
+    def call(self, op: str, items: Optional[List[Any]] = None, content_hashes: Optional[List[Optional[str]]] = None) -> Any:
+        connection = self._connection()
+        self._local.next_id += 1
+        request_id = self._local.next_id
+        try:
+            connection.sendall(_encode_frame({"id": request_id, "op": op, "items": items or [],
+                                              "content_hashes": content_hashes}))
+            header_length, body_length = _FRAME.unpack(self._read_exactly(connection, _FRAME.size))
+            header = json.loads(self._read_exactly(connection, header_length))
+            body = self._read_exactly(connection, body_length)
+        except OSError:
+            # Drop the connection so the next call reconnects, e.g. after a server restart
+            connection.close()
+            self._local.connection = None
+            raise
+        return _decode_result(header, body)
+
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info = self.call("info")
+        return self._info
+
+    def embed_documents(self, texts: List[str], content_hashes: Optional[List[Optional[str]]] = None) -> List[List[float]]:
+        return self.call("embed_documents", texts, content_hashes) if texts else []
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self.call("embed_queries", queries) if queries else []
+
+    def embed_sparse_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        return self.call("embed_sparse_documents", texts) if texts else []
+
+    def embed_sparse_queries(self, queries: List[str]) -> List[models.SparseVector]:
+        return self.call("embed_sparse_queries", queries) if queries else []
+
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        return self.call("rerank", [list(pair) for pair in pairs]) if pairs else []
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    if not MODEL_SERVER_SOCKET:
+        raise SystemExit("Set MODEL_SERVER_SOCKET in config.py to run the model server")
+    asyncio.run(ModelServer().serve())
@@ -0,0 +1,386 @@
+import os
+import uuid
+import queue
+import collections
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+from langchain.schema import Document
+
+from .document_processor import DocumentProcessor
+from utils.executors import get_executor
+from config import PARSER_WORKERS, PARSE_TIMEOUT_SECONDS, PARSER_MEMORY_LIMIT_MB, PARSE_QUEUE_BATCHES
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Extra time the parent waits before killing a worker the in-process alarm could not interrupt
+KILL_GRACE_SECONDS = 10
+POLL_SECONDS = 1.0
+_PENDING = object()
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+# --- Worker process side ---
+
+_processor: Optional[DocumentProcessor] = None
+
+def _init_worker(memory_limit_mb: Optional[int]):
+    global _processor
+    if memory_limit_mb and resource is not None:
+        # Allocations past the cap raise MemoryError inside the parse instead of taking the host down
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_mb * 1024 * 1024, hard))
+    _processor = DocumentProcessor()
+
+def _run_task(started, task_id: str, fn: Callable, *args):
+    """Record which worker runs the task, so the parent can time it and kill only that worker."""
+    started[task_id] = os.getpid()
+    try:
+        return fn(*args)
+    finally:
+        started.pop(task_id, None)
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("Parsing timed out")
+
+def _set_alarm(seconds: float) -> float:
+    """Arm the per-file timer, returning the time that was left on it."""
+    if not hasattr(signal, "setitimer"):
+        return 0.0
+    remaining, _ = signal.setitimer(signal.ITIMER_REAL, seconds)
+    return remaining
+
+def _stream_file(file_path: str, user_id: str, thread_id: str, timeout: float, batch_size: int,
+                 file_hash: Optional[str], results) -> None:
+    """Put chunk batches on the results queue, then the chunk count, or None on failure."""
+    # Tasks run on the worker's main thread, so an interval timer can interrupt a slow parse
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    _set_alarm(timeout)
+    total_chunks = None
+    try:
+        total_chunks = 0
+        for batch in _processor.iter_document_batches(file_path, user_id, thread_id, batch_size, file_hash):
+            total_chunks += len(batch)
+            # Waiting on a slow consumer must not count towards the parse timeout
+            remaining = _set_alarm(0)
+            results.put(batch, timeout=timeout)
+            _set_alarm(remaining or 0.001)
+    except Exception as e:
+        logging.error(f"Error processing {file_path}: {e}", exc_info=True)
+        total_chunks = None
+    finally:
+        _set_alarm(0)
+    results.put(total_chunks, timeout=timeout)
+
+def _count_pdf_pages(file_path: str) -> Optional[int]:
+    """None if the text layer cannot be read, the file then goes through _stream_file."""
+    try:
+        return DocumentProcessor.count_pdf_pages(file_path)
+    except Exception as e:
+        logging.warning(f"Could not read the text layer of {file_path}: {e}")
+        return None
+
+def _extract_pdf_pages(file_path: str, first_page: int, last_page: int, timeout: float) -> List[Tuple[int, str]]:
+    """(page number, chunk) pairs for one group of pages."""
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    _set_alarm(timeout)
+    try:
+        return list(_processor.iter_pdf_page_chunks(file_path, first_page, last_page))
+    finally:
+        _set_alarm(0)
+
+# --- Parent process side ---
+
+class _Task:
+    """One call on the pool, resubmitted if the pool breaks under it."""
+
+    def __init__(self, fn: Callable, *args: Any):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.future = None
+        self.isolated = False
+        self.retried = False
+
+class ParsingPool:
+    """Parses and splits documents in a bounded pool of worker processes.
+
+    Unstructured loaders are CPU-bound and hold the GIL, so running them in
+    processes keeps the event loop responsive and lets multi-file uploads scale
+    with cores. Chunks stream back in batches over a bounded queue. Each file
+    gets a timeout (enforced in the worker, with that worker killed as a last
+    resort), and each worker can be given an address-space limit.
+
+    A dead worker breaks the whole ProcessPoolExecutor, failing every task in it.
+    Tasks that were still queued are resubmitted to a fresh pool; tasks that were
+    running may have caused the crash, so each is retried once in a worker of its
+    own, and only a file that fails there is reported as failed.
+
+    PDFs with a readable text layer are split into page groups that run as
+    separate tasks, so the pages of one large PDF are extracted on all workers.
+    """
+
+    def __init__(self, max_workers: Optional[int] = PARSER_WORKERS,
+                 timeout: float = PARSE_TIMEOUT_SECONDS,
+                 memory_limit_mb: Optional[int] = PARSER_MEMORY_LIMIT_MB):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        # task id -> pid of the worker running it
+        self._started = None
+        self._lock = threading.Lock()
+        self._processor = DocumentProcessor()
+
+    def _new_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        # spawn, not fork: the parent runs gRPC and model threads that do not survive a fork
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit_mb,)
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor(self.max_workers)
+                logging.info(f"Started document parsing pool with {self.max_workers} workers")
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Stop handing out a broken pool; the next task starts a fresh one.
+
+        The executor itself fails the tasks left in it, which are then resubmitted.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _get_manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager
+
+    def _get_started(self):
+        manager = self._get_manager()
+        with self._lock:
+            if self._started is None:
+                self._started = manager.dict()
+            return self._started
+
+    def _submit(self, task: _Task, isolated: bool = False):
+        started = self._get_started()
+        if isolated:
+            task.executor, task.isolated = self._new_executor(1), True
+            task.future = task.executor.submit(_run_task, started, task.id, task.fn, *task.args)
+            return
+        task.executor = self._get_executor()
+        try:
+            task.future = task.executor.submit(_run_task, started, task.id, task.fn, *task.args)
+        except RuntimeError:
+            # Broken or discarded by another file since it was handed out
+            self._discard_executor(task.executor)
+            task.executor = self._get_executor()
+            task.future = task.executor.submit(_run_task, started, task.id, task.fn, *task.args)
+
+    @staticmethod
+    def _finish(task: _Task):
+        if task.isolated:
+            task.executor.shutdown(wait=False)
+
+    async def _started_pid(self, task: _Task) -> Optional[int]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("parsing"), self._get_started().get, task.id)
+
+    async def _retry(self, task: _Task, file_path: str):
+        """Resubmit a task whose pool broke under it, or fail the file if it already broke its own worker."""
+        self._discard_executor(task.executor)
+        if task.retried:
+            raise RuntimeError(f"Parser worker died while processing {file_path} (memory limit exceeded?)")
+        if await self._started_pid(task) is None:
+            logging.warning(f"Parser pool broke before {file_path} started, resubmitting it")
+            self._submit(task)
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(get_executor("parsing"), self._get_started().pop, task.id, None)
+        task.retried = True
+        logging.warning(f"Parser pool broke while processing {file_path}, retrying it in a worker of its own")
+        self._submit(task, isolated=True)
+
+    async def _watch(self, task: _Task, deadline: Optional[float], file_path: str) -> Optional[float]:
+        """Start the clock once a worker picks the task up, and kill only that worker when it runs out."""
+        loop = asyncio.get_event_loop()
+        if deadline is None:
+            if await self._started_pid(task) is not None:
+                deadline = loop.time() + self.timeout + KILL_GRACE_SECONDS
+            return deadline
+        if loop.time() < deadline:
+            return deadline
+
+        pid = await self._started_pid(task)
+        if pid is not None:
+            try:
+                os.kill(pid, KILL_SIGNAL)
+            except ProcessLookupError:
+                pass
+        self._discard_executor(task.executor)
+        raise RuntimeError(f"Parsing {file_path} exceeded {self.timeout}s and did not stop, killed its parser worker")
+
+    @staticmethod
+    def _next_result(results):
+        try:
+            return results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            return _PENDING
+
+    async def _task_result(self, task: _Task, file_path: str):
+        """Wait for a worker task, applying the same stall detection as streamed files."""
+        waiter = asyncio.wrap_future(task.future)
+        deadline = None
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=POLL_SECONDS)
+                if done:
+                    try:
+                        result = waiter.result()
+                    except BrokenProcessPool:
+                        await self._retry(task, file_path)
+                        waiter = asyncio.wrap_future(task.future)
+                        deadline = None
+                        continue
+                    except Exception as e:
+                        raise RuntimeError(f"Error processing {file_path}: {e}")
+                    return result
+                deadline = await self._watch(task, deadline, file_path)
+        finally:
+            # An abandoned task (stalled, or its file cancelled) must not leave an unretrieved error
+            waiter.cancel()
+            self._finish(task)
+
+    async def _iter_pdf_batches(self, file_path: str, user_id: str, thread_id: str, batch_size: int,
+                                page_count: int, file_hash: Optional[str]) -> AsyncIterator[List[Document]]:
+        """Extract page groups of a PDF in parallel, yielding batches in page order.
+
+        At most two groups per worker are in flight, so a long PDF neither holds all
+        of its text in memory nor keeps other files' tasks waiting behind it.
+        """
+        loop = asyncio.get_event_loop()
+        group_size = DocumentProcessor.PDF_PAGES_PER_GROUP
+        group_starts = iter(range(0, page_count, group_size))
+        in_flight = collections.deque()
+
+        def submit_next():
+            first_page = next(group_starts, None)
+            if first_page is not None:
+                task = _Task(_extract_pdf_pages, file_path, first_page, first_page + group_size, self.timeout)
+                self._submit(task)
+                in_flight.append(task)
+
+        for _ in range(2 * self.max_workers):
+            submit_next()
+        try:
+            if file_hash is None:
+                file_hash = await loop.run_in_executor(get_executor("parsing"), self._processor.calculate_file_hash, file_path)
+            batch = []
+            chunk_number = 0
+            while in_flight:
+                page_chunks = await self._task_result(in_flight[0], file_path)
+                in_flight.popleft()
+                submit_next()
+                for page_number, chunk in page_chunks:
+                    chunk_number += 1
+                    batch.append(DocumentProcessor.make_chunk(
+                        chunk, user_id, thread_id, file_hash, file_path, chunk_number, {"page_number": page_number}
+                    ))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+            logging.info(f"Successfully processed '{Path(file_path).name}' ({page_count} pages), created {chunk_number} chunks.")
+        finally:
+            for task in in_flight:
+                task.future.cancel()
+                self._finish(task)
+
+    async def iter_document_batches(self, file_path: str, user_id: str, thread_id: str,
+                                    batch_size: int = 64, file_hash: Optional[str] = None) -> AsyncIterator[List[Document]]:
+        """Parse and split one file in a worker process, yielding chunk batches as they are produced.
+
+        At most PARSE_QUEUE_BATCHES batches per file wait for the consumer, so memory stays
+        bounded whatever the file size. Raises RuntimeError if the file cannot be parsed.
+        """
+        if Path(file_path).suffix.lower() == ".pdf" and Path(file_path).is_file():
+            task = _Task(_count_pdf_pages, file_path)
+            self._submit(task)
+            page_count = await self._task_result(task, file_path)
+            if page_count:
+                async for batch in self._iter_pdf_batches(file_path, user_id, thread_id, batch_size, page_count, file_hash):
+                    yield batch
+                return
+
+        loop = asyncio.get_event_loop()
+        manager = self._get_manager()
+        results = manager.Queue(maxsize=PARSE_QUEUE_BATCHES)
+        task = _Task(_stream_file, file_path, user_id, thread_id, self.timeout, batch_size, file_hash, results)
+        self._submit(task)
+
+        # The clock starts once a worker picks the file up and restarts with every batch
+        deadline = None
+        # A resubmitted file is parsed from the start, so the chunks already yielded are dropped
+        yielded = 0
+        skip = 0
+        try:
+            while True:
+                item = await loop.run_in_executor(get_executor("parsing"), self._next_result, results)
+                if item is _PENDING:
+                    if task.future.done() and task.future.exception() is not None:
+                        if not isinstance(task.future.exception(), BrokenProcessPool):
+                            raise RuntimeError(f"Error processing {file_path}: {task.future.exception()}")
+                        results = manager.Queue(maxsize=PARSE_QUEUE_BATCHES)
+                        task.args = (*task.args[:-1], results)
+                        await self._retry(task, file_path)
+                        deadline = None
+                        skip = yielded
+                        continue
+                    deadline = await self._watch(task, deadline, file_path)
+                    continue
+
+                if isinstance(item, list):
+                    deadline = None
+                    if skip:
+                        dropped = min(skip, len(item))
+                        item, skip = item[dropped:], skip - dropped
+                    if item:
+                        yielded += len(item)
+                        yield item
+                elif item is None:
+                    raise RuntimeError(f"Could not parse {file_path}")
+                else:
+                    return
+        finally:
+            self._finish(task)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
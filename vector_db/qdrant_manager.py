@@ -1,10 +1,20 @@
-import logging
 import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Literal, Set, Tuple
+from langchain.schema import Document
 from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import Distance, VectorParams
 from qdrant_client.http import models
 
-class QdrantManager:
+from .vector_backend import VectorBackend, chunk_point_id
+
+# Named vector holding BM25/SPLADE sparse embeddings when hybrid search is enabled
+SPARSE_VECTOR_NAME = "sparse"
+
+# Never stored; a delete filtered on it is a no-op write that queues behind every pending update
+BARRIER_POINT_ID = "00000000-0000-0000-0000-000000000000"
+
+class QdrantManager(VectorBackend):
     """Async Qdrant database manager."""
     
     def __init__(self, host: str = "localhost", port: int = 6333, collection_name: str = "documents"):
@@ -12,6 +22,9 @@ class QdrantManager:
         self.host = host
         self.port = port
         
+        # Set once the collection is known to exist so hot paths skip the get_collections() round trip
+        self._collection_exists = False
+        
         # Priority: Try gRPC first, fallback to HTTP
         try:
             # Try gRPC connection first (port 6334)
@@ -27,8 +40,16 @@ class QdrantManager:
                 logging.error(f"Both gRPC and HTTP connections failed: {e2}")
                 raise
 
-    async def create_collection(self, vector_size: int, force_recreate: bool = False):
-        """Create collection for storing vectors."""
+    async def create_collection(self, vector_size: int, force_recreate: bool = False, with_sparse: bool = False,
+                                quantization: Optional[Literal["scalar", "binary"]] = None,
+                                on_disk: bool = False, on_disk_payload: Optional[bool] = None,
+                                hnsw_m: int = 16, hnsw_ef_construct: int = 100):
+        """Create collection for storing vectors, optionally with a sparse vector for hybrid search.
+
+        ``quantization`` keeps a compressed int8 ("scalar") or 1-bit ("binary") copy of the vectors
+        in RAM for the HNSW walk; with ``on_disk`` the full-precision originals are memory-mapped
+        and only read back when rescoring.
+        """
         if force_recreate:
             await self.delete_collection()
 
@@ -38,8 +59,16 @@ class QdrantManager:
                 collection_name=self.collection_name,
                 vectors_config=VectorParams(
                     size=vector_size,
-                    distance=Distance.COSINE
-                )
+                    distance=Distance.COSINE,
+                    on_disk=on_disk
+                ),
+                sparse_vectors_config={
+                    # IDF is computed by Qdrant at query time, which BM25 term weights rely on
+                    SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+                } if with_sparse else None,
+                hnsw_config=models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+                quantization_config=self._quantization_config(quantization),
+                on_disk_payload=on_disk_payload
             )
             
             # Create indexes for efficient filtering
@@ -57,25 +86,388 @@ class QdrantManager:
             
             await self.client.create_payload_index(
                 collection_name=self.collection_name,
-                field_name="metadata.user_id",
+                field_name="metadata.source_name",
                 field_schema=models.PayloadSchemaType.KEYWORD
             )
+            
+            # Mark user_id as the tenant key so Qdrant co-locates each user's points
+            # and filtered searches only walk that tenant's part of the HNSW graph
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="metadata.user_id",
+                field_schema=models.KeywordIndexParams(
+                    type=models.KeywordIndexType.KEYWORD,
+                    is_tenant=True
+                )
+            )
+
+            self._collection_exists = True
 
         except Exception as e:
             if "already exists" not in str(e):
                 logging.error(f"Error creating collection: {e}")
                 raise
+            self._collection_exists = True
     
+    @staticmethod
+    def _quantization_config(quantization: Optional[str]):
+        if quantization is None:
+            return None
+        if quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True
+                )
+            )
+        if quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        raise ValueError(f"Unsupported quantization: {quantization}")
+
+    @staticmethod
+    def _search_params(oversampling: Optional[float], rescore: bool) -> Optional[models.SearchParams]:
+        """Quantized search parameters; None keeps Qdrant's defaults."""
+        if oversampling is None and rescore:
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=rescore,
+                oversampling=oversampling
+            )
+        )
+
+    def tenant_filter(self, user_id: str, thread_id: str) -> models.Filter:
+        """Build the payload filter that scopes a query to one user's thread."""
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.user_id",
+                    match=models.MatchValue(value=user_id)
+                ),
+                models.FieldCondition(
+                    key="metadata.thread_id",
+                    match=models.MatchValue(value=thread_id)
+                )
+            ]
+        )
+
+    async def count_tenant_points(self, user_id: str, thread_id: str) -> int:
+        """Count the points stored for a specific thread."""
+        try:
+            result = await self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self.tenant_filter(user_id, thread_id),
+                exact=True
+            )
+            return result.count
+        except Exception as e:
+            logging.error(f"Tenant point count failed: {e}")
+            return 0
+
+    def document_filter(self, file_hash: str, user_id: str, thread_id: str) -> models.Filter:
+        """Filter selecting the chunks of one file in one thread."""
+        document_filter = self.tenant_filter(user_id, thread_id)
+        document_filter.must.append(
+            models.FieldCondition(key="metadata.file_hash", match=models.MatchValue(value=file_hash))
+        )
+        return document_filter
+
+    def _build_query_request(self, query_vector: List[float], query_filter: models.Filter, limit: int,
+                             score_threshold: Optional[float] = None,
+                             sparse_vector: Optional[models.SparseVector] = None,
+                             search_params: Optional[models.SearchParams] = None) -> models.QueryRequest:
+        """Build a dense query, or a dense + sparse query fused with reciprocal-rank fusion."""
+        if sparse_vector is None:
+            return models.QueryRequest(
+                query=query_vector,
+                filter=query_filter,
+                params=search_params,
+                limit=limit,
+                score_threshold=score_threshold,
+                with_payload=True,
+                with_vector=False
+            )
+
+        # RRF scores are rank based, so the similarity threshold only applies to the dense leg
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    query=query_vector,
+                    filter=query_filter,
+                    params=search_params,
+                    limit=limit,
+                    score_threshold=score_threshold
+                ),
+                models.Prefetch(
+                    query=sparse_vector,
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=limit
+                )
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=limit,
+            with_payload=True,
+            with_vector=False
+        )
+
+    async def search_batch(self, query_vectors: List[List[float]], user_id: str, thread_id: str,
+                           limit: int = 10, score_threshold: Optional[float] = None,
+                           sparse_vectors: Optional[List[models.SparseVector]] = None,
+                           oversampling: Optional[float] = None, rescore: bool = True) -> List[List[models.ScoredPoint]]:
+        """Run several tenant-scoped similarity searches in a single Qdrant request.
+
+        ``oversampling`` and ``rescore`` only matter for quantized collections: Qdrant fetches
+        ``limit * oversampling`` candidates from the compressed vectors and rescores them with
+        the full-precision originals.
+        """
+        if not query_vectors:
+            return []
+
+        tenant_filter = self.tenant_filter(user_id, thread_id)
+        search_params = self._search_params(oversampling, rescore)
+        sparse_vectors = sparse_vectors or [None] * len(query_vectors)
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                self._build_query_request(query_vector, tenant_filter, limit, score_threshold, sparse_vector, search_params)
+                for query_vector, sparse_vector in zip(query_vectors, sparse_vectors)
+            ]
+        )
+        return [response.points for response in responses]
+
+    async def upsert_documents(self, documents: List[Document], vectors: List[List[float]],
+                               sparse_vectors: Optional[List[models.SparseVector]] = None,
+                               wait: bool = True, batch_size: int = 64) -> List[str]:
+        """Upsert documents in the QdrantVectorStore payload layout under deterministic ids."""
+        point_ids = []
+        for start in range(0, len(documents), batch_size):
+            points = []
+            for i in range(start, min(start + batch_size, len(documents))):
+                point_id = chunk_point_id(documents[i].metadata)
+                vector = vectors[i]
+                if sparse_vectors is not None:
+                    vector = {"": vectors[i], SPARSE_VECTOR_NAME: sparse_vectors[i]}
+                points.append(models.PointStruct(
+                    id=point_id,
+                    vector=vector,
+                    payload={"page_content": documents[i].page_content, "metadata": documents[i].metadata}
+                ))
+                point_ids.append(point_id)
+            await self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+        return point_ids
+
+    async def wait_for_writes(self) -> None:
+        """Qdrant applies updates in order, so waiting on a no-op delete waits for all earlier upserts.
+
+        A filter selector (unlike a point id list) reaches every shard of the collection.
+        """
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(must=[models.HasIdCondition(has_id=[BARRIER_POINT_ID])])
+            ),
+            wait=True
+        )
+
+    async def copy_document(self, file_hash: str, user_id: str, thread_id: str,
+                            metadata_updates: Optional[Dict[str, Any]] = None,
+                            content_digest: Optional[Dict[str, Any]] = None,
+                            batch_size: int = 256) -> int:
+        """Copy an already indexed file into another thread without re-embedding it.
+
+        Chunks are read from a single source thread, so a file attached to many
+        threads is copied once, and re-upserted with the new tenant in the payload.
+        """
+        source_conditions = [models.FieldCondition(key="metadata.file_hash", match=models.MatchValue(value=file_hash))]
+        for key, value in (content_digest or {}).items():
+            source_conditions.append(models.FieldCondition(key=f"metadata.{key}", match=models.MatchValue(value=value)))
+        source, _ = await self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=models.Filter(must=source_conditions),
+            limit=1,
+            with_payload=True,
+            with_vectors=False
+        )
+        if not source:
+            return 0
+
+        source_metadata = source[0].payload.get("metadata", {})
+        source_filter = self.document_filter(file_hash, source_metadata.get("user_id"), source_metadata.get("thread_id"))
+
+        copied = 0
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=source_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            points = []
+            for record in records:
+                metadata = {
+                    **record.payload.get("metadata", {}),
+                    "user_id": user_id,
+                    "thread_id": thread_id,
+                    **(metadata_updates or {})
+                }
+                points.append(models.PointStruct(
+                    id=chunk_point_id(metadata),
+                    vector=record.vector,
+                    payload={"page_content": record.payload.get("page_content"), "metadata": metadata}
+                ))
+            if points:
+                await self.client.upsert(collection_name=self.collection_name, points=points)
+                copied += len(points)
+            if offset is None:
+                break
+
+        logging.debug(f"Copied {copied} chunks of {file_hash[:8]}... from thread '{source_metadata.get('thread_id')}' "
+                      f"to thread '{thread_id}'")
+        return copied
+
+    async def update_document_metadata(self, file_hash: str, user_id: str, thread_id: str,
+                                       metadata: Dict[str, Any]) -> None:
+        """Merge keys into the metadata of every chunk of a file in a thread."""
+        await self.client.set_payload(
+            collection_name=self.collection_name,
+            payload=metadata,
+            key="metadata",
+            points=self.document_filter(file_hash, user_id, thread_id)
+        )
+
+    async def get_source_chunks(self, source_names: List[str], user_id: str, thread_id: str,
+                                batch_size: int = 1024) -> Dict[str, List[Tuple[str, str]]]:
+        """Scroll the chunks stored under the given file names, reading only the keys the diff needs."""
+        source_filter = self.tenant_filter(user_id, thread_id)
+        source_filter.must.append(
+            models.FieldCondition(key="metadata.source_name", match=models.MatchAny(any=list(source_names)))
+        )
+
+        chunks: Dict[str, List[Tuple[int, str, str]]] = {}
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=source_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=models.PayloadSelectorInclude(
+                    include=["metadata.source_name", "metadata.content_hash", "metadata.chunk_number"]
+                ),
+                with_vectors=False
+            )
+            for record in records:
+                metadata = record.payload.get("metadata", {})
+                chunks.setdefault(metadata.get("source_name"), []).append(
+                    (metadata.get("chunk_number") or 0, str(record.id), metadata.get("content_hash"))
+                )
+            if offset is None:
+                break
+
+        return {
+            source_name: [(point_id, content_hash) for _, point_id, content_hash in sorted(points)]
+            for source_name, points in chunks.items()
+        }
+
+    async def move_points(self, metadata_by_id: Dict[str, Dict[str, Any]], batch_size: int = 256) -> None:
+        """Re-upsert points with merged metadata under their new ids, then delete the old ids."""
+        old_ids = list(metadata_by_id)
+        for start in range(0, len(old_ids), batch_size):
+            batch_ids = old_ids[start:start + batch_size]
+            records = await self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=batch_ids,
+                with_payload=True,
+                with_vectors=True
+            )
+            points = []
+            for record in records:
+                metadata = {**record.payload.get("metadata", {}), **metadata_by_id[str(record.id)]}
+                points.append(models.PointStruct(
+                    id=chunk_point_id(metadata),
+                    vector=record.vector,
+                    payload={"page_content": record.payload.get("page_content"), "metadata": metadata}
+                ))
+            if len(points) < len(batch_ids):
+                raise ValueError(f"{len(batch_ids) - len(points)} reused points no longer exist")
+            # New ids first, so a failure in between leaves both copies rather than neither
+            await self.client.upsert(collection_name=self.collection_name, points=points)
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=batch_ids)
+            )
+
+    async def delete_stale_chunks(self, source_name: str, file_hash: str, user_id: str, thread_id: str) -> None:
+        """One filtered delete of every chunk of the file name not belonging to the current version."""
+        stale_filter = self.tenant_filter(user_id, thread_id)
+        stale_filter.must.append(models.FieldCondition(key="metadata.source_name", match=models.MatchValue(value=source_name)))
+        stale_filter.must_not = [models.FieldCondition(key="metadata.file_hash", match=models.MatchValue(value=file_hash))]
+        await self.client.delete(collection_name=self.collection_name, points_selector=stale_filter)
+
+    async def health_check(self) -> None:
+        await self.client.get_collections()
+
     async def collection_exists(self) -> bool:
         """Check if collection exists."""
+        if self._collection_exists:
+            return True
         try:
             collections = await self.client.get_collections()
             exists = any(col.name == self.collection_name for col in collections.collections)
+            self._collection_exists = exists
             return exists
         except Exception as e:
             logging.error(f"Collection existence check failed: {e}")
             return False
     
+    async def _facet_file_hashes(self, file_hashes: List[str], conditions: List[models.FieldCondition]) -> Set[str]:
+        response = await self.client.facet(
+            collection_name=self.collection_name,
+            key="metadata.file_hash",
+            facet_filter=models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="metadata.file_hash",
+                        match=models.MatchAny(any=file_hashes)
+                    ),
+                    *conditions
+                ]
+            ),
+            limit=len(file_hashes),
+            exact=True
+        )
+        # Local-mode Qdrant reports 32-hex values in UUID form, map them back to the requested hashes
+        requested = {file_hash.replace("-", ""): file_hash for file_hash in file_hashes}
+        return {
+            requested[str(hit.value).replace("-", "")]
+            for hit in response.hits
+            if hit.count > 0 and str(hit.value).replace("-", "") in requested
+        }
+
+    async def find_existing_hashes(self, file_hashes: List[str], user_id: str, thread_id: str) -> Tuple[Set[str], Set[str]]:
+        """Return which file hashes are already indexed in the thread and anywhere in the collection.
+
+        One facet query per scope over all hashes (MatchAny), instead of a count call per file.
+        """
+        unique_hashes = list(dict.fromkeys(file_hashes))
+        if not unique_hashes or not await self.collection_exists():
+            return set(), set()
+
+        local_hashes, global_hashes = await asyncio.gather(
+            self._facet_file_hashes(unique_hashes, self.tenant_filter(user_id, thread_id).must),
+            self._facet_file_hashes(unique_hashes, [])
+        )
+        logging.debug(f"Existing hashes: {len(local_hashes)} in thread '{thread_id}', "
+                      f"{len(global_hashes)} globally out of {len(unique_hashes)}")
+        return local_hashes, global_hashes
+
     async def document_exists_globally(self, file_hash: str) -> bool:
         """Check if document with given hash exists in any thread (for debugging)."""
         try:
@@ -138,27 +530,29 @@ class QdrantManager:
         """Delete entire collection."""
         try:
             await self.client.delete_collection(self.collection_name)
+            self._collection_exists = False
             logging.info(f"Deleted collection '{self.collection_name}'")
         except Exception as e:
             logging.error(f"Error deleting collection: {e}")
 
+    async def delete_document(self, file_hash: str, user_id: str, thread_id: str) -> None:
+        """Delete every chunk of a file in a thread."""
+        try:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=self.document_filter(file_hash, user_id, thread_id)
+            )
+            logging.info(f"Deleted document {file_hash[:8]}... for user '{user_id}' thread '{thread_id}'")
+        except Exception as e:
+            logging.error(f"Error deleting document: {e}")
+            # Don't raise the exception, just log it
+
     async def delete_by_thread_id(self, user_id: str, thread_id: str) -> None:
         """Delete all documents for a specific thread."""
         try:
             await self.client.delete(
                 collection_name=self.collection_name,
-                points_selector=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="metadata.user_id",
-                            match=models.MatchValue(value=user_id)
-                        ),
-                        models.FieldCondition(
-                            key="metadata.thread_id",
-                            match=models.MatchValue(value=thread_id)
-                        )
-                    ]
-                )
+                points_selector=self.tenant_filter(user_id, thread_id)
             )
             logging.info(f"Deleted documents for user '{user_id}' thread '{thread_id}'")
         except Exception as e:
@@ -183,26 +577,3 @@ class QdrantManager:
         except Exception as e:
             logging.error(f"Error deleting documents for user: {e}")
             # Don't raise the exception, just log it
-
-    # Sync wrappers for backward compatibility
-    def create_collection_sync(self, vector_size: int, force_recreate: bool = False):
-        return asyncio.run(self.create_collection(vector_size, force_recreate))
-    
-    def collection_exists_sync(self) -> bool:
-        return asyncio.run(self.collection_exists())
-    
-    def document_exists_sync(self, file_hash: str, user_id: str, thread_id: str) -> bool:
-        return asyncio.run(self.document_exists(file_hash, user_id, thread_id))
-    
-    def document_exists_globally_sync(self, file_hash: str) -> bool:
-        return asyncio.run(self.document_exists_globally(file_hash))
-    
-    def delete_collection_sync(self):
-        return asyncio.run(self.delete_collection())
-    
-    def delete_by_thread_id_sync(self, user_id: str, thread_id: str):
-        return asyncio.run(self.delete_by_thread_id(user_id, thread_id))
-    
-    def delete_by_user_id_sync(self, user_id: str):
-        return asyncio.run(self.delete_by_user_id(user_id))
-
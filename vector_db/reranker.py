@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import numpy as np
+from typing import List, Optional, Tuple
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from .model_server import ModelClient
+from utils.executors import get_executor
+from config import RERANK_MODEL, CACHE_DIR, MODEL_SERVER_SOCKET
+
+class Reranker:
+    """Cross-encoder reranker running FastEmbed's ONNX models on the "rerank" executor.
+
+    With a model_server socket the model is not loaded here and pairs are scored by the
+    shared model server instead.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = 64,
+                 model_server: Optional[str] = MODEL_SERVER_SOCKET):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = None
+        self.client = None
+        if model_server:
+            self.client = ModelClient(model_server)
+            logging.info(f"Using shared model server at {model_server} for re-ranking")
+        else:
+            self.model = TextCrossEncoder(model_name=model_name, cache_dir=CACHE_DIR)
+            logging.info(f"Initialized cross-encoder reranker with model: {model_name}")
+
+    def score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Score (query, passage) pairs in one batched call, normalized to [0, 1]."""
+        if not pairs:
+            return []
+
+        if self.client is not None:
+            return self.client.score_pairs(pairs)
+        logits = np.asarray(list(self.model.rerank_pairs(pairs, batch_size=self.batch_size)), dtype=np.float64)
+        # Sigmoid as exp(-log(1 + e^-x)), which neither overflows nor underflows to a math error
+        return np.exp(-np.logaddexp(0.0, -logits)).tolist()
+
+    async def ascore_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Score pairs on the "rerank" executor without blocking the event loop."""
+        if not pairs:
+            return []
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_executor("rerank"), self.score_pairs, pairs)
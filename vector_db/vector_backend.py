@@ -0,0 +1,179 @@
+import uuid
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain.schema import Document
+from qdrant_client.http import models
+
+# Fixed namespace so a chunk maps to the same point id in every process and run
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1f0e-5b8a-4c57-9a43-2d7e4f0b9c21")
+
+def chunk_point_id(metadata: Dict[str, Any]) -> str:
+    """Deterministic point id from (user_id, thread_id, file_hash, chunk_number).
+
+    Re-indexing or retrying a batch overwrites the same points instead of adding
+    duplicates. Chunks without a chunk number fall back to a random id.
+    """
+    if metadata.get("chunk_number") is None:
+        return uuid.uuid4().hex
+    key = f"{metadata.get('user_id')}/{metadata.get('thread_id')}/{metadata.get('file_hash')}/{metadata['chunk_number']}"
+    return uuid.uuid5(POINT_ID_NAMESPACE, key).hex
+
+class VectorBackend(ABC):
+    """Interface shared by the vector stores DocumentIndexer can run on.
+
+    Points are stored with the same payload layout as QdrantVectorStore
+    (``{"page_content": ..., "metadata": {...}}``) and searches return
+    ``models.ScoredPoint`` objects, so callers never depend on the backend.
+    """
+
+    collection_name: str
+
+    @abstractmethod
+    async def create_collection(self, vector_size: int, force_recreate: bool = False, with_sparse: bool = False,
+                                **storage_options):
+        """Create collection for storing vectors."""
+
+    @abstractmethod
+    async def collection_exists(self) -> bool:
+        """Check if collection exists."""
+
+    @abstractmethod
+    async def health_check(self) -> None:
+        """Raise if the backend is not reachable."""
+
+    @abstractmethod
+    async def count_tenant_points(self, user_id: str, thread_id: str) -> int:
+        """Count the points stored for a specific thread."""
+
+    @abstractmethod
+    async def document_exists(self, file_hash: str, user_id: str, thread_id: str) -> bool:
+        """Check if document with given hash already exists in the specific thread."""
+
+    @abstractmethod
+    async def document_exists_globally(self, file_hash: str) -> bool:
+        """Check if document with given hash exists in any thread."""
+
+    @abstractmethod
+    async def find_existing_hashes(self, file_hashes: List[str], user_id: str, thread_id: str) -> Tuple[Set[str], Set[str]]:
+        """Return which file hashes are already indexed in the thread and anywhere in the collection."""
+
+    @abstractmethod
+    async def upsert_documents(self, documents: List[Document], vectors: List[List[float]],
+                               sparse_vectors: Optional[List[models.SparseVector]] = None,
+                               wait: bool = True) -> List[str]:
+        """Store documents with their embeddings, returning the point ids.
+
+        Point ids come from chunk_point_id, so upserting a chunk again replaces it.
+        With wait=False the call may return before the points are searchable;
+        wait_for_writes() is the barrier.
+        """
+
+    @abstractmethod
+    async def wait_for_writes(self) -> None:
+        """Block until every upsert issued with wait=False has been applied."""
+
+    @abstractmethod
+    async def copy_document(self, file_hash: str, user_id: str, thread_id: str,
+                            metadata_updates: Optional[Dict[str, Any]] = None,
+                            content_digest: Optional[Dict[str, Any]] = None) -> int:
+        """Copy a file's stored chunks and vectors from one thread into another, returning the chunk count.
+
+        With content_digest, only a source whose chunk metadata matches every key of it
+        (e.g. file_sha256 and file_size) is copied; 0 is returned when there is none.
+        """
+
+    @abstractmethod
+    async def update_document_metadata(self, file_hash: str, user_id: str, thread_id: str,
+                                       metadata: Dict[str, Any]) -> None:
+        """Merge keys into the metadata of every chunk of a file in a thread."""
+
+    @abstractmethod
+    async def get_source_chunks(self, source_names: List[str], user_id: str,
+                                thread_id: str) -> Dict[str, List[Tuple[str, str]]]:
+        """Return (point id, content_hash) of the stored chunks of each file name in a thread, in chunk order."""
+
+    @abstractmethod
+    async def move_points(self, metadata_by_id: Dict[str, Dict[str, Any]]) -> None:
+        """Merge keys into the metadata of individual points and re-store them under chunk_point_id.
+
+        Vectors are kept. The old ids are deleted, so a reused chunk ends up where
+        upserting it for its new (file_hash, chunk_number) would have put it.
+        """
+
+    @abstractmethod
+    async def delete_stale_chunks(self, source_name: str, file_hash: str, user_id: str, thread_id: str) -> None:
+        """Delete the chunks of a file name in a thread that belong to any version other than file_hash."""
+
+    @abstractmethod
+    async def search_batch(self, query_vectors: List[List[float]], user_id: str, thread_id: str,
+                           limit: int = 10, score_threshold: Optional[float] = None,
+                           sparse_vectors: Optional[List[models.SparseVector]] = None,
+                           oversampling: Optional[float] = None, rescore: bool = True) -> List[List[models.ScoredPoint]]:
+        """Run several tenant-scoped similarity searches, one result list per query."""
+
+    @abstractmethod
+    async def delete_collection(self):
+        """Delete entire collection."""
+
+    @abstractmethod
+    async def delete_document(self, file_hash: str, user_id: str, thread_id: str) -> None:
+        """Delete every chunk of a file in a thread."""
+
+    @abstractmethod
+    async def delete_by_thread_id(self, user_id: str, thread_id: str) -> None:
+        """Delete all documents for a specific thread."""
+
+    @abstractmethod
+    async def delete_by_user_id(self, user_id: str) -> None:
+        """Delete all documents for a specific user."""
+
+    async def search(self, query_vector: List[float], user_id: str, thread_id: str,
+                     limit: int = 10, score_threshold: Optional[float] = None,
+                     sparse_vector: Optional[models.SparseVector] = None,
+                     oversampling: Optional[float] = None, rescore: bool = True) -> List[models.ScoredPoint]:
+        """Run a single tenant-scoped similarity search."""
+        results = await self.search_batch(
+            [query_vector],
+            user_id,
+            thread_id,
+            limit=limit,
+            score_threshold=score_threshold,
+            sparse_vectors=[sparse_vector] if sparse_vector is not None else None,
+            oversampling=oversampling,
+            rescore=rescore
+        )
+        return results[0]
+
+    # Sync wrappers for backward compatibility
+    def create_collection_sync(self, vector_size: int, force_recreate: bool = False, with_sparse: bool = False, **storage_options):
+        return asyncio.run(self.create_collection(vector_size, force_recreate, with_sparse, **storage_options))
+
+    def collection_exists_sync(self) -> bool:
+        return asyncio.run(self.collection_exists())
+
+    def count_tenant_points_sync(self, user_id: str, thread_id: str) -> int:
+        return asyncio.run(self.count_tenant_points(user_id, thread_id))
+
+    def document_exists_sync(self, file_hash: str, user_id: str, thread_id: str) -> bool:
+        return asyncio.run(self.document_exists(file_hash, user_id, thread_id))
+
+    def document_exists_globally_sync(self, file_hash: str) -> bool:
+        return asyncio.run(self.document_exists_globally(file_hash))
+
+    def copy_document_sync(self, file_hash: str, user_id: str, thread_id: str,
+                           metadata_updates: Optional[Dict[str, Any]] = None,
+                           content_digest: Optional[Dict[str, Any]] = None) -> int:
+        return asyncio.run(self.copy_document(file_hash, user_id, thread_id, metadata_updates, content_digest))
+
+    def delete_collection_sync(self):
+        return asyncio.run(self.delete_collection())
+
+    def delete_document_sync(self, file_hash: str, user_id: str, thread_id: str):
+        return asyncio.run(self.delete_document(file_hash, user_id, thread_id))
+
+    def delete_by_thread_id_sync(self, user_id: str, thread_id: str):
+        return asyncio.run(self.delete_by_thread_id(user_id, thread_id))
+
+    def delete_by_user_id_sync(self, user_id: str):
+        return asyncio.run(self.delete_by_user_id(user_id))
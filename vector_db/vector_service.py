@@ -1,7 +1,9 @@
 import asyncio
 from . import get_global_indexer
 from langchain.schema import Document
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from .document_indexer import ProgressCallback
+from config import INDEX_UPDATE_BY_FILENAME
 
 class VectorService:
     _indexer = None
@@ -22,24 +24,36 @@ class VectorService:
         return await indexer.search(query, user_id, thread_id)
 
     @classmethod
-    async def index_documents(cls, file_paths: List[str], user_id: str, thread_id: str) -> Dict[str, Any]:
+    async def retrieve_documents_batch(cls, queries: List[str], user_id: str, thread_id: str, top_k: int = 10) -> List[List[Document]]:
         indexer = cls._get_indexer()
-        return await indexer.index_documents(file_paths, user_id, thread_id)
+        if not indexer._initialized:
+            await indexer._initialize_vector_store()
+        return await indexer.search_batch(queries, user_id, thread_id, top_k)
+
+    @classmethod
+    async def index_documents(cls, file_paths: List[str], user_id: str, thread_id: str,
+                              progress: Optional[ProgressCallback] = None,
+                              update_existing: bool = INDEX_UPDATE_BY_FILENAME,
+                              file_hashes: Optional[List[Optional[str]]] = None,
+                              file_sha256s: Optional[List[Optional[str]]] = None) -> Dict[str, Any]:
+        indexer = cls._get_indexer()
+        return await indexer.index_documents(file_paths, user_id, thread_id, progress, update_existing,
+                                             file_hashes, file_sha256s)
 
     @classmethod
     async def delete_collection(cls) -> None:
         indexer = cls._get_indexer()
-        await indexer.qdrant_manager.delete_collection()
+        await indexer.vector_backend.delete_collection()
 
     @classmethod
     async def delete_chat_documents(cls, user_id: str, thread_id: str) -> None:
         indexer = cls._get_indexer()
-        await indexer.qdrant_manager.delete_by_thread_id(user_id, thread_id)
+        await indexer.vector_backend.delete_by_thread_id(user_id, thread_id)
     
     @classmethod
     async def delete_user_documents(cls, user_id: str) -> None:
         indexer = cls._get_indexer()
-        await indexer.qdrant_manager.delete_by_user_id(user_id)
+        await indexer.vector_backend.delete_by_user_id(user_id)
 
     # Sync wrappers for backward compatibility
     @classmethod
@@ -51,6 +65,15 @@ class VectorService:
             # No event loop running, create one
             return asyncio.run(cls.retrieve_documents(query, user_id, thread_id))
 
+    @classmethod
+    def retrieve_documents_batch_sync(cls, queries: List[str], user_id: str, thread_id: str, top_k: int = 10) -> List[List[Document]]:
+        try:
+            loop = asyncio.get_event_loop()
+            return loop.run_until_complete(cls.retrieve_documents_batch(queries, user_id, thread_id, top_k))
+        except RuntimeError:
+            # No event loop running, create one
+            return asyncio.run(cls.retrieve_documents_batch(queries, user_id, thread_id, top_k))
+
     @classmethod
     def index_documents_sync(cls, file_paths: List[str], user_id: str, thread_id: str) -> Dict[str, Any]:
         try:
@@ -5,7 +5,9 @@ from langchain_groq import ChatGroq
 
 from services.intent_detection_node import IntentDetectionNode
 from services.decompose_node import DecomposeNode
+from services.single_task_node import SingleTaskNode
 from services.retrieval_node import RetrievalNode
+from services.rerank_node import RerankNode
 from services.search_node import SearchNode
 from services.evaluater_node import EvaluatorNode
 from services.aggregation_node import AggregationNode
@@ -13,15 +15,19 @@ from services.call_model import CallModelNode
 
 from models.state import State
 from utils.checkpointer import get_checkpointer
-from config import MODEL_ID, UTILS_MODEL_ID
+from utils.llm_scheduler import ScheduledChatModel
+from config import MODEL_ID, UTILS_MODEL_ID, DECOMPOSE_FAST_PATH
 
 
-utils_model = ChatGroq(model=UTILS_MODEL_ID)
-main_model = ChatGroq(model=MODEL_ID)
+# Every call goes through the shared LLM scheduler: answers first, then decompose/evaluate
+utils_model = ScheduledChatModel(model=ChatGroq(model=UTILS_MODEL_ID), priority="utility")
+main_model = ScheduledChatModel(model=ChatGroq(model=MODEL_ID), priority="interactive")
 
 intent_detector = IntentDetectionNode()
 decomposer = DecomposeNode(llm=utils_model)
+single_task = SingleTaskNode()
 retriever = RetrievalNode()
+reranker = RerankNode()
 evaluator = EvaluatorNode(llm=utils_model)
 searcher = SearchNode()
 aggregator = AggregationNode()
@@ -32,6 +38,8 @@ def route_after_intent_detection(state: State) -> str:
     do_search = state.get("do_search")
     
     if do_retrieval or do_search:
+        if DECOMPOSE_FAST_PATH and single_task.is_simple_query(state):
+            return "single_task"
         return "decompose"
     
     return "direct_to_llm"
@@ -86,9 +94,11 @@ def build_workflow():
 
     workflow.add_node("intent_detector", intent_detector.invoke)
     workflow.add_node("decompose", decomposer.invoke)
+    workflow.add_node("single_task", single_task.invoke)
     workflow.add_node("parallel_evidence", parallel_node)
     workflow.add_node("retrieve_only", retriever.invoke)
     workflow.add_node("search_only", searcher.invoke)
+    workflow.add_node("rerank", reranker.invoke)
     workflow.add_node("evaluate", evaluator.invoke)
     workflow.add_node("aggregate", aggregator.invoke)
     workflow.add_node("call_model", call_model.invoke)
@@ -100,23 +110,27 @@ def build_workflow():
         route_after_intent_detection,
         {
             "decompose": "decompose",
+            "single_task": "single_task",
             "direct_to_llm": "aggregate"
         }
     )
 
-    workflow.add_conditional_edges(
-        "decompose",
-        route_after_decomposition,
-        {
-            "retrieve_only": "retrieve_only",
-            "search_only": "search_only",
-            "direct_to_llm": "aggregate",
-            "parallel_evidence": "parallel_evidence"
-        }
-    )
-
-    workflow.add_edge("parallel_evidence", "evaluate")
-    workflow.add_edge("retrieve_only", "evaluate")
+    # The fast path continues exactly like decomposition
+    for planner in ("decompose", "single_task"):
+        workflow.add_conditional_edges(
+            planner,
+            route_after_decomposition,
+            {
+                "retrieve_only": "retrieve_only",
+                "search_only": "search_only",
+                "direct_to_llm": "aggregate",
+                "parallel_evidence": "parallel_evidence"
+            }
+        )
+
+    workflow.add_edge("parallel_evidence", "rerank")
+    workflow.add_edge("retrieve_only", "rerank")
+    workflow.add_edge("rerank", "evaluate")
     workflow.add_edge("search_only", "aggregate")
     workflow.add_edge("evaluate", "aggregate")
 